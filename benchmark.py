@@ -0,0 +1,1098 @@
+"""
+Benchmarks for the rover language.
+
+Run a benchmark with: python benchmark.py <benchmark_name>
+Run without arguments to list the available benchmarks.
+"""
+
+import collections
+import concurrent.futures
+import contextlib
+import io
+import os
+import pathlib
+import queue
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import command_channel
+import grid
+import optimizer
+import output_sink
+import parser
+import parser_components
+import profiler
+import program_cache
+import rover
+import vm
+
+PARSING_TESTS_DIR = pathlib.Path(pathlib.Path(__file__).parent.resolve(), "parsing-tests")
+
+# Every benchmark registered with @benchmark, by name
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def load_corpus():
+    """Returns the content of every program in parsing-tests that parses."""
+    corpus = {}
+    for path in sorted(PARSING_TESTS_DIR.glob("*.txt")):
+        content = path.read_text()
+        try:
+            parser.get_parse_tree(content)
+        except Exception:
+            continue
+        corpus[path.name] = content
+    return corpus
+
+
+def generate_program(n_statements, chain_length=8):
+    """Returns a generated program with n_statements sequential statements.
+
+    It mixes array assignments like the ones at the top of dfs_drill.txt
+    with long arithmetic and boolean operator chains.
+    """
+    lines = [
+        "{",
+        "    int [ 100 ] [ 2 ] d_tiles ;",
+        "    int x ;",
+        "    bool b ;",
+        "    x = 0 ;",
+    ]
+    for i in range(n_statements):
+        if i % 3 == 0:
+            lines.append(f"    d_tiles [ {i % 100} ] [ {i % 2} ] = {i} ;")
+        elif i % 3 == 1:
+            lines.append("    x = x - " + " + ".join(str(j) for j in range(chain_length)) + " ;")
+        else:
+            lines.append("    b = " + " || ".join(["x == 0 && b"] * chain_length) + " ;")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def generate_loop_program(size):
+    """Returns a loop heavy program that fills and sums a size x size grid."""
+    return f"""{{
+    int i ; int j ; int acc ;
+    int [ {size} ] [ {size} ] grid ;
+    i = 0 ; acc = 0 ;
+    while ( i < {size} ) {{
+        j = 0 ;
+        while ( j < {size} ) {{
+            grid [ i ] [ j ] = i * j + 1 ;
+            acc = acc + grid [ i ] [ j ] / 2 - 1 ;
+            j = j + 1 ;
+        }}
+        i = i + 1 ;
+    }}
+    print acc ;
+}}"""
+
+
+def count_nodes(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def make_rover():
+    # Same seed every time so every run does the same thing
+    random.seed(0)
+    return rover.Rover(rover.ROVER_1)
+
+
+def run_quietly(program, rvr):
+    # Programs print a lot, don't let the terminal slow down the benchmark
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        program(rvr)
+    return output.getvalue()
+
+
+def benchmark_programs():
+    return {
+        "loop_program(40)": generate_loop_program(40),
+        "dfs_drill.txt": (PARSING_TESTS_DIR / "dfs_drill.txt").read_text(),
+    }
+
+
+def checked_tree(program):
+    parse_tree = parser.get_parse_tree(program).lower()
+    parse_tree.check()
+    return parse_tree
+
+
+def timed(func, *args, repeat=3):
+    # Best time out of a few runs, less noisy than the average
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def _parse_all(programs):
+    for program in programs:
+        parser.Parser(program).parse()
+    return len(programs)
+
+
+@benchmark
+def parse_scaling():
+    """Parse throughput of the corpus with 1..N thread and process workers."""
+    corpus = list(load_corpus().values())
+    # Enough work per worker so that pool start up doesn't dominate
+    programs = corpus * 40
+    cpus = os.cpu_count() or 1
+    workers = sorted({1, 2, 4, cpus})
+
+    def _run_pool(executor_cls, n_workers):
+        chunks = [programs[i::n_workers] for i in range(n_workers)]
+        with executor_cls(max_workers=n_workers) as executor:
+            return sum(executor.map(_parse_all, chunks))
+
+    print(f"{len(programs)} programs, {sum(map(len, programs)) // 1024} KB of source, {cpus} cpus")
+    print(f"{'pool':10} {'workers':>8} {'seconds':>10} {'programs/s':>12}")
+    for name, executor_cls in [
+        ("threads", concurrent.futures.ThreadPoolExecutor),
+        ("processes", concurrent.futures.ProcessPoolExecutor),
+    ]:
+        for n_workers in workers:
+            elapsed, count = timed(_run_pool, executor_cls, n_workers, repeat=1)
+            print(f"{name:10} {n_workers:>8} {elapsed:>10.3f} {count / elapsed:>12.1f}")
+
+
+@benchmark
+def parse_stress():
+    """Parses, lowers and checks generated programs up to a million tokens with a small recursion limit."""
+    # The depth of the parser, the lowering and the checks must not depend
+    # on the number of statements or the length of operator chains, so keep
+    # the limit low
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(200)
+    try:
+        print(
+            f"{'statements':>10} {'chain':>6} {'tokens':>10} {'parse s':>10} {'lower s':>10} "
+            f"{'check s':>10} {'tokens/s':>12}"
+        )
+        for n_statements, chain_length in [(1000, 8), (10000, 8), (40000, 8), (100, 1000), (20, 10000)]:
+            program = generate_program(n_statements, chain_length)
+            n_tokens = len(parser.tokenize(program))
+            parse_time, parse_tree = timed(parser.get_parse_tree, program, repeat=1)
+            lower_time, lowered = timed(parse_tree.lower, repeat=1)
+            check_time, _ = timed(lowered.check, repeat=1)
+            print(
+                f"{n_statements:>10} {chain_length:>6} {n_tokens:>10} {parse_time:>10.3f} {lower_time:>10.3f} "
+                f"{check_time:>10.3f} {n_tokens / parse_time:>12.0f}"
+            )
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+
+
+@benchmark
+def ast_lowering():
+    """Node count and interpreter time of the parse tree against the lowered compact AST."""
+    programs = benchmark_programs()
+    print(f"{'program':20} {'nodes':>8} {'lowered':>8} {'run s':>8} {'lowered':>8} {'speedup':>8}")
+    for name, program in programs.items():
+        parse_tree = parser.get_parse_tree(program)
+        parse_tree.check()
+        lowered = checked_tree(program)
+
+        tree_time, tree_output = timed(lambda: run_quietly(parse_tree.execute, make_rover()), repeat=1)
+        lowered_time, lowered_output = timed(lambda: run_quietly(lowered.execute, make_rover()), repeat=1)
+        assert tree_output == lowered_output
+
+        print(
+            f"{name:20} {count_nodes(parse_tree):>8} {count_nodes(lowered):>8} "
+            f"{tree_time:>8.3f} {lowered_time:>8.3f} {tree_time / lowered_time:>7.1f}x"
+        )
+
+
+@benchmark
+def backends():
+    """Run time of every execution backend, relative to the tree walker."""
+    programs = benchmark_programs()
+    print(f"{'program':20} {'backend':10} {'compile s':>10} {'run s':>8} {'speedup':>8}")
+    for name, program in programs.items():
+        expected_output = None
+        tree_time = None
+        for backend, compile_program in rover.BACKENDS.items():
+            parse_tree = checked_tree(program)
+            compile_time, compiled = timed(compile_program, parse_tree, repeat=1)
+            run_time, output = timed(lambda: run_quietly(compiled, make_rover()), repeat=1)
+
+            # Every backend must do exactly the same thing
+            if expected_output is None:
+                expected_output = output
+            assert output == expected_output, f"{backend} output differs"
+            if backend == "tree":
+                tree_time = run_time
+            speedup = f"{tree_time / run_time:>7.1f}x" if tree_time else ""
+            print(f"{name:20} {backend:10} {compile_time:>10.4f} {run_time:>8.3f} {speedup:>8}")
+
+
+class _ThreadOutput(io.TextIOBase):
+    # Stands for stdout while threads run programs, every thread prints to its own buffer
+    def __init__(self):
+        self.buffers = collections.defaultdict(io.StringIO)
+
+    def write(self, text):
+        return self.buffers[threading.get_ident()].write(text)
+
+
+def _validate(program, output):
+    # Checks and runs the program, returns what it printed or the error it raised
+    buffer = output.buffers[threading.get_ident()]
+    start = buffer.tell()
+    try:
+        rover.BACKENDS[rover.DEFAULT_BACKEND](rover.check_program(program))(make_rover())
+    except Exception as e:
+        return str(e)
+    return buffer.getvalue()[start:]
+
+
+@benchmark
+def threaded_validation():
+    """Checks and runs programs from 1..8 threads at once, every result must match a sequential run."""
+    programs = [generate_loop_program(size) for size in range(5, 25)]
+    programs += [
+        "{ int x ; { int y ; y = 1 ; } y = 2 ; }",  # y is out of scope
+        "{ int x ; double x ; }",  # x is defined twice
+        "{ int x ; x = true ; }",  # wrong type
+        "{ int [ 4 ] a ; int i ; i = 0 ; while ( i < 4 ) { a [ i ] = i * i ; i = i + 1 ; } print a [ 3 ] ; }",
+    ]
+    jobs = programs * 10
+
+    # Switch threads very often so that programs really run interleaved
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    output = _ThreadOutput()
+    try:
+        _threaded_validation(programs, jobs, output)
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
+def _threaded_validation(programs, jobs, output):
+    with contextlib.redirect_stdout(output):
+        expected = [_validate(program, output) for program in programs] * 10
+
+        print(f"{len(jobs)} programs checked and run", file=sys.__stdout__)
+        print(f"{'threads':>8} {'seconds':>10} {'programs/s':>12} {'mismatches':>11}", file=sys.__stdout__)
+        for n_threads in [1, 2, 4, 8]:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=n_threads) as executor:
+                start = time.perf_counter()
+                results = list(executor.map(lambda program: _validate(program, output), jobs))
+                elapsed = time.perf_counter() - start
+            mismatches = sum(result != want for result, want in zip(results, expected))
+            print(
+                f"{n_threads:>8} {elapsed:>10.3f} {len(jobs) / elapsed:>12.1f} {mismatches:>11}",
+                file=sys.__stdout__
+            )
+
+
+def generate_constant_program(n_iterations):
+    """Returns a loop full of constant expressions, debug branches and empty statements."""
+    return f"""{{
+    int i ; int acc ; double rate ;
+    i = 0 ; acc = 0 ; rate = 0.0 ;
+    while ( i < {n_iterations} ) {{
+        acc = acc + 60 * 60 * 24 - 1 ;
+        rate = rate + 1 / 4 + 2.0 * 3 ;
+        if ( false ) {{ print acc ; }}
+        if ( 2 > 3 && i > 0 ) {{ acc = 0 ; }}
+        if ( true || i > 0 ) {{ i = i + 10 - 9 ; }}
+        ; ; ;
+    }}
+    print acc ;
+    print rate ;
+}}"""
+
+
+@benchmark
+def constant_folding():
+    """Run time of every backend with and without the optimizer, and what it changes in the corpus."""
+    program = generate_constant_program(20000)
+    print(f"{'backend':10} {'plain s':>8} {'optimized s':>12} {'speedup':>8}")
+    for backend, compile_program in rover.BACKENDS.items():
+        times = []
+        outputs = []
+        for optimize in [False, True]:
+            compiled = compile_program(rover.check_program(program, optimize=optimize))
+            run_time, output = timed(lambda: run_quietly(compiled, make_rover()), repeat=1)
+            times.append(run_time)
+            outputs.append(output)
+        assert outputs[0] == outputs[1], f"{backend} output differs once optimized"
+        print(f"{backend:10} {times[0]:>8.3f} {times[1]:>12.3f} {times[0] / times[1]:>7.1f}x")
+
+    print()
+    print(f"{'program':40} {'folded':>7} {'simpl.':>7} {'if':>4} {'while':>6} {'empty':>6} {'nodes':>12}")
+    for name, source in [*load_corpus().items(), ("generate_constant_program", program)]:
+        try:
+            stats = optimizer.optimize(rover.check_program(source, optimize=False))
+        except Exception:
+            continue  # semantic errors
+        print(
+            f"{name:40} {stats.folded:>7} {stats.simplified:>7} {stats.dead_branches:>4} "
+            f"{stats.dead_loops:>6} {stats.empty_statements:>6} "
+            f"{f'{stats.nodes_before} -> {stats.nodes_after}':>12}"
+        )
+
+
+def generate_invariant_program(size):
+    """Returns nested loops recomputing the same row scale and the same sum in every iteration."""
+    return f"""{{
+    int i ; int j ; int w ; int acc ;
+    int [ {size} ] [ {size} ] grid ;
+    int [ {size} ] scale ;
+    i = 0 ; w = 3 ; acc = 0 ;
+    while ( i < {size} ) {{ scale [ i ] = i + 1 ; i = i + 1 ; }}
+    i = 0 ;
+    while ( i < {size} ) {{
+        j = 0 ;
+        while ( j < {size} ) {{
+            grid [ i ] [ j ] = ( j + w * 2 ) * scale [ i ] + ( j + w * 2 ) * scale [ {size} - i - 1 ] ;
+            acc = acc + grid [ i ] [ j ] / ( w * w + 1 ) ;
+            j = j + 1 ;
+        }}
+        i = i + 1 ;
+    }}
+    print acc ;
+}}"""
+
+
+@benchmark
+def expression_caching():
+    """Run time of every backend with and without loop invariant code motion and common subexpressions."""
+    programs = benchmark_programs()
+    programs["generate_invariant_program(60)"] = generate_invariant_program(60)
+    print(f"{'program':32} {'backend':10} {'before s':>9} {'after s':>8} {'speedup':>8}")
+    for name, program in programs.items():
+        for backend, compile_program in rover.BACKENDS.items():
+            times = []
+            outputs = []
+            for cache_expressions in [False, True]:
+                parse_tree = rover.check_program(program, optimize=False)
+                optimizer.optimize(parse_tree, cache_expressions=cache_expressions)
+                compiled = compile_program(parse_tree)
+                run_time, output = timed(lambda: run_quietly(compiled, make_rover()), repeat=3)
+                times.append(run_time)
+                outputs.append(output)
+            assert outputs[0] == outputs[1], f"{backend} output differs with cached expressions"
+            print(f"{name:32} {backend:10} {times[0]:>9.3f} {times[1]:>8.3f} {times[0] / times[1]:>7.2f}x")
+
+    print()
+    print(f"{'program':40} {'hoisted':>8} {'common':>7}")
+    for name, source in {**load_corpus(), **programs}.items():
+        try:
+            stats = optimizer.optimize(rover.check_program(source, optimize=False))
+        except Exception:
+            continue  # semantic errors
+        if stats.hoisted or stats.common:
+            print(f"{name:40} {stats.hoisted:>8} {stats.common:>7}")
+
+
+def generate_arithmetic_program(n_iterations):
+    """Returns a loop of int arithmetic, int divisions assigned to ints and double averages."""
+    return f"""{{
+    int i ; int half ; int sum ; double average ;
+    i = 0 ; sum = 0 ;
+    while ( i < {n_iterations} ) {{
+        half = i / 2 ;
+        sum = sum + half * 3 - 1 ;
+        average = sum / ( i + 1 ) ;
+        i = i + 1 ;
+    }}
+    print sum ; print average ;
+}}"""
+
+
+@benchmark
+def type_specialization():
+    """Run time of the closure backend with generic evaluators and with evaluators specialized by type."""
+    programs = benchmark_programs()
+    programs["generate_invariant_program(60)"] = generate_invariant_program(60)
+    programs["generate_arithmetic_program(50000)"] = generate_arithmetic_program(50000)
+    print(f"{'program':36} {'generic s':>10} {'specialized s':>14} {'speedup':>8}")
+    for name, program in programs.items():
+        times = []
+        outputs = []
+        for specialize in [False, True]:
+            parser_components.SPECIALIZE_BY_TYPE = specialize
+            try:
+                compiled = rover.BACKENDS["closure"](rover.check_program(program))
+            finally:
+                parser_components.SPECIALIZE_BY_TYPE = True
+            run_time, output = timed(lambda: run_quietly(compiled, make_rover()), repeat=3)
+            times.append(run_time)
+            outputs.append(output)
+        assert outputs[0] == outputs[1], f"{name} output differs once specialized"
+        print(f"{name:36} {times[0]:>10.3f} {times[1]:>14.3f} {times[0] / times[1]:>7.2f}x")
+
+
+def _nested_lists(lengths, fill):
+    # How arrays used to be stored, one python list per sub array
+    if len(lengths) == 1:
+        return [fill(i) for i in range(lengths[0])]
+    return [_nested_lists(lengths[1:], fill) for _ in range(lengths[0])]
+
+
+def _allocated(func, *args):
+    # Bytes still allocated by what func returns
+    tracemalloc.start()
+    result = func(*args)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def _fill_flat(ttype, lengths, fill):
+    buffer = parser_components.make_array(ttype, lengths)
+    for i in range(len(buffer)):
+        buffer[i] = fill(i)
+    return buffer
+
+
+def _lowered_tree(program):
+    parse_tree = parser.get_parse_tree(program).lower()
+    parse_tree.check()
+    return parse_tree
+
+
+@benchmark
+def tree_memory():
+    """Bytes per source token of the parse tree and of the checked compact AST."""
+    programs = [("parsing-tests", list(load_corpus().values()))]
+    n_statements = 1000
+    while len(generate_program(n_statements)) < 1024 * 1024:
+        n_statements *= 2
+    programs.append((f"generated {n_statements}", [generate_program(n_statements)]))
+
+    print(f"{'program':20} {'MB':>6} {'tokens':>9} {'tree B/tok':>11} {'AST B/tok':>10}")
+    for name, sources in programs:
+        n_tokens = sum(len(parser.tokenize(source)) for source in sources)
+        tree_bytes = sum(_allocated(parser.get_parse_tree, source) for source in sources)
+        lowered_bytes = sum(_allocated(_lowered_tree, source) for source in sources)
+        megabytes = sum(len(source) for source in sources) / (1024 * 1024)
+        print(
+            f"{name:20} {megabytes:>6.2f} {n_tokens:>9} {tree_bytes / n_tokens:>11.1f} "
+            f"{lowered_bytes / n_tokens:>10.1f}"
+        )
+
+
+@benchmark
+def array_storage():
+    """Memory of a filled grid as nested lists against a flat buffer, and run time with and without bounds checks."""
+    lengths = [1000, 1000]
+    fills = {
+        "int": lambda i: i * 1000,
+        "double": lambda i: i / 3,
+        "bool": lambda i: i % 2 == 0,
+    }
+    n_elements = lengths[0] * lengths[1]
+    print(f"{'type':8} {'lists MB':>10} {'flat MB':>10} {'lists B/elt':>12} {'flat B/elt':>12}")
+    for ttype, fill in fills.items():
+        nested = _allocated(_nested_lists, lengths, fill)
+        flat = _allocated(_fill_flat, ttype, lengths, fill)
+        print(
+            f"{ttype:8} {nested / 2 ** 20:>10.1f} {flat / 2 ** 20:>10.1f} "
+            f"{nested / n_elements:>12.1f} {flat / n_elements:>12.1f}"
+        )
+
+    print()
+    program = generate_loop_program(150)
+    print(f"{'bounds checks':14} {'backend':10} {'run s':>8}")
+    for check_bounds in [True, False]:
+        parser_components.CHECK_ARRAY_BOUNDS = check_bounds
+        try:
+            for backend, compile_program in rover.BACKENDS.items():
+                compiled = compile_program(checked_tree(program))
+                run_time, _ = timed(lambda: run_quietly(compiled, make_rover()), repeat=1)
+                print(f"{str(check_bounds):14} {backend:10} {run_time:>8.3f}")
+        finally:
+            parser_components.CHECK_ARRAY_BOUNDS = True
+
+
+class CountingRover(rover.Rover):
+    """Rover counting the calls the program makes to the getters that are methods."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.getter_calls = collections.Counter()
+        self.in_getter = False
+
+    def _count(self, name, method, *args):
+        # can_move uses max_move, only count the call made by the program
+        if self.in_getter:
+            return method(*args)
+        self.getter_calls[name] += 1
+        self.in_getter = True
+        try:
+            return method(*args)
+        finally:
+            self.in_getter = False
+
+    def sonar(self):
+        return self._count("sonar", super().sonar)
+
+    def can_move(self, direction):
+        return self._count("can_move", super().can_move, direction)
+
+    def max_move(self, direction):
+        return self._count("max_move", super().max_move, direction)
+
+
+def generate_guard_program(guard, n_iterations=200):
+    """Returns a program running a while loop n_iterations times with the given guard."""
+    return f"""{{
+    int i ; bool found ;
+    i = 0 ; found = false ;
+    while ( i < {n_iterations} && ( {guard} ) ) {{
+        i = i + 1 ;
+        found = i > {n_iterations} ;
+    }}
+    print i ;
+}}"""
+
+
+@benchmark
+def short_circuit():
+    """Getter calls and run time of while guards using && and ||, with and without short circuiting."""
+    programs = {
+        "max_move||sonar": generate_guard_program("rover . max_move up >= 0 || rover . sonar > 0"),
+        "can_move||sonar": generate_guard_program("rover . can_move up || rover . sonar > 0"),
+        "!found&&max_move": generate_guard_program("! found && rover . max_move right >= 0"),
+        "found&&sonar": generate_guard_program("! ( found && rover . sonar > 0 )"),
+        "dfs_drill.txt": (PARSING_TESTS_DIR / "dfs_drill.txt").read_text(),
+    }
+    print(f"{'program':18} {'short circuit':14} {'getter calls':>13} {'sonar calls':>12} {'run s':>8}")
+    for name, program in programs.items():
+        for short_circuit in [False, True]:
+            parser_components.SHORT_CIRCUIT = short_circuit
+            try:
+                compiled = rover.BACKENDS[rover.DEFAULT_BACKEND](checked_tree(program))
+                random.seed(0)
+                rvr = CountingRover(rover.ROVER_1)
+                run_time, _ = timed(run_quietly, compiled, rvr, repeat=1)
+            finally:
+                parser_components.SHORT_CIRCUIT = True
+            calls = rvr.getter_calls
+            print(
+                f"{name:18} {str(short_circuit):14} {sum(calls.values()):>13} "
+                f"{calls['sonar']:>12} {run_time:>8.3f}"
+            )
+
+
+def _command_latencies(use_socket, n_commands):
+    # Latency between main.py sending a command and a rover waiting on a
+    # CommandChannel getting it, the rover runs in a thread
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        command_file = pathlib.Path(tmp_dir, "Rover1.txt")
+        command_file.touch()
+        channel = command_channel.CommandChannel(command_file, use_socket=use_socket)
+        received = queue.Queue()
+        stop = threading.Event()
+
+        def wait_for_commands():
+            while not stop.is_set():
+                command = channel.wait()
+                if command:
+                    received.put(time.perf_counter())
+
+        thread = threading.Thread(target=wait_for_commands)
+        thread.start()
+        latencies = []
+        try:
+            for i in range(n_commands):
+                time.sleep(random.uniform(0, channel.poll_interval))  # anywhere in the polling cycle
+                sent = time.perf_counter()
+                command_channel.send_command(command_file, f"{{ print {i} ; }}")
+                latencies.append(received.get() - sent)
+        finally:
+            stop.set()
+            thread.join()
+            channel.close()
+    return latencies
+
+
+@benchmark
+def command_latency():
+    """Time between sending a command and the rover getting it, through the socket and the file fallback."""
+    random.seed(0)
+    print(f"{'channel':8} {'commands':>9} {'mean ms':>9} {'max ms':>9}")
+    for name, use_socket, n_commands in [("socket", True, 50), ("file", False, 10)]:
+        latencies = _command_latencies(use_socket, n_commands)
+        print(
+            f"{name:8} {n_commands:>9} {statistics.mean(latencies) * 1000:>9.2f} "
+            f"{max(latencies) * 1000:>9.2f}"
+        )
+
+
+def _run_vm(code, budget):
+    machine = vm.VirtualMachine(code, make_rover())
+    with contextlib.redirect_stdout(io.StringIO()):
+        if budget is None:
+            machine.run()
+        else:
+            while not machine.run(budget):
+                pass
+    return machine
+
+
+@benchmark
+def vm_budget():
+    """Instructions the VM runs, and its run time when paused every budget instructions."""
+    print(f"{'program':20} {'code size':>10} {'budget':>8} {'executed':>10} {'run s':>8}")
+    for name, program in benchmark_programs().items():
+        code = vm.compile_code(checked_tree(program))
+        for budget in [None, 100000, 1000]:
+            run_time, machine = timed(_run_vm, code, budget, repeat=1)
+            executed = machine.n_executed if budget is not None else ""
+            print(f"{name:20} {len(code):>10} {str(budget):>8} {executed:>10} {run_time:>8.3f}")
+
+
+@benchmark
+def program_cache_hits():
+    """Time to get a checked program: parsing and checking it, from the disk cache and from memory."""
+    source = (PARSING_TESTS_DIR / "dfs_drill.txt").read_text()
+    print(f"{'how':12} {'ms':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        def from_disk():
+            # A new cache has nothing in memory yet
+            return program_cache.ProgramCache(directory).get(source, rover.check_program)
+
+        cache = program_cache.ProgramCache(directory)
+        cache.get(source, rover.check_program)
+        results = [
+            ("miss", timed(lambda: program_cache.ProgramCache(None).get(source, rover.check_program))[0]),
+            ("disk hit", timed(from_disk)[0]),
+            ("memory hit", timed(cache.get, source, rover.check_program)[0]),
+        ]
+    for how, seconds in results:
+        print(f"{how:12} {seconds * 1000:>8.3f}")
+
+
+def _run_budgeted(compiled, run_budget):
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        compiled(make_rover(), run_budget)
+    return output.getvalue()
+
+
+def _stopped_after(compiled, run_budget):
+    start = time.perf_counter()
+    try:
+        compiled(make_rover(), run_budget)
+    except parser_components.RunTimeError:
+        return time.perf_counter() - start
+    raise Exception("An endless loop wasn't stopped by its budget")
+
+
+@benchmark
+def run_budget():
+    """Run time of every backend without budget checks, with an unlimited budget and with limits, and how fast endless loops stop."""
+    programs = benchmark_programs()
+    budgets = [
+        ("unchecked", False, None),
+        ("unlimited", True, parser_components.RunBudget()),
+        ("limited", True, parser_components.RunBudget(rover.MAX_COMMAND_STEPS, rover.MAX_COMMAND_SECONDS)),
+    ]
+    print(f"{'program':20} {'backend':10} " + " ".join(f"{name + ' s':>12}" for name, _, _ in budgets) + f" {'overhead':>9}")
+    for name, program in programs.items():
+        parse_tree = rover.check_program(program)
+        for backend, compile_program in rover.BACKENDS.items():
+            times = []
+            outputs = []
+            for _, check, budget in budgets:
+                parser_components.CHECK_RUN_BUDGET = check
+                try:
+                    compiled = compile_program(parse_tree)
+                    run_time, output = timed(_run_budgeted, compiled, budget, repeat=5)
+                finally:
+                    parser_components.CHECK_RUN_BUDGET = True
+                times.append(run_time)
+                outputs.append(output)
+            assert len(set(outputs)) == 1, f"{backend} output differs with a budget"
+            overhead = (times[2] / times[0] - 1) * 100
+            print(f"{name:20} {backend:10} " + " ".join(f"{t:>12.3f}" for t in times) + f" {overhead:>8.1f}%")
+
+    print()
+    endless = rover.check_program("{ int i; i = 0; while ( true ) { i = i + 1; } }")
+    print(f"{'endless loop':20} {'backend':10} {'1M steps s':>12} {'0.5 s limit':>12}")
+    for backend, compile_program in rover.BACKENDS.items():
+        compiled = compile_program(endless)
+        by_steps = _stopped_after(compiled, parser_components.RunBudget(max_steps=1_000_000))
+        by_time = _stopped_after(compiled, parser_components.RunBudget(max_seconds=0.5))
+        print(f"{'':20} {backend:10} {by_steps:>12.3f} {by_time:>12.3f}")
+
+
+def _run_profiled(program, profiler_):
+    rvr = make_rover()
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        rvr.parse_and_execute_cmd(program, profiler=profiler_)
+    return output.getvalue()
+
+
+@benchmark
+def profiling():
+    """Run time of the closure backend without and with the profiler, and the top of its report."""
+    programs = benchmark_programs()
+    print(f"{'program':20} {'plain s':>8} {'profiled s':>11} {'slowdown':>9}")
+    reports = []
+    for name, program in programs.items():
+        compiled = rover.BACKENDS["closure"](rover.check_program(program))
+        plain_time, plain_output = timed(lambda: run_quietly(compiled, make_rover()))
+        profiler_ = profiler.Profiler()
+        profiled_time, profiled_output = timed(_run_profiled, program, profiler_, repeat=1)
+        assert plain_output in profiled_output, f"{name} output differs when profiled"
+        print(f"{name:20} {plain_time:>8.3f} {profiled_time:>11.3f} {profiled_time / plain_time:>8.1f}x")
+        reports.append((name, profiler_.report(5)))
+    for name, report in reports:
+        print()
+        print(name)
+        print(report)
+
+
+def generate_print_program(n_iterations):
+    """Returns a loop printing two lines per iteration."""
+    return f"""{{
+    int i;
+    i = 0;
+    while ( i < {n_iterations} ) {{
+        print i;
+        print i * 2 + 1;
+        i = i + 1;
+    }}
+}}"""
+
+
+def _run_to_sink(compiled, sink, stream):
+    rvr = make_rover()
+    rvr.output = sink
+    with contextlib.redirect_stdout(stream):
+        compiled(rvr)
+        sink.flush()
+
+
+@benchmark
+def output_sinks():
+    """Run time of a print heavy loop writing to a line buffered file through every output sink."""
+    program = generate_print_program(100000)
+    compiled = rover.BACKENDS["closure"](rover.check_program(program))
+    sinks = {
+        "stdout": output_sink.StdoutSink,
+        "buffered": output_sink.BufferedSink,
+        "buffered 1KiB": lambda: output_sink.BufferedSink(buffer_size=1024),
+        "capture": output_sink.CaptureSink,
+    }
+    print(f"{'sink':14} {'run s':>8} {'writes':>8}")
+    expected_output = None
+    for name, make_sink in sinks.items():
+        # Line buffered like a terminal, every line written is a system call
+        with tempfile.TemporaryFile("w+", buffering=1) as stream:
+            sink = make_sink()
+            run_time, _ = timed(_run_to_sink, compiled, sink, stream, repeat=1)
+            stream.seek(0)
+            output = sink.getvalue() if isinstance(sink, output_sink.CaptureSink) else stream.read()
+        if expected_output is None:
+            expected_output = output
+        assert output == expected_output, f"{name} output differs"
+        writes = getattr(sink, "n_flushes", "")
+        print(f"{name:14} {run_time:>8.3f} {writes:>8}")
+
+
+def generate_map(path, size, tiles="     XXDR1G"):
+    """Writes a size x size map surrounded by X tiles, with random tiles inside."""
+    random.seed(0)
+    border = "X" * size
+    with open(path, "w") as f:
+        f.write(border + "\n")
+        for _ in range(size - 2):
+            f.write("X" + "".join(random.choices(tiles, k=size - 2)) + "X\n")
+        f.write(border + "\n")
+
+
+def _load_list_map(path):
+    # How rovers used to load their map: one character at a time, a list of 1 character strings per row
+    rows = []
+    with open(path, "r", encoding="utf-8") as file:
+        row = []
+        while True:
+            char = file.read(1)
+            if not char:
+                if row:
+                    rows.append(row[:])
+                break
+            elif char == "\n":
+                rows.append(row[:])
+                del row[:]
+            else:
+                row.append(char)
+    return rows
+
+
+def _rover_on_map(path):
+    # Loads the map and places the rover on it
+    rvr = make_rover()
+    rvr.change_map(path)
+    return rvr
+
+
+@benchmark
+def map_loading():
+    """Time and memory to load maps as lists of tiles and as a grid, read or mapped in memory, and to move a rover to them."""
+    print(f"{'map':10} {'how':12} {'load s':>8} {'MB':>8}")
+    loaders = {
+        "lists": _load_list_map,
+        "grid": grid.Grid.load,
+        "grid mmap": lambda path: grid.Grid.load(path, use_mmap=True),
+        "rover": _rover_on_map,
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [1024, 4096]:
+            path = pathlib.Path(directory, f"map{size}.txt")
+            generate_map(path, size)
+            for how, load in loaders.items():
+                load_time, _ = timed(load, path, repeat=1)
+                # Pages of a mapped file aren't allocated by python, they're counted as they're read
+                memory = _allocated(load, path)
+                print(f"{f'{size}x{size}':10} {how:12} {load_time:>8.3f} {memory / 1e6:>8.1f}")
+
+
+class WalkingSonarRover(rover.Rover):
+    """Rover counting the D tiles of the whole map on every sonar, like rovers used to."""
+
+    def sonar(self):
+        d_tiles = 0
+        for y in range(self.map.height):
+            for x in range(self.map.width):
+                if self.get_tile(x, y) == "D":
+                    d_tiles += 1
+        self.output.print(f"{self.name} found {d_tiles} scannable tiles")
+        return d_tiles
+
+
+def generate_sonar_program(n_iterations):
+    """Returns a loop reading the sonar and changing a tile in every iteration."""
+    return f"""{{
+    int i;
+    int found;
+    i = 0;
+    found = 0;
+    while ( i < {n_iterations} ) {{
+        found = found + rover . sonar;
+        rover . scan;
+        i = i + 1;
+    }}
+    print found;
+}}"""
+
+
+@benchmark
+def tile_counts():
+    """Run time of a loop using the sonar getter, counting the whole map every time and with kept counts."""
+    compiled = rover.BACKENDS["closure"](rover.check_program(generate_sonar_program(200)))
+    print(f"{'map':10} {'walk s':>8} {'counts s':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [64, 128, 256]:
+            path = pathlib.Path(directory, f"map{size}.txt")
+            generate_map(path, size)
+            times = []
+            outputs = []
+            for rover_class in [WalkingSonarRover, rover.Rover]:
+                def run():
+                    random.seed(0)
+                    rvr = rover_class(rover.ROVER_1)
+                    rvr.change_map(path)
+                    return run_quietly(compiled, rvr)
+                run_time, output = timed(run, repeat=1)
+                times.append(run_time)
+                outputs.append(output)
+            assert outputs[0] == outputs[1], f"sonar differs on the {size}x{size} map"
+            print(f"{f'{size}x{size}':10} {times[0]:>8.3f} {times[1]:>9.4f} {times[0] / times[1]:>7.0f}x")
+
+
+def _scan_nearest(grid_, tile, x, y):
+    # Nearest tile found by looking at every tile of the map, like without the index
+    found = [(abs(tx - x) + abs(ty - y), ty, tx) for tx, ty in grid_.positions(tile)]
+    if not found:
+        return None
+    _, ty, tx = min(found)
+    return tx, ty
+
+
+@benchmark
+def nearest_tiles():
+    """Time of nearest tile queries between random tile changes, scanning the map and with the tile index (built by the first one)."""
+    n_queries = 50
+    print(f"{'map':10} {'scan s':>8} {'index s':>8} {'build s':>8} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [256, 1024]:
+            path = pathlib.Path(directory, f"map{size}.txt")
+            generate_map(path, size)
+            times = []
+            results = []
+            for nearest in [_scan_nearest, grid.Grid.nearest]:
+                grid_ = grid.Grid.load(path)
+                random.seed(0)
+
+                def run():
+                    found = []
+                    for _ in range(n_queries):
+                        x, y = random.randrange(size), random.randrange(size)
+                        found.append(nearest(grid_, "G", x, y))
+                        grid_.set_tile(random.randrange(size), random.randrange(size), random.choice("G "))
+                    return found
+                run_time, found = timed(run, repeat=1)
+                times.append(run_time)
+                results.append(found)
+            assert results[0] == results[1], f"nearest differs on the {size}x{size} map"
+            build_time, _ = timed(lambda: grid.Grid.load(path).nearest("G", 0, 0), repeat=1)
+            print(f"{f'{size}x{size}':10} {times[0]:>8.3f} {times[1]:>8.4f} {build_time:>8.3f} "
+                  f"{times[0] / times[1]:>7.0f}x")
+
+
+class WalkingMoveRover(rover.Rover):
+    """Rover walking to the next blocking tile on every max_move, like rovers used to."""
+
+    def max_move(self, direction):
+        facing = self.tiles_around[direction]
+        steps = 0
+        while self.get_tile(self.x_pos + facing[0] * (steps + 1), self.y_pos + facing[1] * (steps + 1)) not in ['X', 'R']:
+            steps += 1
+        return steps
+
+
+def generate_probe_program(n_iterations, size):
+    """Returns a loop probing the four directions, moving towards the furthest one and shockwaving away from the border of a size x size map."""
+    return f"""{{
+    int i;
+    int d;
+    int best;
+    int probed;
+    i = 0;
+    while ( i < {n_iterations} ) {{
+        best = rover . max_move up;
+        d = 0;
+        probed = rover . max_move right;
+        if ( probed > best ) {{ best = probed; d = 1; }}
+        probed = rover . max_move down;
+        if ( probed > best ) {{ best = probed; d = 2; }}
+        probed = rover . max_move left;
+        if ( probed > best ) {{ best = probed; d = 3; }}
+        if ( d == 0 ) rover . move up best;
+        if ( d == 1 ) rover . move right best;
+        if ( d == 2 ) rover . move down best;
+        if ( d == 3 ) rover . move left best;
+        if ( rover . x_pos > 1 && rover . y_pos > 1 && rover . x_pos < {size - 2} && rover . y_pos < {size - 2} )
+            rover . shockwave;
+        i = i + 1;
+    }}
+    print rover . x_pos;
+    print rover . y_pos;
+}}"""
+
+
+@benchmark
+def move_probes():
+    """Run time of a loop probing max_move in every direction on open maps, walking to the blocking tiles and with the map's tables."""
+    print(f"{'map':10} {'walk s':>8} {'tables s':>9} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in [256, 1000]:
+            path = pathlib.Path(directory, f"map{size}.txt")
+            generate_map(path, size, tiles=" " * 500 + "XR")
+            compiled = rover.BACKENDS["closure"](rover.check_program(generate_probe_program(2000, size)))
+            times = []
+            outputs = []
+            for rover_class in [WalkingMoveRover, rover.Rover]:
+                def run():
+                    random.seed(0)
+                    rvr = rover_class(rover.ROVER_1)
+                    rvr.change_map(path)
+                    return run_quietly(compiled, rvr)
+                run_time, output = timed(run, repeat=1)
+                times.append(run_time)
+                outputs.append(output)
+            assert outputs[0] == outputs[1], f"moves differ on the {size}x{size} map"
+            print(f"{f'{size}x{size}':10} {times[0]:>8.3f} {times[1]:>9.4f} {times[0] / times[1]:>7.0f}x")
+
+
+class FormattingMapRover(rover.Rover):
+    """Rover printing its map from a list of tiles per row formatted one tile at a time, like rovers used to."""
+
+    def print_map(self, radius=None, diff=False):
+        output_map = [list(self.map.row(y)) for y in range(self.map.height)]
+        output_map[self.y_pos][self.x_pos] = "^>v<"[self.orientation]
+        self.output.print('\n'.join([''.join(['{:2}'.format(item) for item in row]) for row in output_map]))
+
+
+def _print_maps(rvr, n_prints, move, **options):
+    # Prints the map n_prints times, moving the rover one tile between them if move
+    rvr.output = output_sink.CaptureSink()
+    for _ in range(n_prints):
+        if move:
+            rvr.move(rvr.orientation, 1)
+        rvr.print_map(**options)
+    return rvr.output.getvalue()
+
+
+@benchmark
+def map_printing():
+    """Time to print a 1000x1000 map formatting every tile, and from the map's storage whole, around the rover and only the changed rows."""
+    n_prints = 10
+    cases = [
+        ("formatting", FormattingMapRover, False, {}),
+        ("whole", rover.Rover, False, {}),
+        ("radius 20", rover.Rover, False, {"radius": 20}),
+        ("formatting, moving", FormattingMapRover, True, {}),
+        ("diff, moving", rover.Rover, True, {"diff": True}),
+    ]
+    print(f"{'how':20} {'ms per print':>12} {'chars':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = pathlib.Path(directory, "map1000.txt")
+        generate_map(path, 1000)
+        outputs = {}
+        for how, rover_class, move, options in cases:
+            random.seed(0)
+            rvr = rover_class(rover.ROVER_1)
+            rvr.change_map(path)
+            run_time, output = timed(lambda: _print_maps(rvr, n_prints, move, **options), repeat=1)
+            outputs[how] = output
+            print(f"{how:20} {run_time / n_prints * 1000:>12.2f} {len(output) // n_prints:>10}")
+        assert outputs["formatting"] == outputs["whole"], "the maps printed differ"
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Available benchmarks:")
+        for name, func in BENCHMARKS.items():
+            print(f"    {name}: {func.__doc__}")
+        return
+
+    for name in sys.argv[1:]:
+        if name not in BENCHMARKS:
+            raise Exception(f"Unknown benchmark given: {name}")
+        print(f"== {name} ==")
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Delivers commands from main.py to a waiting rover.
+
+Each rover listens on a Unix domain socket next to its command file
+(Rover1.sock for Rover1.txt). main.py connects, sends the command and closes
+the connection, and the rover wakes up as soon as the connection comes in.
+
+The command file is kept as a fallback: when unix sockets aren't available,
+the socket can't be created or nobody listens on it, main.py writes the
+command to the file and the rover finds it the next time it checks the file
+(every poll_interval seconds).
+
+A command can start with a comment line asking for the limits to run it
+with, see add_budget(). It's still a valid program when it has one.
+"""
+
+import select
+import socket
+import time
+
+# Seconds to wait for a sender to finish sending its command
+RECEIVE_TIMEOUT = 5
+
+# Start of the first line of a command giving its run budget
+BUDGET_HEADER = "// budget"
+# Type of each limit in the header
+_BUDGET_LIMITS = {"max_steps": int, "max_seconds": float}
+
+
+def socket_path(command_file):
+    """Returns the path of the socket of the rover watching command_file."""
+    return command_file.with_suffix(".sock")
+
+
+def read_command_file(command_file):
+    """Returns the command in command_file ("" when empty) and empties the file."""
+    fcontent = None
+    with command_file.open(errors="replace") as f:  # like _receive, bad bytes fail to parse
+        fcontent = f.read()
+    if fcontent:
+        with command_file.open("w+") as f:
+            pass
+    return fcontent
+
+
+def add_budget(command, max_steps=None, max_seconds=None):
+    """Returns command with a first line asking the rover for these limits (None for its own)."""
+    limits = [
+        f"{name}={value}"
+        for name, value in [("max_steps", max_steps), ("max_seconds", max_seconds)]
+        if value is not None
+    ]
+    if not limits:
+        return command
+    return f"{BUDGET_HEADER} {' '.join(limits)}\n{command}"
+
+
+def split_budget(command):
+    """Returns (command, limits), limits has the max_steps and max_seconds the header asks for.
+
+    The header line is replaced by an empty one so line numbers don't change.
+    Raises ValueError for a limit that isn't a number.
+    """
+    first, newline, rest = command.partition("\n")
+    if not first.startswith(BUDGET_HEADER + " "):
+        return command, {}
+    limits = {}
+    for field in first[len(BUDGET_HEADER):].split():
+        name, _, value = field.partition("=")
+        if name in _BUDGET_LIMITS:
+            limits[name] = _BUDGET_LIMITS[name](value)
+    return newline + rest, limits
+
+
+def _open_socket(path):
+    # A socket left by a rover that didn't stop properly can't be bound again
+    if path.exists():
+        path.unlink()
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        listener.bind(str(path))
+        listener.listen()
+    except OSError:
+        listener.close()
+        raise
+    return listener
+
+
+def _receive(listener):
+    connection, _ = listener.accept()
+    with connection:
+        connection.settimeout(RECEIVE_TIMEOUT)
+        chunks = []
+        while True:
+            chunk = connection.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    # Bytes that aren't utf-8 become U+FFFD, which the lexer rejects, so a
+    # bad sender gets a failed command instead of stopping the rover
+    return b"".join(chunks).decode("utf-8", errors="replace")
+
+
+class CommandChannel:
+    """Where a rover waits for its commands, opened by the rover's process."""
+
+    def __init__(self, command_file, poll_interval=1.0, use_socket=True):
+        self.command_file = command_file
+        self.poll_interval = poll_interval
+        self.listener = None
+        self.socket_path = socket_path(command_file)
+
+        if use_socket and hasattr(socket, "AF_UNIX"):
+            try:
+                self.listener = _open_socket(self.socket_path)
+            except OSError:
+                self.listener = None  # ex: path too long for a socket, use the file only
+
+    def wait(self):
+        """Waits up to poll_interval seconds, returns the command received or "" if none."""
+        if self.listener is None:
+            time.sleep(self.poll_interval)
+            return read_command_file(self.command_file)
+
+        ready, _, _ = select.select([self.listener], [], [], self.poll_interval)
+        if ready:
+            try:
+                command = _receive(self.listener)
+            except OSError:
+                command = ""  # the sender went away, nothing to run
+            if command:
+                return command
+        return read_command_file(self.command_file)  # a command sent with the fallback
+
+    def close(self):
+        if self.listener is not None:
+            self.listener.close()
+            self.listener = None
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+
+
+def send_command(command_file, command):
+    """Sends the command to the rover watching command_file.
+
+    Returns "socket" when the rover got it right away, or "file" when it was
+    written to the command file for the rover to pick up.
+    """
+    if hasattr(socket, "AF_UNIX"):
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.connect(str(socket_path(command_file)))
+                connection.sendall(command.encode("utf-8"))
+            return "socket"
+        except OSError:
+            pass  # no rover listening, use the file
+
+    with command_file.open("w") as f:
+        f.write(command)
+    return "file"
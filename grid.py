@@ -0,0 +1,328 @@
+"""
+Map of a rover: a grid of tiles stored one byte per tile.
+
+The tiles are kept in a single buffer laid out like a map file, row after row
+with the end of line after every row: the first tile of row y is at
+y * stride and the row has width tiles. A file whose rows all have the same
+length is loaded as it is with one read, or mapped copy-on-write with
+load(path, use_mmap=True) so only the pages used are read and the rover's
+changes never reach the file. Other files (rows of different lengths, tiles
+that aren't ASCII) are read as text and their short rows padded with
+PADDING_TILE.
+
+count(tile) is kept up to date by set_tile() once it was asked for: the map
+is scanned the first time, after that it's a lookup. Tile types nobody asks
+about cost nothing.
+
+The same goes for where the tiles of a type are: nearest() indexes the type
+the first time it's asked for it, keeping the sorted columns of its tiles in
+every row, and set_tile() moves them from then on. nearest() then looks at
+the rows around the given tile only, positions() and sample() use the index
+when there is one and scan the map otherwise.
+
+free_tiles(x, y, direction) is how many tiles a rover can walk from (x, y)
+before a blocking tile or the edge of the map. The distances of the tiles of a
+row (right and left) or of a column (up and down) are kept in tables made the
+first time a tile of it is asked for, and set_tile() fixes the part of the row
+and of the column of a tile that stops or starts blocking: the tiles between
+the blocking tiles before and after it.
+"""
+
+import mmap
+import os
+import random
+from array import array
+from bisect import bisect_left, insort
+
+# Tile added at the end of the rows of a map shorter than its longest one
+PADDING_TILE = "X"
+
+# Tiles a rover can't move onto
+BLOCKING_TILES = "XR"
+
+# Tile of each byte
+_TILES = [chr(byte) for byte in range(256)]
+
+# 1 for the bytes of blocking tiles, 0 for the others, a table for bytes.translate()
+_BLOCKING = bytes(int(tile in BLOCKING_TILES) for tile in _TILES)
+
+
+def _layout(data):
+    """Returns (width, height, stride) of the map file in data when it can be used as is, None otherwise."""
+    size = len(data)
+    if size == 0:
+        return 0, 0, 1
+    width = data.find(b"\n")
+    if width < 0:  # one row without an end of line
+        width = size
+    newline = b"\n"
+    if width > 0 and data[width - 1] == ord("\r"):
+        width -= 1
+        newline = b"\r\n"
+    stride = width + len(newline)
+    height = -(-size // stride)  # the last row may not end with a newline
+    if width == 0 or size not in (height * stride, height * stride - len(newline)):
+        return None
+
+    for y in range(height):
+        start = y * stride
+        row = data[start:start + width]
+        if not row.isascii() or b"\n" in row or b"\r" in row:
+            return None
+        end = data[start + width:start + stride]
+        if end != newline and not (y == height - 1 and end == b""):
+            return None
+    return width, height, stride
+
+
+def _free_runs(line, typecode):
+    """Returns (after, before), how many tiles after and before every tile of line are free, up to a blocking one or the end."""
+    marks = line.translate(_BLOCKING)
+    after = array(typecode)
+    before = array(typecode)
+    start = 0  # first tile whose next blocking tile isn't known yet
+    previous = -1  # last blocking tile
+    blocking = marks.find(1)
+    while blocking >= 0:
+        after.extend(range(blocking - 1 - start, -1, -1))
+        before.extend(range(blocking - previous))
+        start = previous = blocking
+        blocking = marks.find(1, blocking + 1)
+    after.extend(range(len(line) - 1 - start, -1, -1))
+    before.extend(range(len(line) - 1 - previous))
+    return after, before
+
+
+def _change_run(after, before, i, blocking):
+    # Tile i of the line of the tables now blocks or not, fix the tiles seeing it
+    first = max(i - 1 - before[i], 0)  # blocking tile before i, or the start of the line
+    free = 0 if blocking else after[i] + 1  # after[] of the tile before i
+    after[first:i] = array(after.typecode, range(free + i - 1 - first, free - 1, -1))
+    last = min(i + 1 + after[i], len(after) - 1)  # blocking tile after i, or the end of the line
+    free = 0 if blocking else before[i] + 1  # before[] of the tile after i
+    before[i + 1:last + 1] = array(before.typecode, range(free, free + last - i))
+
+
+def _text_rows(text):
+    # Rows of a text file, ended by \n, \r\n or \r like when reading it in text mode
+    rows = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if rows[-1] == "":
+        rows.pop()  # after the last end of line
+    return rows
+
+
+class Grid:
+    """Tiles of a map, get_tile(x, y) is the tile in column x of row y, (0, 0) being the top left one."""
+
+    __slots__ = ("cells", "width", "height", "stride", "counts", "indexes", "row_runs", "column_runs")
+
+    def __init__(self, cells, width, height, stride):
+        self.cells = cells  # bytearray, or mmap copied on write
+        self.width = width
+        self.height = height
+        self.stride = stride
+        self.counts = [None] * 256  # tiles of each byte, None until counted
+        self.indexes = {}  # byte: sorted columns of its tiles in each row, for the bytes indexed
+        # (after, before) free tiles of each row and column, None until asked for, see free_tiles()
+        self.row_runs = [None] * height
+        self.column_runs = [None] * width
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Returns the grid of rows, strings of one character per tile."""
+        width = max(map(len, rows), default=0)
+        text = "".join(f"{row:{PADDING_TILE}<{width}}\n" for row in rows)
+        return cls(bytearray(text.encode("latin-1")), width, len(rows), width + 1)
+
+    @classmethod
+    def load(cls, path, use_mmap=False):
+        """Returns the grid of the map file at path, read with one read or mapped in memory."""
+        with open(path, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if use_mmap and size > 0:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+            else:
+                data = bytearray(size)
+                n_read = file.readinto(data)
+                del data[n_read:]
+
+        layout = _layout(data)
+        if layout is not None:
+            return cls(data, *layout)
+        text = bytes(data).decode("utf-8")
+        if isinstance(data, mmap.mmap):
+            data.close()
+        return cls.from_rows(_text_rows(text))
+
+    def _offset(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.stride + x
+        raise IndexError(f"Tile ({x}, {y}) is outside of the {self.width}x{self.height} map")
+
+    def _row_start(self, y):
+        if 0 <= y < self.height:
+            return y * self.stride
+        raise IndexError(f"Row {y} is outside of the {self.width}x{self.height} map")
+
+    def get_tile(self, x, y):
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return _TILES[self.cells[y * self.stride + x]]
+        raise IndexError(f"Tile ({x}, {y}) is outside of the {self.width}x{self.height} map")
+
+    def set_tile(self, x, y, tile):
+        offset = self._offset(x, y)
+        byte = ord(tile)
+        counts = self.counts
+        old_byte = self.cells[offset]
+        if old_byte == byte:
+            return
+        self.cells[offset] = byte
+        if counts[old_byte] is not None:
+            counts[old_byte] -= 1
+        if counts[byte] is not None:
+            counts[byte] += 1
+        if self.indexes:
+            rows = self.indexes.get(old_byte)
+            if rows is not None:
+                columns = rows[y]
+                del columns[bisect_left(columns, x)]
+            rows = self.indexes.get(byte)
+            if rows is not None:
+                insort(rows[y], x)
+        if _BLOCKING[old_byte] != _BLOCKING[byte]:
+            if self.row_runs[y] is not None:
+                _change_run(*self.row_runs[y], x, _BLOCKING[byte])
+            if self.column_runs[x] is not None:
+                _change_run(*self.column_runs[x], y, _BLOCKING[byte])
+
+    def row_view(self, y):
+        """Returns a view of the bytes of row y, which changes with the map."""
+        start = self._row_start(y)
+        return memoryview(self.cells)[start:start + self.width]
+
+    def row(self, y):
+        """Returns the tiles of row y as a string."""
+        start = self._row_start(y)
+        return self.cells[start:start + self.width].decode("latin-1")
+
+    def count(self, tile):
+        """Returns how many tiles of this type the map has."""
+        byte = ord(tile)
+        n_tiles = self.counts[byte]
+        if n_tiles is None:  # the first time, kept up to date from now on
+            n_tiles = self.counts[byte] = sum(
+                self.cells[y * self.stride:y * self.stride + self.width].count(byte)
+                for y in range(self.height)
+            )
+        return n_tiles
+
+    def _index(self, byte):
+        # Sorted columns of the tiles of byte in each row, built the first time
+        rows = self.indexes.get(byte)
+        if rows is None:
+            rows = []
+            for y in range(self.height):
+                start = y * self.stride
+                row = self.cells[start:start + self.width]
+                columns = array("l")
+                x = row.find(byte)
+                while x >= 0:
+                    columns.append(x)
+                    x = row.find(byte, x + 1)
+                rows.append(columns)
+            self.indexes[byte] = rows
+            self.counts[byte] = sum(map(len, rows))
+        return rows
+
+    def position(self, tile, index):
+        """Returns the (x, y) of the tile of this type with this index, counting row after row."""
+        byte = ord(tile)
+        rows = self.indexes.get(byte)
+        if rows is not None:
+            for y, columns in enumerate(rows):
+                if index < len(columns):
+                    return columns[index], y
+                index -= len(columns)
+            raise IndexError(f"The map has less tiles {tile!r} than {index}")
+        for y in range(self.height):
+            start = y * self.stride
+            row = self.cells[start:start + self.width]
+            n_found = row.count(byte)
+            if index < n_found:
+                x = row.find(byte)
+                for _ in range(index):
+                    x = row.find(byte, x + 1)
+                return x, y
+            index -= n_found
+        raise IndexError(f"The map has less tiles {tile!r} than {index}")
+
+    def positions(self, tile):
+        """Returns the (x, y) of every tile of this type, row after row."""
+        byte = ord(tile)
+        rows = self.indexes.get(byte)
+        if rows is not None:
+            return [(x, y) for y, columns in enumerate(rows) for x in columns]
+        found = []
+        for y in range(self.height):
+            start = y * self.stride
+            row = self.cells[start:start + self.width]
+            x = row.find(byte)
+            while x >= 0:
+                found.append((x, y))
+                x = row.find(byte, x + 1)
+        return found
+
+    def free_tiles(self, x, y, direction):
+        """Returns how many tiles from (x, y) towards direction (0 up, 1 right, 2 down, 3 left) aren't blocking.
+
+        Counts up to the first blocking tile or the edge of the map, not
+        including (x, y).
+        """
+        start = self._offset(x, y)
+        if direction % 2:  # right or left, in row y
+            runs = self.row_runs[y]
+            if runs is None:
+                typecode = "H" if self.width <= 0xFFFF else "I"
+                runs = self.row_runs[y] = _free_runs(self.cells[start - x:start - x + self.width], typecode)
+            return runs[direction == 3][x]
+        runs = self.column_runs[x]  # up or down, in column x
+        if runs is None:
+            typecode = "H" if self.height <= 0xFFFF else "I"
+            runs = self.column_runs[x] = _free_runs(self.cells[x:self.height * self.stride:self.stride], typecode)
+        return runs[direction == 0][y]
+
+    def sample(self, tile, rng=random):
+        """Returns the (x, y) of a tile of this type picked at random with rng.randrange()."""
+        return self.position(tile, rng.randrange(self.count(tile)))
+
+    def nearest(self, tile, x, y):
+        """Returns the (x, y) of the tile of this type nearest to (x, y), None if the map has none.
+
+        Distances are Manhattan distances, of the tiles as near the first one
+        row after row is returned.
+        """
+        byte = ord(tile)
+        rows = self._index(byte)
+        if self.counts[byte] == 0:
+            return None
+        best = None  # (distance, y, x) of the nearest tile found
+        for dy in range(max(y, self.height - 1 - y) + 1):
+            if best is not None and dy > best[0]:
+                break  # the tiles of the rows left are further
+            for row_y in (y - dy, y + dy) if dy else (y,):
+                if not 0 <= row_y < self.height:
+                    continue
+                columns = rows[row_y]
+                i = bisect_left(columns, x)
+                for column in columns[max(i - 1, 0):i + 1]:  # nearest on the left and on the right
+                    found = (abs(column - x) + dy, row_y, column)
+                    if best is None or found < best:
+                        best = found
+        return None if best is None else (best[2], best[1])
+
+    def __eq__(self, other):
+        if not isinstance(other, Grid):
+            return NotImplemented
+        return (self.width, self.height) == (other.width, other.height) and all(
+            self.row_view(y) == other.row_view(y) for y in range(self.height)
+        )
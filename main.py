@@ -1,31 +1,65 @@
 import pathlib
 import sys
 
-from rover import ROVER_COMMAND_FILES
+import command_channel
+import optimizer
+from rover import ROVER_COMMAND_FILES, check_program
+
+
+# Options limiting how long the rover runs the command, and the type of their value
+BUDGET_OPTIONS = {"--max-steps": ("max_steps", int), "--max-seconds": ("max_seconds", float)}
 
 
 def main():
     # Get the command from the file given and move it
     # to the file the rover is watching (default is Rover1)
+    # With --explain, show what the optimizer does to the program instead
+    # With --max-steps=N and --max-seconds=S, the rover stops the command after
+    # N loop iterations or S seconds instead of its own limits
+    args = []
+    explain = False
+    limits = {}
+    for arg in sys.argv:
+        option, _, value = arg.partition("=")
+        if arg == "--explain":
+            explain = True
+        elif option in BUDGET_OPTIONS:
+            name, to_number = BUDGET_OPTIONS[option]
+            try:
+                limits[name] = to_number(value)
+            except ValueError:
+                raise Exception(f"Expected a number for {option} but found: {value}")
+            if limits[name] <= 0:
+                raise Exception(f"Expected a positive number for {option} but found: {value}")
+        elif arg.startswith("--"):
+            raise Exception(f"Unknown option given: {arg}")
+        else:
+            args.append(arg)
     rover_name = "Rover1"
-    if len(sys.argv) < 2:
+    if len(args) < 2:
         raise Exception("Missing file path to parse.")
-    elif len(sys.argv) == 3:
-        rover_name = sys.argv[2]
+    elif len(args) == 3:
+        rover_name = args[2]
         if rover_name not in ROVER_COMMAND_FILES:
             raise Exception(f"Unknown rover name given: {rover_name}")
-    elif len(sys.argv) != 2:
-        raise Exception(f"Expected 2, or 3 arguments but found {len(sys.argv)}")
+    elif len(args) != 2:
+        raise Exception(f"Expected 2, or 3 arguments but found {len(args)}")
 
     fcontent = None
-    filepath = pathlib.Path(sys.argv[1])
+    filepath = pathlib.Path(args[1])
     with filepath.open() as f:
         fcontent = f.read()
 
-    with ROVER_COMMAND_FILES[rover_name].open("w") as f:
-        f.write(fcontent)
+    if explain:
+        parse_tree = check_program(fcontent, optimize=False)
+        print(optimizer.optimize(parse_tree).explain())
+        return
+
+    # Straight to the rover when it listens on its socket, through its command file otherwise
+    command = command_channel.add_budget(fcontent, **limits)
+    channel = command_channel.send_command(ROVER_COMMAND_FILES[rover_name], command)
 
-    print("Command sent successfully! See the rover for more details")
+    print(f"Command sent successfully through the {channel}! See the rover for more details")
 
 
 if __name__ == "__main__":
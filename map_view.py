@@ -0,0 +1,76 @@
+"""
+Text of a rover's map with the rover on it, what print_map() prints.
+
+Every tile takes two characters, the tile and a space, and every row ends
+with a newline. A MapView renders into a buffer it keeps between renders:
+the spaces and newlines are written when the size of the render changes, a
+render only copies the tiles of each row from the grid into it (one slice
+assignment per row) and puts the rover's glyph over its tile. Nothing is made
+per tile and the map isn't copied.
+
+With a radius, only the tiles at most radius tiles away from the rover
+(left, right, up and down) are rendered, cut by the edges of the map. With
+diff, only the rows that changed since the last render of the view are
+given, each one after its row number in the map; when the part of the map
+rendered changed (another map, or the rover moved with a radius), every row
+is given.
+"""
+
+# Glyph of the rover for each orientation: north, east, south and west
+ROVER_GLYPHS = b"^>v<"
+
+
+class MapView:
+    """Renders maps with the rover on them, keeping its buffers between renders."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.window = None  # (grid, left, top, columns, rows) rendered in buffer
+        self.previous = bytearray()  # last diff render
+        self.previous_window = None
+
+    def render(self, grid, x, y, orientation, radius=None, diff=False):
+        """Returns the text of grid with the rover at (x, y) facing orientation (0 north to 3 west)."""
+        left, top, right, bottom = 0, 0, grid.width, grid.height
+        if radius is not None:
+            left, top = max(x - radius, 0), max(y - radius, 0)
+            right, bottom = min(x + radius + 1, grid.width), min(y + radius + 1, grid.height)
+        columns, rows = right - left, bottom - top
+        line = 2 * columns + 1  # tiles, spaces and the newline
+
+        if diff:  # keep the last render to compare with
+            self.buffer, self.previous = self.previous, self.buffer
+            self.window, self.previous_window = self.previous_window, self.window
+        buffer = self.buffer
+        if self.window is None or self.window[3:] != (columns, rows):
+            buffer[:] = b" " * (line * rows)
+            buffer[line - 1::line] = b"\n" * rows
+        self.window = (grid, left, top, columns, rows)
+
+        cells = memoryview(grid.cells)
+        stride = grid.stride
+        for row in range(rows):
+            start = (top + row) * stride + left
+            buffer[row * line:row * line + 2 * columns:2] = cells[start:start + columns]
+        buffer[(y - top) * line + 2 * (x - left)] = ROVER_GLYPHS[orientation if orientation in (0, 1, 2) else 3]
+
+        if not diff:
+            return buffer.decode("latin-1")
+        return self._changed_rows(line)
+
+    def _changed_rows(self, line):
+        # Rows of buffer that aren't the same in previous, after their number
+        grid, left, top, columns, rows = self.window
+        previous_rows = range(0)  # rows of the map in previous, when rendered from the same columns
+        if self.previous_window is not None:
+            previous_grid, previous_left, previous_top, previous_columns, n_previous = self.previous_window
+            if previous_grid is grid and (previous_left, previous_columns) == (left, columns):
+                previous_rows = range(previous_top, previous_top + n_previous)
+        current = memoryview(self.buffer)
+        changed = []
+        for y in range(top, top + rows):
+            text = current[(y - top) * line:(y - top + 1) * line]
+            if y in previous_rows and self.previous.startswith(text, (y - previous_rows.start) * line):
+                continue  # same bytes, compared without copying them
+            changed.append(f"{y}: {text.tobytes().decode('latin-1')}")
+        return "".join(changed)
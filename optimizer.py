@@ -0,0 +1,577 @@
+"""
+Optimization pass run on the checked compact AST, before a backend compiles it.
+
+- Operators whose operands are all literals are folded into a literal. The
+  value is computed with the same python operators the backends use, so ints
+  stay ints, an int and a double give a double and / always gives a double.
+  A division by zero or a comparison of a number with a string is left in
+  the tree, it still raises when it runs.
+- && and || with a literal operand are reduced to the other operand, or to
+  the literal when it decides the result and SHORT_CIRCUIT is on.
+- if with a literal condition is replaced by the branch that runs, and
+  while ( false ) is removed.
+- Empty statements (;) are dropped from blocks.
+
+Then expressions are cached (ExpressionCaching):
+
+- Loop invariant code motion. Parts of a while loop (condition and body)
+  that give the same value on every iteration are evaluated once per time
+  the loop is entered. They are pure: literals and loads of variables that
+  aren't assigned or declared in the loop, never a rover getter.
+- Common subexpression elimination. An expression used more than once in a
+  statement (or in the condition of an if) is evaluated once per run of it.
+
+A cached expression becomes a CachedNode, evaluated the first time it runs
+and read from a slot after that, so an expression that raises still raises
+where it did and one that was skipped (short circuit, a loop that runs 0
+times) is still never evaluated. The slots are in the frame of a
+CacheBlockNode put around the loop or statement, variables inside it get
+their (depth, slot) addresses again.
+"""
+
+import pathlib
+import sys
+
+import parser
+import parser_components
+from parser_components import (
+    NonTerminals,
+    Token,
+    Vocab,
+    leaf,
+
+    StmtNode,
+    BlockNode,
+    LocNode,
+    ActionNode,
+    BinOpNode,
+    ChainNode,
+    UnaryOpNode,
+    LiteralNode,
+    LoadNode,
+    GetNode,
+    CacheBlockNode,
+    CachedNode,
+
+    constant_key,
+)
+
+
+class OptimizationStats:
+    """What the pass changed in a program."""
+
+    def __init__(self):
+        self.folded = 0  # operators replaced by their value
+        self.simplified = 0  # && and || reduced to one operand
+        self.dead_branches = 0  # if statements with a literal condition
+        self.dead_loops = 0  # while ( false ) statements
+        self.empty_statements = 0  # ; statements dropped
+        self.hoisted = 0  # loop invariant expressions evaluated once per loop
+        self.common = 0  # repeated expressions evaluated once per statement
+        self.nodes_before = 0
+        self.nodes_after = 0
+
+    def explain(self):
+        """Returns the statistics as text, one per line."""
+        return "\n".join([
+            f"constant expressions folded: {self.folded}",
+            f"&& and || simplified:        {self.simplified}",
+            f"dead if branches removed:    {self.dead_branches}",
+            f"dead while loops removed:    {self.dead_loops}",
+            f"empty statements dropped:    {self.empty_statements}",
+            f"loop invariants hoisted:     {self.hoisted}",
+            f"common subexpressions:       {self.common}",
+            f"nodes: {self.nodes_before} -> {self.nodes_after}",
+        ])
+
+
+def count_nodes(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.children)
+    return count
+
+
+def is_empty_statement(node):
+    if not isinstance(node, StmtNode):
+        return False
+    first = node.children[0]
+    return first.is_token and first.token.ttype == Vocab.SEMICOLON
+
+
+def empty_statement(token):
+    # Stands for a branch or loop body that was removed, where a statement is needed
+    return StmtNode(NonTerminals.STMT, [leaf(Token(";", Vocab.SEMICOLON, token.line, token.col))])
+
+
+def make_literal(value, token):
+    """Returns a LiteralNode holding value, at the position of token, or None when it can't be one."""
+    if isinstance(value, bool):
+        ttype, text = (Vocab.TRUE, "true") if value else (Vocab.FALSE, "false")
+    elif isinstance(value, int):
+        ttype, text = Vocab.NUM, str(value)
+    elif isinstance(value, float):
+        ttype, text = Vocab.REAL, repr(value)
+    else:
+        return None  # strings are left alone
+    literal = LiteralNode(Token(text, ttype, token.line, token.col))
+    literal.value = value
+    return literal
+
+
+class Optimizer:
+    def __init__(self):
+        self.stats = OptimizationStats()
+
+    def program(self, program):
+        self.stats.nodes_before = count_nodes(program)
+        program.children = [self.block(child) for child in program.children]
+        self.stats.nodes_after = count_nodes(program)
+        return self.stats
+
+    def block(self, node):
+        children = []
+        for child in node.children:
+            child = self.stmt(child)
+            if child is None:
+                continue
+            if is_empty_statement(child):
+                self.stats.empty_statements += 1
+                continue
+            children.append(child)
+        node.children = children
+        return node
+
+    # Returns the statement to use instead of node, or None when it never does anything
+    def stmt(self, node):
+        if isinstance(node, BlockNode):
+            return self.block(node)
+        if not isinstance(node, StmtNode):
+            return node  # declarations
+
+        first = node.children[0]
+        if isinstance(first, LocNode):
+            self.loc(first)
+            node.children[2] = self.expr(node.children[2])
+            return node
+
+        ttype = first.token.ttype
+        if ttype == Vocab.ROVER or ttype == Vocab.PRINT:
+            node.children[1] = self.expr(node.children[1])
+        elif ttype == Vocab.IF:
+            condition = node.children[1] = self.expr(node.children[1])
+            node.children[2] = self.branch(node.children[2], first.token)
+            if len(node.children) == 5:
+                node.children[4] = self.branch(node.children[4], first.token)
+            if isinstance(condition, LiteralNode):
+                self.stats.dead_branches += 1
+                if condition.value:
+                    return node.children[2]
+                return node.children[4] if len(node.children) == 5 else None
+        elif ttype == Vocab.WHILE:
+            condition = node.children[1] = self.expr(node.children[1])
+            if isinstance(condition, LiteralNode) and not condition.value:
+                self.stats.dead_loops += 1
+                return None
+            node.children[2] = self.branch(node.children[2], first.token)
+        return node
+
+    # A statement that must stay a statement, the body of an if or while
+    def branch(self, node, token):
+        stmt = self.stmt(node)
+        if stmt is None:
+            return empty_statement(token)
+        return stmt
+
+    def loc(self, loc):
+        # Array indices
+        indices = loc.children[1]
+        if indices.children:
+            indices.children = [self.expr(child) for child in indices.children]
+
+    # Returns the expression to use instead of node
+    def expr(self, node):
+        if isinstance(node, LoadNode):
+            self.loc(node.children[0])
+        elif isinstance(node, ActionNode):
+            node.children = [self.expr(child) for child in node.children]
+        elif isinstance(node, UnaryOpNode):
+            return self.unary(node)
+        elif isinstance(node, BinOpNode):
+            return self.binary(node)
+        elif isinstance(node, ChainNode):
+            return self.chain(node)
+        return node
+
+    def unary(self, node):
+        operand = node.children[0] = self.expr(node.children[0])
+        if not isinstance(operand, LiteralNode):
+            return node
+        if node.token.ttype == Vocab.NOT:
+            value = not operand.value
+        else:
+            value = -operand.value
+        return self.folded(node, value)
+
+    def binary(self, node):
+        left = node.children[0] = self.expr(node.children[0])
+        right = node.children[1] = self.expr(node.children[1])
+        left_is_literal = isinstance(left, LiteralNode)
+        right_is_literal = isinstance(right, LiteralNode)
+
+        if left_is_literal and right_is_literal:
+            if node.token.ttype == Vocab.DIV and right.value == 0:
+                return node  # raises at runtime
+            try:
+                value = node.op(left.value, right.value)
+            except TypeError:
+                return node  # `"a" < 1`, raises at runtime
+            return self.folded(node, value)
+
+        if node.short_circuit_on is None:
+            return node
+        # true && x, false || x, x && true and x || false are all x
+        if left_is_literal and bool(left.value) != node.short_circuit_on:
+            self.stats.simplified += 1
+            return right
+        if right_is_literal and bool(right.value) != node.short_circuit_on:
+            self.stats.simplified += 1
+            return left
+        # false && x and true || x don't need x, unless x must always run
+        if left_is_literal and parser_components.SHORT_CIRCUIT:
+            self.stats.simplified += 1
+            return left
+        return node
+
+    # Folds the literals the chain starts with into one
+    def chain(self, node):
+        node.children = [self.expr(child) for child in node.children]
+        n_folded = 0
+        value = node.children[0].value if isinstance(node.children[0], LiteralNode) else None
+        for op, func, operand in zip(node.ops, node.funcs, node.children[1:]):
+            if value is None or not isinstance(operand, LiteralNode):
+                break
+            if op.ttype == Vocab.DIV and operand.value == 0:
+                break  # raises at runtime
+            try:
+                value = func(value, operand.value)
+            except TypeError:
+                break  # `"a" < 1`, raises at runtime
+            n_folded += 1
+        if n_folded == 0:
+            return node
+        literal = make_literal(value, node.ops[0])
+        if literal is None:
+            return node
+        self.stats.folded += n_folded
+        if n_folded == len(node.ops):
+            return literal
+        node.children[n_folded:n_folded + 1] = [literal]
+        del node.children[:n_folded]
+        del node.ops[:n_folded]
+        del node.funcs[:n_folded]
+        return node
+
+    def folded(self, node, value):
+        literal = make_literal(value, node.token)
+        if literal is None:
+            return node
+        self.stats.folded += 1
+        return literal
+
+
+# Expressions not worth caching, reading the cache costs as much
+def is_trivial(expr):
+    if isinstance(expr, LoadNode):
+        return len(expr.children[0].children[1].children) == 0
+    return isinstance(expr, (LiteralNode, CachedNode))
+
+
+# (parent, index) of the expressions of a statement, not of the statements in it
+def expression_slots(stmt):
+    if not isinstance(stmt, StmtNode):
+        return []  # blocks and declarations
+    first = stmt.children[0]
+    if isinstance(first, LocNode):
+        indices = first.children[1]
+        return [(indices, i) for i in range(len(indices.children))] + [(stmt, 2)]
+    ttype = first.token.ttype
+    if ttype == Vocab.ROVER:
+        action = stmt.children[1]
+        if action.children[0].token.ttype == Vocab.MOVE:
+            return [(action, 2)]  # number of steps
+        return []
+    if ttype in (Vocab.PRINT, Vocab.IF, Vocab.WHILE):
+        return [(stmt, 1)]
+    return []  # empty statement
+
+
+# Statements directly in a statement: the children of a block, the branches of an if, the body of a while
+def sub_statements(stmt):
+    if isinstance(stmt, BlockNode):
+        return [(stmt, i) for i in range(len(stmt.children))]
+    if not isinstance(stmt, StmtNode) or isinstance(stmt.children[0], LocNode):
+        return []
+    ttype = stmt.children[0].token.ttype
+    if ttype == Vocab.IF:
+        return [(stmt, i) for i in range(2, len(stmt.children), 2)]
+    if ttype == Vocab.WHILE:
+        return [(stmt, 2)]
+    return []
+
+
+def is_loop(stmt):
+    return (
+        isinstance(stmt, StmtNode)
+        and stmt.children[0].is_token
+        and stmt.children[0].token.ttype == Vocab.WHILE
+    )
+
+
+# Node whose children are the operands of expr: the indices of a load, the
+# operands of an operator. None for literals, getters and cached expressions.
+def operands(expr):
+    if isinstance(expr, LoadNode):
+        return expr.children[0].children[1]
+    if isinstance(expr, (BinOpNode, ChainNode, UnaryOpNode)):
+        return expr
+    return None
+
+
+class _Caches:
+    """Cached expressions of one CacheBlockNode being built."""
+
+    def __init__(self):
+        self.slots = {}  # expression key -> slot
+        self.nodes = []  # CachedNodes, their address is set once the block is placed
+
+    def cache(self, expr, key):
+        slot = self.slots.setdefault(key, len(self.slots))
+        cached = CachedNode(expr, (0, slot))
+        self.nodes.append(cached)
+        return cached
+
+
+class ExpressionCaching:
+    """Loop invariant code motion and common subexpression elimination."""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.variables = {}  # LocNode -> (block, slot) of its variable
+        self.cache_blocks = {}  # CachedNode -> its CacheBlockNode
+
+    def program(self, program):
+        for child in program.children:
+            self.resolve(child, [])
+        program.children = [self.hoist(child) for child in program.children]
+        program.children = [self.eliminate(child) for child in program.children]
+        for child in program.children:
+            self.readdress(child, {})
+
+    # Finds the block of every variable, addresses are relative to the blocks
+    # around the variable which are about to change
+    def resolve(self, node, blocks):
+        if isinstance(node, BlockNode):
+            blocks.append(node)
+            for child in node.children:
+                self.resolve(child, blocks)
+            blocks.pop()
+            return
+        if isinstance(node, LocNode):
+            depth, slot = node.address
+            self.variables[node] = (blocks[-1 - depth], slot)
+        for child in node.children:
+            self.resolve(child, blocks)
+
+    # Gives every variable and cache its (depth, slot) address in the final tree
+    def readdress(self, node, levels):
+        if isinstance(node, BlockNode):
+            levels[node] = len(levels)
+            for child in node.children:
+                self.readdress(child, levels)
+            del levels[node]
+            return
+        if isinstance(node, LocNode):
+            block, slot = self.variables[node]
+            node.address = (len(levels) - 1 - levels[block], slot)
+        elif isinstance(node, CachedNode):
+            node.address = (len(levels) - 1 - levels[self.cache_blocks[node]], node.address[1])
+        for child in node.children:
+            self.readdress(child, levels)
+
+    def wrap(self, stmt, caches):
+        block = CacheBlockNode(stmt, len(caches.slots))
+        for cached in caches.nodes:
+            self.cache_blocks[cached] = block
+        return block
+
+    # Same key for expressions that always give the same value at the same
+    # point, None for the ones that don't (rover getters)
+    def key(self, expr):
+        if isinstance(expr, LiteralNode):
+            return constant_key(expr.value)
+        if isinstance(expr, CachedNode):
+            return self.key(expr.children[0])
+        if isinstance(expr, GetNode):
+            return None  # the rover moves
+        if isinstance(expr, LoadNode):
+            key = ("load", self.variables[expr.children[0]])
+        elif isinstance(expr, ChainNode):
+            key = ("chain",) + tuple(op.ttype for op in expr.ops)
+        else:
+            key = (expr.token.ttype,)
+        for operand in operands(expr).children:  # a load or an operator
+            operand_key = self.key(operand)
+            if operand_key is None:
+                return None
+            key += (operand_key,)
+        return key
+
+    # LOOP INVARIANT CODE MOTION
+
+    # Returns the statement to use instead of stmt, loops are wrapped in the
+    # block caching their invariants, outer loops first
+    def hoist(self, stmt):
+        if is_loop(stmt):
+            caches = _Caches()
+            variant = set()
+            inner_blocks = set()
+            self.find_variant(stmt, variant, inner_blocks)
+            self.hoist_invariants(stmt, caches, variant, inner_blocks)
+            stmt.children[2] = self.hoist(stmt.children[2])
+            if caches.slots:
+                self.stats.hoisted += len(caches.slots)
+                return self.wrap(stmt, caches)
+            return stmt
+
+        for parent, i in sub_statements(stmt):
+            parent.children[i] = self.hoist(parent.children[i])
+        return stmt
+
+    # Variables assigned in the loop and blocks declaring the loop's own variables
+    def find_variant(self, stmt, variant, inner_blocks):
+        if isinstance(stmt, BlockNode):
+            inner_blocks.add(stmt)
+        elif isinstance(stmt, StmtNode) and isinstance(stmt.children[0], LocNode):
+            variant.add(self.variables[stmt.children[0]])
+        for parent, i in sub_statements(stmt):
+            self.find_variant(parent.children[i], variant, inner_blocks)
+
+    # Caches the largest invariant expressions of every statement in the loop
+    def hoist_invariants(self, stmt, caches, variant, inner_blocks):
+        for parent, i in expression_slots(stmt):
+            expr = parent.children[i]
+            if self.invariant_parts(expr, caches, variant, inner_blocks) and not is_trivial(expr):
+                parent.children[i] = caches.cache(expr, self.key(expr))
+        for parent, i in sub_statements(stmt):
+            self.hoist_invariants(parent.children[i], caches, variant, inner_blocks)
+
+    # Returns whether expr is invariant, when it isn't its invariant operands
+    # are cached instead
+    def invariant_parts(self, expr, caches, variant, inner_blocks):
+        parent = operands(expr)
+        if parent is None:
+            return not isinstance(expr, GetNode)  # literals and cached expressions are
+
+        invariant = True
+        if isinstance(expr, LoadNode):
+            block, slot = self.variables[expr.children[0]]
+            invariant = (block, slot) not in variant and block not in inner_blocks
+
+        invariant_operands = [
+            self.invariant_parts(child, caches, variant, inner_blocks)
+            for child in parent.children
+        ]
+        if invariant and all(invariant_operands):
+            return True
+        for i, operand_invariant in enumerate(invariant_operands):
+            child = parent.children[i]
+            if operand_invariant and not is_trivial(child):
+                parent.children[i] = caches.cache(child, self.key(child))
+        return False
+
+    # COMMON SUBEXPRESSION ELIMINATION
+
+    # Returns the statement to use instead of stmt, statements repeating an
+    # expression are wrapped in the block caching it
+    def eliminate(self, stmt):
+        for parent, i in sub_statements(stmt):
+            parent.children[i] = self.eliminate(parent.children[i])
+        # The condition of a while runs many times per run of the statement,
+        # a cache of the whole loop would keep values of the first iteration
+        if not isinstance(stmt, StmtNode) or is_loop(stmt):
+            return stmt
+
+        counts = {}
+        for parent, i in expression_slots(stmt):
+            self.count(parent.children[i], counts)
+        if all(count < 2 for count in counts.values()):
+            return stmt
+
+        occurrences = {}  # key -> [(parent, index), ...]
+        for parent, i in expression_slots(stmt):
+            self.find_common(parent, i, counts, occurrences)
+        caches = _Caches()
+        for key, places in occurrences.items():
+            if len(places) < 2:
+                continue  # the others are in a larger common expression
+            for parent, i in places:
+                parent.children[i] = caches.cache(parent.children[i], key)
+        if not caches.slots:
+            return stmt
+        self.stats.common += len(caches.slots)
+        return self.wrap(stmt, caches)
+
+    # Counts the non trivial pure expressions in expr by key
+    def count(self, expr, counts):
+        parent = operands(expr)
+        if parent is not None:
+            for operand in parent.children:
+                self.count(operand, counts)
+        if not is_trivial(expr):
+            key = self.key(expr)
+            if key is not None:
+                counts[key] = counts.get(key, 0) + 1
+
+    # Finds the largest expressions used more than once
+    def find_common(self, parent, i, counts, occurrences):
+        expr = parent.children[i]
+        if not is_trivial(expr):
+            key = self.key(expr)
+            if counts.get(key, 0) > 1:
+                occurrences.setdefault(key, []).append((parent, i))
+                return
+        parent = operands(expr)
+        if parent is not None:
+            for j in range(len(parent.children)):
+                self.find_common(parent, j, counts, occurrences)
+
+
+def optimize(parse_tree, cache_expressions=True):
+    """Optimizes a lowered and checked parse tree in place, returns the OptimizationStats.
+
+    cache_expressions=False leaves out loop invariant code motion and common
+    subexpression elimination.
+    """
+    stats = Optimizer().program(parse_tree)
+    if cache_expressions:
+        ExpressionCaching(stats).program(parse_tree)
+        stats.nodes_after = count_nodes(parse_tree)
+    return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise Exception("Expected the path of the file to optimize.")
+
+    fcontent = None
+    filepath = pathlib.Path(sys.argv[1])
+    with filepath.open() as f:
+        fcontent = f.read()
+
+    program = parser.get_parse_tree(fcontent).lower()
+    program.check()
+    print(optimize(program).explain())
@@ -0,0 +1,95 @@
+"""
+Where the output of a rover goes: what the print statements of its programs
+print, and the messages of the rover itself.
+
+Every rover writes to its sink (Rover.output) instead of calling print(), so
+how the output is written can be chosen for each rover:
+    StdoutSink      writes every line to sys.stdout right away, like print()
+    BufferedSink    keeps the lines and writes them to the stream in blocks,
+                    once there are buffer_size characters or the first one
+                    waited max_delay seconds, and when flushed
+    CaptureSink     keeps everything in memory, for the caller to read
+
+The delay of a BufferedSink is checked when text is written, a sink doesn't
+write on its own: the rover flushes it at the end of every command and
+before waiting for the next one.
+"""
+
+import sys
+import time
+
+# Characters a BufferedSink keeps before writing them
+DEFAULT_BUFFER_SIZE = 64 * 1024
+# Seconds a BufferedSink keeps text before writing it, at most
+DEFAULT_FLUSH_DELAY = 0.1
+
+
+class OutputSink:
+    """Base of the sinks, subclasses write text somewhere."""
+
+    def write(self, text):
+        raise NotImplementedError
+
+    def print(self, *values, sep=" ", end="\n"):
+        """Writes the values like print() does."""
+        self.write(sep.join(map(str, values)) + end)
+
+    def flush(self):
+        pass
+
+
+class StdoutSink(OutputSink):
+    """Writes to sys.stdout as it is when writing, so redirecting stdout redirects the sink too."""
+
+    def write(self, text):
+        sys.stdout.write(text)
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+class BufferedSink(OutputSink):
+    """Writes to stream (sys.stdout when None) in blocks of buffer_size characters or every max_delay seconds."""
+
+    def __init__(self, stream=None, buffer_size=DEFAULT_BUFFER_SIZE, max_delay=DEFAULT_FLUSH_DELAY):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.max_delay = max_delay
+        self.chunks = []
+        self.size = 0  # characters in chunks
+        self.deadline = None  # when the oldest of chunks must be written
+        self.n_flushes = 0  # writes to the stream
+
+    def write(self, text):
+        self.chunks.append(text)
+        self.size += len(text)
+        if self.size >= self.buffer_size:
+            self.flush()
+        elif self.deadline is None:
+            self.deadline = time.monotonic() + self.max_delay
+        elif time.monotonic() >= self.deadline:
+            self.flush()
+
+    def flush(self):
+        if not self.chunks:
+            return
+        stream = sys.stdout if self.stream is None else self.stream
+        stream.write("".join(self.chunks))
+        stream.flush()
+        self.chunks.clear()
+        self.size = 0
+        self.deadline = None
+        self.n_flushes += 1
+
+
+class CaptureSink(OutputSink):
+    """Keeps the text in memory, getvalue() returns all of it."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, text):
+        self.chunks.append(text)
+
+    def getvalue(self):
+        return "".join(self.chunks)
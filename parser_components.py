@@ -1,1349 +1,2253 @@
-import enum
-
-
-# Stack helper class
-class Stack:
-    def __init__(self):
-        self.arr = []
-
-    def push(self, value):
-        self.arr.append(value)
-
-    def pop(self):
-        self.arr.pop()
-
-    # Returns the top of the stack or an index
-    def top(self, i=0):
-        if i >= len(self.arr):
-            raise Exception
-
-        return self.arr[-1 * i - 1]
-
-    # Checks if the name is in one of the open scopes
-    def check_open_scopes(self, name):
-        # Reverse array to get the innermost scope first
-        for d in self.arr[::-1]:
-            if name in d:
-                return True
-
-        return False
-
-    # Returns info about the first name found in the open scopes
-    def get_name(self, name):
-        # Reverse array to get the innermost scope first
-        for d in self.arr[::-1]:
-            if name in d:
-                return d[name]
-        raise UndefinedVariableError(name)  # Error if found nothing
-
-    # Assign a value to a variable in open scopes
-    def assign(self, obj, value):
-        name = obj['name']  # name of the variable
-        ttype = obj['ttype']  # type of the variable (used for int casting)
-        if ttype == 'int':  # cast to int cuz we might get a double from python division
-            value = int(value)
-
-        if len(obj['arr_info']) == 0:  # if not dealing with an array
-            # Reverse array to get the innermost scope first
-            for d in self.arr[::-1]:
-                if name in d:
-                    d[name]['value'] = value
-                    break
-        else:  # dealing with an array
-            instance = []
-            # Reverse array to get the innermost scope first
-            for d in self.arr[::-1]:  # first get the full array (stored in scope)
-                if name in d:
-                    instance = d[name]['value']  # get the n-d array
-                    break
-
-            # arr_info is [i, j, k] where i, j, k are the indices to check when calling arr[i][j][k]
-            for i in obj['arr_info'][0:-1]:  # get selected innermost arrays until we get a 1-d array
-                instance = instance[i]
-
-            # Change its value at selected index, this changes the value in the scope as well
-            instance[obj['arr_info'][-1]] = value
-
-
-# Store scopes in a stack where the top scope
-# is the innermost scope.
-# When we get out of a scope we pop it
-SCOPE_STACK = Stack()
-
-
-class TypeMismatchError(Exception):
-    def __init__(self, expected, t, extra=None):
-        self.expected = expected
-        self.type = t
-        self.extra = extra
-        global SCOPE_STACK
-        SCOPE_STACK = Stack()
-
-    def __str__(self):
-        if self.extra is not None:
-            return f"[SEMANTIC ERROR]: expected '{self.expected}' but got '{self.type}' instead.\n {self.extra}"
-        return f"[SEMANTIC ERROR]: expected '{self.expected}' but got '{self.type}' instead."
-
-
-class UndefinedVariableError(Exception):
-    def __init__(self, name):
-        self.name = name
-        global SCOPE_STACK
-        SCOPE_STACK = Stack()
-
-    def __str__(self):
-        return f'[SEMANTIC ERROR]: variable {self.name} is undefined or out of scope.'
-
-
-class RedefinedVariableError(Exception):
-    def __init__(self, name):
-        self.name = name
-        global SCOPE_STACK
-        SCOPE_STACK = Stack()
-
-    def __str__(self):
-        return f'[SEMANTIC ERROR]: variable {self.name} is defined more than once.'
-
-
-class Vocab(enum.Enum):
-    EOS = ""
-    OPEN_PAREN = "("
-    CLOSE_PAREN = ")"
-    OPEN_BRACE = "{"
-    CLOSE_BRACE = "}"
-    OPEN_SQPAR = "["
-    CLOSE_SQPAR = "]"
-    IF = "if"
-    ELSE = "else"
-    WHILE = "while"
-    ID = "id"
-    AND = "&&"
-    OR = "||"
-    ASSIGN = "="
-    EQ = "=="
-    NEQ = "!="
-    LTEQ = "<="
-    GTEQ = ">="
-    LT = "<"
-    GT = ">"
-    PLUS = "+"
-    MINUS = "-"
-    NUM = "integer"
-    REAL = "float"
-    STRING = "string"
-    TRUE = "true"
-    FALSE = "false"
-    NOT = "!"
-    MUL = "*"
-    DIV = "/"
-    BASIC = "basic"
-    SEMICOLON = ";"
-
-    PRINT = "print"
-    DOT = "."
-    ROVER = "rover"
-
-    ORIENTATION = "orientation"
-    X_POS = "x_pos"
-    Y_POS = "y_pos"
-    GOLD = "gold"
-    SILVER = "silver"
-    COPPER = "copper"
-    IRON = "iron"
-    POWER = "power"
-    MAX_MOVE = "max_move"
-    CAN_MOVE = "can_move"
-
-    SCAN = "scan"
-    DRILL = "drill"
-    SHOCKWAVE = "shockwave"
-    BUILD = "build"
-    SONAR = "sonar"
-    PUSH = "push"
-    RECHARGE = "recharge"
-    BACKFLIP = "backflip"
-    PRINT_INVENTORY = "print_inventory"
-    PRINT_MAP = "print_map"
-    PRINT_POS = "print_pos"
-    PRINT_ORIENTATION = "print_orientation"
-    CHANGE_MAP = "change_map"
-    MOVE = "move"
-    TURN = "turn"
-
-    UP = "up"
-    DOWN = "down"
-    LEFT = "left"
-    RIGHT = "right"
-
-
-class NonTerminals(enum.Enum):
-    TERMINAL = 0
-    PROGRAM = 1
-    BLOCK = 2
-    DECLS = 3
-    DECL = 4
-    TYPE = 5
-    TYPECL = 6
-    STMT = 28
-    STMTS = 7
-    LOC = 8
-    LOCCL = 9
-    BOOL = 10
-    BOOLCL = 11
-    JOIN = 12
-    JOINCL = 13
-    EQUALITY = 14
-    EQUALCL = 15
-    REL = 16
-    RELTAIL = 17
-    EXPR = 18
-    EXPRCL = 19
-    TERM = 20
-    TERMCL = 21
-    UNARY = 22
-    FACTOR = 23
-
-    GET = 24
-    ACTION = 25
-    DIRECTION = 26
-    ROTATION = 27
-
-
-class Token:
-    def __init__(self, value=0, ttype=Vocab.EOS):
-        self.value = value
-        self.ttype = ttype
-
-    def __eq__(self, other_token):
-        return self.value == other_token.value
-
-    def __hash__(self):
-        return hash(self.value)
-
-
-class Node:
-    def __init__(self, token):
-        self.token = token
-        self.children = []
-
-    @property
-    def is_token(self):
-        return isinstance(self.token, Token)
-
-    @property
-    def is_nonterminal(self):
-        return not self.is_token
-
-    def add_child(self, node):
-        self.children.append(node)
-
-    # Method to print the tree in XML like fashion
-    def print(self, indent=0):
-        symbol = self.print_val()
-        if self.is_nonterminal:
-            print(f"{' ' * indent} < {symbol} >")
-        else:
-            print(f"{' ' * indent} < {symbol} >")
-        for child in self.children:
-            child.print(indent=indent+2)
-        if self.is_nonterminal:
-            print(f"{' ' * indent} </ {symbol} >")
-
-    # Method to print the tree in a tree like fashion
-    def show(self, level_markers=None):
-        if level_markers is None:
-            level_markers = []
-
-        marker_str = '+--  '
-        empty_str = '     '
-        conn_string = '|    '
-
-        current_level = len(level_markers)
-        mapper = lambda draw: conn_string if draw else empty_str
-        # Map the lambda to an array of booleans which tells us which string to print
-        # We print the conn_string if true because this node is not the last child if it is the case
-        markers = "".join(map(mapper, level_markers[:-1]))
-        markers += marker_str if current_level > 0 else ""
-        print(markers, end='')
-        if not self.is_nonterminal:
-            print(self.token.value)
-        else:
-            print(self.print_val())
-
-        # Call show() recursively on each of its children
-        for i, child in enumerate(self.children):
-            is_last = i == len(self.children) - 1
-            child.show([*level_markers, not is_last])
-
-    def print_val(self):
-        if not self.is_nonterminal:
-            return self.token.value
-        return self.print_nonterminal()
-
-    def print_nonterminal(self):
-        if self.token == NonTerminals.PROGRAM:
-            return "program"
-        elif self.token == NonTerminals.BLOCK:
-            return "block"
-        elif self.token == NonTerminals.DECLS:
-            return "decls"
-        elif self.token == NonTerminals.DECL:
-            return "decl"
-        elif self.token == NonTerminals.TYPE:
-            return "type"
-        elif self.token == NonTerminals.TYPECL:
-            return "typecl"
-        elif self.token == NonTerminals.STMTS:
-            return "stmts"
-        elif self.token == NonTerminals.STMT:
-            return "stmt"
-        elif self.token == NonTerminals.LOC:
-            return "loc"
-        elif self.token == NonTerminals.LOCCL:
-            return "loccl"
-        elif self.token == NonTerminals.BOOL:
-            return "bool"
-        elif self.token == NonTerminals.BOOLCL:
-            return "boolcl"
-        elif self.token == NonTerminals.JOIN:
-            return "join"
-        elif self.token == NonTerminals.JOINCL:
-            return "joincl"
-        elif self.token == NonTerminals.EQUALITY:
-            return "equality"
-        elif self.token == NonTerminals.EQUALCL:
-            return "equalitycl"
-        elif self.token == NonTerminals.REL:
-            return "rel"
-        elif self.token == NonTerminals.RELTAIL:
-            return "reltail"
-        elif self.token == NonTerminals.EXPR:
-            return "expr"
-        elif self.token == NonTerminals.EXPRCL:
-            return "exprcl"
-        elif self.token == NonTerminals.TERM:
-            return "term"
-        elif self.token == NonTerminals.TERMCL:
-            return "termcl"
-        elif self.token == NonTerminals.UNARY:
-            return "unary"
-        elif self.token == NonTerminals.FACTOR:
-            return "factor"
-
-        # Rover non-terminals
-        elif self.token == NonTerminals.DIRECTION:
-            return "direction"
-        elif self.token == NonTerminals.ROTATION:
-            return "rotation"
-        elif self.token == NonTerminals.ACTION:
-            return "action"
-        elif self.token == NonTerminals.GET:
-            return "get"
-        else:
-            return "__UNKNOWN__"
-
-    def check_semantics(self):
-        for child in self.children:
-            child.check_semantics()
-
-
-'''
-When check_semantics() returns somthing it is a dictionary with the following information:
-{
-    'ttype': t,
-    'is_array': bool,
-    'dim': 0..*,        # if we have an array this is the dimension of the array
-    'value': None
-}
-
-access dict key with:
-    dict['key_name']
-'''
-
-
-class ProgramNode(Node):
-    pass
-
-
-# <block>    ::= { <decls> <stmts> }
-class BlockNode(Node):
-    def check_semantics(self):
-        global SCOPE_STACK
-        # Add a new scope to the stack since a new block is found
-        SCOPE_STACK.push({})
-
-        for child in self.children:
-            child.check_semantics()
-
-        # Pop the stack once we get out of the scope
-        SCOPE_STACK.pop()
-
-    def run(self, rover):
-        global SCOPE_STACK
-        SCOPE_STACK.push({})  # create a new scope
-
-        self.children[0].run(rover)
-        self.children[1].run(rover)
-
-        SCOPE_STACK.pop()  # remove scope when done
-
-
-# <decl>     ::= <type> ID ;
-class DeclNode(Node):
-    def check_semantics(self):
-        type_info = self.children[0].check_semantics()
-        name = self.children[1].token.value  # name of ID
-
-        # If the name already exist in current scope raise error
-        if name in SCOPE_STACK.top():
-            raise RedefinedVariableError(name)
-        # Add variable to symbol table
-        SCOPE_STACK.top()[name] = type_info
-
-    def run(self, rover):
-        type_obj = self.children[0].run(rover)  # get type info (array information as well)
-        name = self.children[1].token.value  # get var name
-
-        global SCOPE_STACK
-        SCOPE_STACK.top()[name] = type_obj  # add variable to scope
-
-
-# <decls>    ::= e
-#              | <decl> <decls>
-class DeclsNode(Node):
-    def check_semantics(self):
-        for child in self.children:
-            # Stops checking when a node has no children
-            child.check_semantics()
-
-    def run(self, rover):
-        for child in self.children:
-            # Stops checking when a node has no children
-            child.run(rover)
-
-
-# <type>     ::= BASIC <typecl>
-class TypeNode(Node):
-    def check_semantics(self):
-        ttype = self.children[0].token.value  # variable type
-        type_info = self.children[1].check_semantics()  # returns info on if it is an array or not
-        type_info['ttype'] = ttype
-
-        return type_info
-
-    def run(self, rover):
-        ttype = self.children[0].token.value  # get the type
-        arr_info = self.children[1].run(rover)  # info about dealing with arrays
-
-        if arr_info is None:  # not dealing with an array
-            return {
-                'ttype': ttype,
-                'value': None
-            }
-
-        return {  # dealing with array
-            'ttype': ttype,
-            # arr_info is an array [i, j, k, ...] where i j k are the length for each subarray respectively
-            # ex: int [ i ] [ j ] [ k ] array ; -> [i, j, k]
-            'value': arr_info  # if we have an array we initialize it with an array of correct size of None values
-        }
-
-
-# <typecl>   ::= e
-#              | [ NUM ] <typecl>
-class TypeclNode(Node):
-    def check_semantics(self):
-        # If there is children then we are dealing with an array
-        # Check for NUM is done when parsing
-        if len(self.children) > 0:
-            type_info = self.children[1].check_semantics()  # Info on dim > 1 arrays
-            type_info['dim'] = type_info['dim'] + 1  # Add a dimension every iteration
-            type_info['is_arr'] = True  # Set is_arr flag to true
-            return type_info
-
-        # No children then just basic type, this is the base case
-        return {
-            'ttype': None,
-            'is_arr': False,
-            'dim': 0,
-            'val': None
-        }
-
-    def run(self, rover):
-        # If no children then empty
-        if len(self.children) == 0:
-            return None
-
-        length = int(self.children[0].token.value)  # length of current array to create
-        val = self.children[1].run(rover)  # get the value to put in the array (either None or a subarray of None)
-        ret = []  # array to return
-
-        for i in range(length):  # fill ret with the value found length times
-            if val is None:
-                ret.append(None)
-            else:
-                ret.append(val[:])  # copy the array so we don't have the same instance for each sub arrays
-        return ret
-
-
-# <stmt>     ::= ;
-#              | <loc> = <bool> ;
-#              | ROVER . <action> ;
-#              | PRINT <bool> ;
-#              | IF ( <bool> ) <stmt>
-#              | IF ( <bool> ) <stmt> ELSE <stmt>
-#              | WHILE ( <bool> ) <stmt>
-#              | <block>
-class StmtNode(Node):
-    def check_semantics(self):
-        # If there is a loc node
-        if isinstance(self.children[0], LocNode):
-            symbol = self.children[0].check_semantics()  # Returns info from symbol table
-            type_info = self.children[2].check_semantics()  # Info on the assignment type
-            # If types don't match OR the symbol is an array then we cannot assign the value
-            if (
-                    not (
-                            symbol['ttype'] == type_info['ttype']
-                            or (symbol['ttype'] == 'double' and type_info['ttype'] == 'int')
-                    )
-                    or symbol['is_arr']
-            ):
-                raise TypeMismatchError(symbol['ttype'], type_info['ttype'])
-
-        # If we have a block node
-        elif isinstance(self.children[0], BlockNode):
-            self.children[0].check_semantics()  # Just evaluate the block semantics
-
-        elif self.children[0].token.ttype == Vocab.ROVER:
-            self.children[1].check_semantics()  # Just evaluate the action semantics
-
-        elif self.children[0].token.ttype == Vocab.PRINT:
-            self.children[1].check_semantics()  # Just evaluate the bool semantics
-
-        # for an IF or WHILE token:
-        elif self.children[0].token.ttype in [Vocab.IF, Vocab.WHILE]:
-            # Make sure the condition in the statement is of type bool
-            cond_info = self.children[1].check_semantics()
-            if cond_info['ttype'] != 'bool':
-                raise TypeMismatchError('bool', cond_info['ttype'], "condition must be a boolean.")
-
-            # Evaluate the stmt nodes
-            self.children[2].check_semantics()
-            if len(self.children) == 5:  # if we have an ELSE stmt
-                self.children[4].check_semantics()
-
-    def run(self, rover):
-        # If loc node
-        if isinstance(self.children[0], LocNode):
-            name_obj = self.children[0].run(rover)  # get info about variable
-            bool_obj = self.children[2].run(rover)  # evaluate the bool stmt
-
-            global SCOPE_STACK
-            SCOPE_STACK.assign(name_obj, bool_obj)  # assign the value to the correct variable in scope
-
-        # If block node
-        elif isinstance(self.children[0], BlockNode):
-            self.children[0].run(rover)  # Just run the block
-
-        # If rover action
-        elif self.children[0].token.ttype == Vocab.ROVER:
-            self.children[1].run(rover)  # Just run the rover action()
-
-        # If print
-        elif self.children[0].token.ttype == Vocab.PRINT:
-            bool_obj = self.children[1].run(rover)  # eval the bool
-            print(bool_obj)  # print the value
-
-        # If stmt
-        elif self.children[0].token.ttype == Vocab.IF:
-            bool_obj = self.children[1].run(rover)  # eval the bool
-            if bool_obj:  # if true then run the first stmt
-                self.children[2].run(rover)
-            elif len(self.children) == 5:  # else if we have an else then run the second stmt
-                self.children[4].run(rover)
-
-        # If while
-        elif self.children[0].token.ttype == Vocab.WHILE:
-            while self.children[1].run(rover):  # keep going
-                self.children[2].run(rover)  # keep running the stmt
-
-
-# <stmts>    ::= e
-#              | <stmt> <stmts>
-class StmtsNode(Node):
-    def check_semantics(self):
-        for child in self.children:
-            # Stops checking when a node has no children
-            child.check_semantics()
-
-    def run(self, rover):
-        for child in self.children:
-            # Stops checking when a node has no children
-            child.run(rover)
-
-
-# <loc>      ::= ID <loccl>
-class LocNode(Node):
-    def check_semantics(self):
-        name = self.children[0].token.value  # name of variable for assignment
-
-        # Check if the name is found in the open scopes
-        global SCOPE_STACK
-        if not SCOPE_STACK.check_open_scopes(name):
-            raise UndefinedVariableError(name)
-
-        # Handle array types
-        # Can only assign to a basic type
-        # So can only assign to the deepest subarray of arrays
-        symbol = SCOPE_STACK.get_name(name)  # Get info from symbol table
-        type_info = self.children[1].check_semantics()  # Check if we ask for an array index
-        type_dim = symbol['dim'] - type_info['dim']  # Gets the dimension of the assignment
-        if type_dim < 0:
-            # If negative then we asked for higher dimension than the array has
-            raise TypeMismatchError('Basic type', 'Array type', extra='Wrong array subscript')
-        is_arr = True if type_dim > 0 else False  # if type_dim is 0 then it is a basic type
-
-        return {
-            'ttype': symbol['ttype'],
-            'is_arr': is_arr,
-            'dim': type_dim,
-            'value': None
-        }
-
-    def run(self, rover):
-        global SCOPE_STACK
-        name = self.children[0].token.value
-        obj = SCOPE_STACK.get_name(name)  # get variable from stack
-
-        # arr_info is [i, j, k] where i, j, k are the indices to check when calling arr[i][j][k]
-        arr_info = self.children[1].run(rover)  # check if it is an array
-
-        if arr_info is None:  # if not an array
-            return {
-                'name': name,
-                'value': obj['value'],
-                'ttype': obj['ttype'],
-                'arr_info': []
-            }
-
-        return {
-            'name': name,
-            'value': obj['value'],
-            'ttype': obj['ttype'],
-            'arr_info': arr_info
-        }
-
-
-# <loccl>    ::= e
-#              | [ <bool> ] <loccl>
-class LocclNode(Node):
-    def check_semantics(self):
-        # If there is children we are dealing with an array
-        if len(self.children) > 0:
-            # Make sure the index of the array evaluates to type 'int'
-            index_info = self.children[0].check_semantics()
-            if index_info['ttype'] != 'int':
-                raise TypeMismatchError('int', index_info['ttype'], extra='Array index must by of type int')
-
-            loccl_info = self.children[1].check_semantics()  # info about higher dim arrays
-            loccl_info['dim'] = loccl_info['dim'] + 1  # add 1 to the dimension
-            loccl_info['is_arr'] = True  # set is_arr flag to true
-            return loccl_info
-
-        # If no child then dealing with basic types
-        # Type will be determined by upper node
-        return {
-            'ttype': None,
-            'is_arr': False,
-            'dim': 0,
-            'value': None
-        }
-
-    def run(self, rover):
-        # If no children then empty
-        if len(self.children) == 0:
-            return None
-
-        bool_obj = self.children[0].run(rover)  # get index (from the bool node)
-        loccl_info = self.children[1].run(rover)  # get array info
-
-        if loccl_info is None:  # no subarray
-            return [bool_obj]
-        return [bool_obj] + loccl_info  # return [this index, next index]
-
-
-# <bool>     ::= <join> <boolcl>
-class BoolNode(Node):
-    def check_semantics(self):
-        join_info = self.children[0].check_semantics()
-        boolcl_info = self.children[1].check_semantics()
-        # If boolcl is empty then we only had a join node so return that (could be any type)
-        if boolcl_info is None:
-            return join_info
-
-        # If we have boolcl then we have an || so both sides must be of type 'bool'
-        if not (join_info['ttype'] == 'bool' and boolcl_info['ttype'] == 'bool'):
-            raise TypeMismatchError('bool', '[int, double, string]')
-
-        return join_info  # Only ttype will be used by upper nodes
-
-    def run(self, rover):
-        join_obj = self.children[0].run(rover)
-        bool_obj = self.children[1].run(rover, join_obj)  # send join down to calculate the right order
-        return bool_obj
-
-
-# <boolcl>   ::= e
-#              | || <join> <boolcl>
-class BoolclNode(Node):
-    def check_semantics(self):
-        # If no child then node is empty
-        if len(self.children) == 0:
-            return None
-
-        join_info = self.children[1].check_semantics()
-        boolcl_info = self.children[2].check_semantics()
-        # If boolcl is empty we just have a join node so return that (could be any type)
-        if boolcl_info is None:
-            return join_info
-
-        # If we have boolcl we have || so both sides must be of type 'bool'
-        if not (join_info['ttype'] == 'bool' and boolcl_info['ttype'] == 'bool'):
-            raise TypeMismatchError('bool', '[int, double, string]')
-
-        return join_info
-
-    def run(self, rover, boolcl):
-        # If no children then send most recent result
-        if len(self.children) == 0:
-            return boolcl
-
-        join_obj = self.children[1].run(rover)
-        join_obj = boolcl or join_obj  # calculate this bool
-
-        bool_obj = self.children[2].run(rover, join_obj)  # recursive call
-        return bool_obj
-
-
-# <join>     ::= <equality> <joincl>
-class JoinNode(Node):
-    def check_semantics(self):
-        equality_info = self.children[0].check_semantics()
-        joincl_info = self.children[1].check_semantics()
-        # If joincl is empty we just have an equality node so return that (could be any type)
-        if joincl_info is None:
-            return equality_info
-
-        # If we have joincl then we have && so both sides must be of type 'bool'
-        if not (equality_info['ttype'] == 'bool' and joincl_info['ttype'] == 'bool'):
-            raise TypeMismatchError('bool', '[int, double, string]')
-        return equality_info
-
-    def run(self, rover):
-        eq_obj = self.children[0].run(rover)
-        join_obj = self.children[1].run(rover, eq_obj)  # send eq down to calculate the right order
-        return join_obj
-    
-
-# <joincl>   ::= e
-#              | && <equality> <joincl>
-class JoinclNode(Node):
-    def check_semantics(self):
-        # If no children then the node is empty
-        if len(self.children) == 0:
-            return None
-
-        equality_info = self.children[1].check_semantics()
-        joincl_info = self.children[2].check_semantics()
-        # If joincl is empty then we only have equality node so return that (could be any type)
-        if joincl_info is None:
-            return equality_info
-
-        # If we have joincl then we have && so both sides must be of type 'bool'
-        if not (equality_info['ttype'] == 'bool' and joincl_info['ttype'] == 'bool'):
-            raise TypeMismatchError('bool', '[int, double, string]')
-        return equality_info
-
-    def run(self, rover, join):
-        # If no children then send most recent result
-        if len(self.children) == 0:
-            return join
-
-        eq_obj = self.children[1].run(rover)
-        eq_obj = join and eq_obj  # calculate current join
-
-        join_obj = self.children[2].run(rover, eq_obj)  # recursive call
-        return join_obj
-            
-
-# <equality> ::= <rel> <equalcl>
-class EqualityNode(Node):
-    def check_semantics(self):
-        rel_info = self.children[0].check_semantics()
-        equalcl_info = self.children[1].check_semantics()
-        # If equalcl is empty we only have rel node so return that (could be any type)
-        if equalcl_info is None:
-            return rel_info
-
-        # No support for comparing strings
-        if rel_info == 'string' or equalcl_info == 'string':
-            raise TypeMismatchError('[int, double]', 'string')
-        # If we have equalcl then we have == so both sides much match types or be 'int' or 'double'
-        if not (
-                rel_info['ttype'] == equalcl_info['ttype'] or
-                (rel_info['ttype'] in ['int', 'double'] and equalcl_info['ttype'] in ['int', 'double'])
-        ):
-            raise TypeMismatchError(rel_info['ttype'], equalcl_info['ttype'])
-
-        rel_info['ttype'] = 'bool'  # == returns a boolean
-        return rel_info
-
-    def run(self, rover):
-        rel_obj = self.children[0].run(rover)
-        equalcl_obj = self.children[1].run(rover, rel_obj)  # send rel down to calculate right order
-        return equalcl_obj
-
-
-# <equalcl>  ::= e
-#              | == <rel> <equalcl>
-#              | != <rel> <equalcl>
-class EqualityclNode(Node):
-    def check_semantics(self):
-        # If no children then the node is empty
-        if len(self.children) == 0:
-            return None
-
-        rel_info = self.children[1].check_semantics()
-        equalcl_info = self.children[2].check_semantics()
-        # If equalcl is empty we only have rel node so return that (could be any type)
-        if equalcl_info is None:
-            return rel_info
-
-        # No support for comparing strings
-        if rel_info == 'string' or equalcl_info == 'string':
-            raise TypeMismatchError('[int, double]', 'string')
-        # If we have equalcl we have == so both sides must match types or be 'int' or 'double'
-        if not (
-                rel_info['ttype'] == equalcl_info['ttype'] or
-                (rel_info['ttype'] in ['int', 'double'] and equalcl_info['ttype'] in ['int', 'double'])
-        ):
-            raise TypeMismatchError(rel_info['ttype'], equalcl_info['ttype'])
-
-        rel_info['ttype'] = 'bool'  # == returns a boolean
-        return rel_info
-
-    def run(self, rover, rel):
-        # If no children then send most recent result
-        if len(self.children) == 0:
-            return rel
-
-        op = self.children[0].token.value  # get operator
-        rel_obj = self.children[1].run(rover)
-
-        # Check and for equality depending on the operator
-        if op == '==':
-            rel_obj = rel == rel_obj
-        else:
-            rel_obj = rel != rel_obj
-
-        equalcl_obj = self.children[2].run(rover, rel_obj)  # recursive call
-        return equalcl_obj
-            
-
-# <rel>      ::= <expr> <reltail>
-class RelNode(Node):
-    def check_semantics(self):
-        expr_info = self.children[0].check_semantics()
-        reltail_info = self.children[1].check_semantics()
-
-        # If reltail is empty we only have expr node so return that (could be any type)
-        if reltail_info is None:
-            return expr_info
-
-        if expr_info == 'bool' or reltail_info == 'bool':
-            raise TypeMismatchError('[int, double]', 'bool')
-        if expr_info == 'string' or reltail_info == 'string':
-            raise TypeMismatchError('[int, double]', 'string')
-
-        expr_info['ttype'] = 'bool'  # A relation returns a boolean
-        return expr_info
-
-    def run(self, rover):
-        expr_obj = self.children[0].run(rover)
-        reltail_obj = self.children[1].run(rover, expr_obj)  # send expr down to calculate right order
-        return reltail_obj
-
-
-# <reltail>  ::= e
-#              | <= <expr>
-#              | >= <expr>
-#              | > <expr>
-#              | < <expr>
-class ReltailNode(Node):
-    def check_semantics(self):
-        # If no children then node is empty
-        if len(self.children) == 0:
-            return None
-
-        # Just need to evaluate the expression
-        expr_info = self.children[1].check_semantics()
-        return expr_info
-
-    def run(self, rover, expr):
-        # If no child then send most recent result
-        if len(self.children) == 0:
-            return expr
-
-        # Get operator and evaluate expr and return evaluation
-        op = self.children[0].token.value
-        expr_obj = self.children[1].run(rover)
-        if op == '<=':
-            return expr <= expr_obj
-        elif op == '>=':
-            return expr >= expr_obj
-        elif op == '>':
-            return expr > expr_obj
-        else:
-            return expr < expr_obj
-
-
-# <expr>     ::= <term> <exprcl>
-class ExprNode(Node):
-    def check_semantics(self):
-        term_info = self.children[0].check_semantics()
-        exprcl_info = self.children[1].check_semantics()
-
-        # If exprecl is empty we only have term node so return that (could be any type)
-        if exprcl_info is None:
-            return term_info
-
-        term_t = term_info['ttype']  # get type
-        expr_t = exprcl_info['ttype']  # get type
-        # Cannot add or subtract 'bool'
-        if term_t == 'bool' or expr_t == 'bool':
-            raise TypeMismatchError('[int, double]', 'bool')
-        if term_t == 'string' or term_t == 'string':
-            raise TypeMismatchError('[int, double]', 'string')
-
-        if term_t == expr_t:  # Return the type if match (int or double)
-            return term_info
-
-        # If don't match but have double or int return double (super typing)
-        if term_t in ['int', 'double'] and expr_t in ['int', 'double']:
-            term_info['ttype'] = 'double'
-            return term_info
-
-    def run(self, rover):
-        term_obj = self.children[0].run(rover)
-        exprcl_obj = self.children[1].run(rover, term_obj)  # Send term so we can calculate in right order
-
-        return exprcl_obj
-
-
-# <exprcl>   ::= e
-#              | + <term> <exprcl>
-#              | - <term> <exprcl>
-class ExprclNode(Node):
-    # If no child then the node is empty
-    def check_semantics(self):
-        if len(self.children) == 0:
-            return None
-
-        term_info = self.children[1].check_semantics()
-        exprcl_info = self.children[2].check_semantics()
-
-        # If exprcl is empty then we only have term node so return that (could be any type)
-        if exprcl_info is None:
-            return term_info
-
-        term_t = term_info['ttype']  # Get type
-        expr_t = exprcl_info['ttype']  # get type
-        # Cannot add or subtract 'bool'
-        if term_t == 'bool' or expr_t == 'bool':
-            raise TypeMismatchError('[int, double]', 'bool')
-        if term_t == 'string' or term_t == 'string':
-            raise TypeMismatchError('[int, double]', 'string')
-
-        if term_t == expr_t:  # if types match return type (int or double)
-            return term_info
-
-        # If don't match but have double or int return double (super typing)
-        if term_t in ['int', 'double'] and expr_t in ['int', 'double']:
-            term_info['ttype'] = 'double'
-            return term_info
-
-    def run(self, rover, expr):
-        # If no children then return most recent result
-        if len(self.children) == 0:
-            return expr
-
-        term_obj = self.children[1].run(rover)
-        op = self.children[0].token.value
-
-        # Calculate the term with the term sent by parent node
-        if op == '+':
-            term_obj = expr + term_obj
-        else:
-            term_obj = expr - term_obj
-
-        exprcl_obj = self.children[2].run(rover, term_obj)  # recursive call
-        return exprcl_obj
-
-
-# <term>     ::= <unary> <termcl>
-class TermNode(Node):
-    def check_semantics(self):
-        unary_info = self.children[0].check_semantics()
-        termcl_info = self.children[1].check_semantics()
-
-        # If termcl empty then we only have unary node so return that (could be any type)
-        if termcl_info is None:
-            return unary_info
-
-        unary_t = unary_info['ttype']  # get type
-        term_t = termcl_info['ttype']  # get type
-        # Cannot mult or div 'bool'
-        if unary_t == 'bool' or term_t == 'bool':
-            raise TypeMismatchError('[int, double]', 'bool')
-        if unary_t == 'string' or term_t == 'string':
-            raise TypeMismatchError('[int, double]', 'string')
-
-        if unary_t == term_t:  # If types match just return type (int or double)
-            return unary_info
-
-        # If don't match but have double or int return double (super typing)
-        if unary_t in ['int', 'double'] and term_t in ['int', 'double']:
-            unary_info['ttype'] = 'double'
-            return unary_info
-
-    def run(self, rover):
-        unary_obj = self.children[0].run(rover)
-        termcl_obj = self.children[1].run(rover, unary_obj)  # Send unary so we can calculate in right order
-        return termcl_obj
-
-
-# <termcl>   ::= e
-#              | * <unary> <termcl>
-#              | / <unary> <termcl>
-class TermclNode(Node):
-    def check_semantics(self):
-        # If no children then the node is empty
-        if len(self.children) == 0:
-            return None
-
-        unary_info = self.children[1].check_semantics()
-        termcl_info = self.children[2].check_semantics()
-
-        # If termcl is empty we only have unary node so return that (could be any type)
-        if termcl_info is None:
-            return unary_info
-
-        unary_t = unary_info['ttype']  # get type
-        term_t = termcl_info['ttype']  # get type
-        if unary_t == 'bool' or term_t == 'bool':
-            raise TypeMismatchError('[int, double]', 'bool')
-        if unary_t == 'string' or term_t == 'string':
-            raise TypeMismatchError('[int, double]', 'string')
-
-        if unary_t == term_t:  # If types match just return type (int or double)
-            return unary_info
-
-        # If don't match but have double or int return double (super typing)
-        if unary_t in ['int', 'double'] and term_t in ['int', 'double']:
-            unary_info['ttype'] = 'double'
-            return unary_info
-
-    def run(self, rover, term):
-        # If no children then send most recent result
-        if len(self.children) == 0:
-            return term
-
-        unary_val = self.children[1].run(rover)
-        op = self.children[0].token.value
-
-        # Calculate unary with the unary sent by parent node
-        if op == '*':
-            unary_val = term * unary_val
-        else:
-            if unary_val == 0:
-                raise ZeroDivisionError
-            unary_val = term / unary_val
-
-        termcl_val = self.children[2].run(rover, unary_val)  # recursive call
-        return termcl_val
-
-
-# <unary>    ::= ! <unary>
-#              | - <unary>
-#              | <factor>
-class UnaryNode(Node):
-    def check_semantics(self):
-        # If only 1 child we have factor node so just check its semantics
-        if len(self.children) == 1:
-            return self.children[0].check_semantics()
-
-        unary_info = self.children[1].check_semantics()  # info about the unary node
-        op = self.children[0].token.value  # operator ('!' or '-')
-        unary_t = unary_info['ttype']  # Type of the unary node
-
-        if op == '!' and unary_t == 'bool':  # not op must operate on 'bool'
-            return unary_info
-        if op == '-' and unary_t in ['int', 'double']:  # negate op must operate on numerals
-            return unary_info
-
-        # Else we got a string
-        raise TypeMismatchError('bool, int, double', 'string')
-
-    def run(self, rover):
-        # If only one child we only have a factor node so evaluate that
-        if len(self.children) == 1:
-            return self.children[0].run(rover)
-
-        unary_obj = self.children[1].run(rover)
-        op = self.children[0].token.value
-
-        # Calculate the unary depending on operator and return
-        if op == '!':
-            return not unary_obj
-        else:
-            return - unary_obj
-
-
-# <factor>   ::= ( <bool> )
-#              | <loc>
-#              | ROVER . <get>
-#              | NUM
-#              | REAL
-#              | TRUE
-#              | FALSE
-class FactorNode(Node):
-    def check_semantics(self):
-        # If we have ( <bool> ) just check semantics for <bool>
-        if isinstance(self.children[0], BoolNode):
-            return self.children[0].check_semantics()
-
-        # If we have Loc node return the type of variable to assign
-        if isinstance(self.children[0], LocNode):
-            type_info = self.children[0].check_semantics()
-            # If type is arr error because factor cannot have an array (cannot mul, div, add, sub, compare arrays)
-            if type_info['is_arr']:
-                print("Factor must be basic type")
-                raise TypeMismatchError('basic type', 'array', extra='Factor must be basic type')
-            return type_info
-
-        # ===== BASIC types (base cases and rover attr.) ===== #
-        if self.children[0].token.ttype == Vocab.ROVER:
-            info = self.children[1].check_semantics()
-            return info
-
-        # If int return the int base type in dictionary
-        if self.children[0].token.ttype == Vocab.NUM:
-            return {
-                'ttype': 'int',
-                'is_arr': False,
-                'dim': 0,
-                'value': None
-            }
-
-        # If double return base type in dictionary
-        if self.children[0].token.ttype == Vocab.REAL:
-            return {
-                'ttype': 'double',
-                'is_arr': False,
-                'dim': 0,
-                'value': None
-            }
-
-        # If bool return base type in dictionary
-        if self.children[0].token.ttype in [Vocab.TRUE, Vocab.FALSE]:
-            return {
-                'ttype': 'bool',
-                'is_arr': False,
-                'dim': 0,
-                'value': None
-            }
-
-        if self.children[0].token.ttype == Vocab.STRING:
-            return {
-                'ttype': 'string',
-                'is_arr': False,
-                'dim': 0,
-                'value': None
-            }
-
-    def run(self, rover):
-        def _get_arr_index(obj):
-            arr = obj['value']  # the full array stored in scope
-            # arr_info is [i, j, k] where i, j, k are the indices to check when calling arr[i][j][k]
-            for i in obj['arr_info'][0:-1]:  # Get each correct index until deepest array
-                arr = arr[i]
-            return arr[obj['arr_info'][-1]]  # return the correct deepest index value
-
-        # If bool node
-        if isinstance(self.children[0], BoolNode):
-            return self.children[0].run(rover)
-
-        # If loc node
-        if isinstance(self.children[0], LocNode):
-            loc_info = self.children[0].run(rover)  # get variable arr info
-            # If variable is an array then use _get_arr_index to access the correct index
-            value = loc_info['value'] if len(loc_info['arr_info']) == 0 else _get_arr_index(loc_info)
-            return value
-
-        # If rover get
-        if self.children[0].token.ttype == Vocab.ROVER:
-            return self.children[1].run(rover)  # return the get() command
-
-        # If int
-        if self.children[0].token.ttype == Vocab.NUM:
-            return int(self.children[0].token.value)  # cast string value to int
-
-        # If double
-        if self.children[0].token.ttype == Vocab.REAL:
-            return float(self.children[0].token.value)  # cast string value to float
-
-        # If true
-        if self.children[0].token.ttype == Vocab.TRUE:  # return boolean True
-            return True
-
-        # if false
-        if self.children[0].token.ttype == Vocab.FALSE:  # return boolean False
-            return False
-
-        # if string
-        if self.children[0].token.ttype == Vocab.STRING:  # return the string
-            return self.children[0].token.value[1:-1]  # remove quotes
-
-
-# ROVER NODES
-class DirectionNode(Node):
-    def run(self, rover):
-        if self.children[0].token.ttype == Vocab.UP:
-            return 0
-        if self.children[0].token.ttype == Vocab.RIGHT:
-            return 1
-        if self.children[0].token.ttype == Vocab.DOWN:
-            return 2
-        if self.children[0].token.ttype == Vocab.LEFT:
-            return 3
-
-
-class RotationNode(Node):
-    def run(self, rover):
-        if self.children[0].token.ttype == Vocab.RIGHT:
-            return 0
-        if self.children[0].token.ttype == Vocab.LEFT:
-            return 1
-
-
-# <get>     ::= ORIENTATION
-#             | X_POS
-#             | Y_POS
-#             | GOLD
-#             | SILVER
-#             | COPPER
-#             | IRON
-#             | POWER
-#             | SONAR
-#             | MAX_MOVE <direction>
-#             | CAN_MOVE <direction>
-class GetNode(Node):
-    def check_semantics(self):
-        if self.children[0].token.ttype == Vocab.CAN_MOVE:  # can_move returns a bool
-            return {
-                'ttype': 'bool',
-                'is_arr': False,
-                'dim': 0,
-                'value': None
-            }
-        else:  # the rest all return ints
-            return {
-                'ttype': 'int',
-                'is_arr': False,
-                'dim': 0,
-                'value': None
-            }
-
-    def run(self, rover):
-        # Get the correct rover attribute depending on the token we got
-        if self.children[0].token.ttype == Vocab.ORIENTATION:
-            return rover.orientation
-        if self.children[0].token.ttype == Vocab.X_POS:
-            return rover.x_pos
-        if self.children[0].token.ttype == Vocab.Y_POS:
-            return rover.y_pos
-        if self.children[0].token.ttype == Vocab.GOLD:
-            return rover.gold
-        if self.children[0].token.ttype == Vocab.SILVER:
-            return rover.silver
-        if self.children[0].token.ttype == Vocab.COPPER:
-            return rover.copper
-        if self.children[0].token.ttype == Vocab.IRON:
-            return rover.iron
-        if self.children[0].token.ttype == Vocab.POWER:
-            return rover.power
-        if self.children[0].token.ttype == Vocab.SONAR:
-            return rover.sonar()
-        if self.children[0].token.ttype == Vocab.CAN_MOVE:
-            return rover.can_move(self.children[1].run(rover))
-        if self.children[0].token.ttype == Vocab.MAX_MOVE:
-            return rover.max_move(self.children[1].run(rover))
-
-
-# <action>  ::= SCAN
-#             | DRILL
-#             | SHOCKWAVE
-#             | BUILD
-#             | SONAR
-#             | PUSH
-#             | RECHARGE
-#             | BACKFLIP
-#             | PRINT_INVENTORY
-#             | PRINT_MAP
-#             | PRINT_POS
-#             | PRINT_ORIENTATION
-#             | CHANGE_MAP STRING
-#             | MOVE <direction> <bool>
-#             | TURN <rotation
-class ActionNode(Node):
-    def check_semantics(self):
-        # If move we need to evaluate the bool expr and make sure it is an int
-        if self.children[0].token.ttype == Vocab.MOVE:
-            bool_info = self.children[2].check_semantics()
-            if bool_info['ttype'] != 'int':
-                raise TypeMismatchError('int', bool_info['ttype'])
-
-        # STRING check for change_map is done while parsing
-
-    def run(self, rover):
-        # Do the correct rover action depending on the token we got
-        if self.children[0].token.ttype == Vocab.SCAN:
-            rover.scan()
-        elif self.children[0].token.ttype == Vocab.DRILL:
-            rover.drill()
-        elif self.children[0].token.ttype == Vocab.SHOCKWAVE:
-            rover.shockwave()
-        elif self.children[0].token.ttype == Vocab.BUILD:
-            rover.build()
-        elif self.children[0].token.ttype == Vocab.SONAR:
-            rover.sonar()
-        elif self.children[0].token.ttype == Vocab.PUSH:
-            rover.push()
-        elif self.children[0].token.ttype == Vocab.RECHARGE:
-            rover.recharge()
-        elif self.children[0].token.ttype == Vocab.BACKFLIP:
-            rover.backflip()
-        elif self.children[0].token.ttype == Vocab.PRINT_INVENTORY:
-            rover.print_inventory()
-        elif self.children[0].token.ttype == Vocab.PRINT_MAP:
-            rover.print_map()
-        elif self.children[0].token.ttype == Vocab.PRINT_POS:
-            rover.print_pos()
-        elif self.children[0].token.ttype == Vocab.PRINT_ORIENTATION:
-            rover.print_orientation()
-        elif self.children[0].token.ttype == Vocab.CHANGE_MAP:
-            rover.change_map(self.children[1].token.value[1:-1])  # remove quotes from string
-        elif self.children[0].token.ttype == Vocab.MOVE:
-            rover.move(self.children[1].run(rover), self.children[2].run(rover))
-        elif self.children[0].token.ttype == Vocab.TURN:
-            rover.turn(self.children[1].run(rover))
+import array
+import enum
+import math
+import operator
+import time
+
+
+# Stack helper class
+class Stack:
+    def __init__(self):
+        self.arr = []
+
+    def push(self, value):
+        self.arr.append(value)
+
+    def pop(self):
+        self.arr.pop()
+
+    # Returns the top of the stack or an index
+    def top(self, i=0):
+        if i >= len(self.arr):
+            raise Exception
+
+        return self.arr[-1 * i - 1]
+
+    # Checks if the name is in one of the open scopes
+    def check_open_scopes(self, name):
+        # Innermost scope first
+        for d in reversed(self.arr):
+            if name in d:
+                return True
+
+        return False
+
+    # Returns info about the first name found in the open scopes
+    def get_name(self, name):
+        # Innermost scope first
+        for d in reversed(self.arr):
+            if name in d:
+                return d[name]
+        raise UndefinedVariableError(name)  # Error if found nothing
+
+    # Returns the (depth, slot) address of the first name found in the open scopes,
+    # depth 0 is the innermost scope
+    def resolve(self, name):
+        for depth, d in enumerate(reversed(self.arr)):
+            if name in d:
+                return depth, d[name]['slot']
+        raise UndefinedVariableError(name)  # Error if found nothing
+
+
+# Nothing about a program being checked or run is global, so several programs
+# can be checked and run at the same time (in threads for example).
+#
+# check_semantics(scopes) gets a Stack of the open scopes, the top scope is
+# the innermost one and is popped when we get out of it. A scope is a dict of
+# name -> type info, and every declaration gets the next slot of its block.
+#
+# run(rover, frames) and the compiled functions f(rover, frames) get the list
+# of frames of the open blocks, innermost last. A frame is a list with one
+# slot per variable declared in the block, and every loc reads
+# frames[-1 - depth][slot] with the (depth, slot) address resolved while
+# checking semantics. frames[0] is the RunBudget of the run, below the frame
+# of the outermost block.
+# && and || skip their right operand once the result is known. Set to False
+# to always evaluate both operands like older versions did, a rover getter
+# on the right (ex: rover . sonar) then always runs.
+# It is read when a program is optimized and compiled, the program cache
+# keeps the programs made with each value apart so it can change at runtime.
+SHORT_CIRCUIT = True
+
+
+# Count loop iterations against the RunBudget of the run. Set to False to
+# run without any limit, for comparison. Read when a program is compiled,
+# like SHORT_CIRCUIT.
+CHECK_RUN_BUDGET = True
+
+# Loop iterations between two looks at the clock by a RunBudget
+BUDGET_CHECK_INTERVAL = 1000
+
+
+class RunTimeError(Exception):
+    def __init__(self, msg):
+        self.msg = msg
+
+    def __str__(self):
+        return f'[RUNTIME ERROR]: {self.msg}'
+
+
+class RunBudget:
+    """Loop iterations (steps) and seconds one run of a program may use, None for no limit.
+
+    A step is one iteration of a while loop, the only statement that can
+    run for ever. After every iteration loops take 1 from countdown and call
+    check() when it goes below 0, which happens every BUDGET_CHECK_INTERVAL
+    iterations or sooner when the steps run out. The iteration going over
+    max_steps, or the check after max_seconds, raises RunTimeError.
+    """
+
+    def __init__(self, max_steps=None, max_seconds=None):
+        self.max_steps = max_steps
+        self.max_seconds = max_seconds
+        self.start()
+
+    def start(self):
+        """Starts counting from 0 and starts the clock, every run calls it."""
+        self.steps = 0  # iterations counted by check()
+        self.deadline = None
+        if self.max_seconds is not None:
+            self.deadline = time.perf_counter() + self.max_seconds
+        self._count_down()
+
+    def _count_down(self):
+        self.chunk = BUDGET_CHECK_INTERVAL
+        if self.max_steps is not None:
+            self.chunk = min(self.chunk, self.max_steps - self.steps)
+        self.countdown = self.chunk
+
+    @property
+    def used_steps(self):
+        return self.steps + self.chunk - self.countdown
+
+    def check(self):
+        """Raises RunTimeError when the run went over budget, starts the next countdown otherwise."""
+        self.steps = self.used_steps
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise RunTimeError(f"step budget exceeded, ran more than {self.max_steps} loop iterations")
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise RunTimeError(f"time budget exceeded, ran for more than {self.max_seconds} seconds")
+        self._count_down()
+
+
+class TypeMismatchError(Exception):
+    def __init__(self, expected, t, extra=None):
+        self.expected = expected
+        self.type = t
+        self.extra = extra
+
+    def __str__(self):
+        if self.extra is not None:
+            return f"[SEMANTIC ERROR]: expected '{self.expected}' but got '{self.type}' instead.\n {self.extra}"
+        return f"[SEMANTIC ERROR]: expected '{self.expected}' but got '{self.type}' instead."
+
+
+class UndefinedVariableError(Exception):
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return f'[SEMANTIC ERROR]: variable {self.name} is undefined or out of scope.'
+
+
+class RedefinedVariableError(Exception):
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return f'[SEMANTIC ERROR]: variable {self.name} is defined more than once.'
+
+
+class Vocab(enum.Enum):
+    EOS = ""
+    OPEN_PAREN = "("
+    CLOSE_PAREN = ")"
+    OPEN_BRACE = "{"
+    CLOSE_BRACE = "}"
+    OPEN_SQPAR = "["
+    CLOSE_SQPAR = "]"
+    IF = "if"
+    ELSE = "else"
+    WHILE = "while"
+    ID = "id"
+    AND = "&&"
+    OR = "||"
+    ASSIGN = "="
+    EQ = "=="
+    NEQ = "!="
+    LTEQ = "<="
+    GTEQ = ">="
+    LT = "<"
+    GT = ">"
+    PLUS = "+"
+    MINUS = "-"
+    NUM = "integer"
+    REAL = "float"
+    STRING = "string"
+    TRUE = "true"
+    FALSE = "false"
+    NOT = "!"
+    MUL = "*"
+    DIV = "/"
+    BASIC = "basic"
+    SEMICOLON = ";"
+
+    PRINT = "print"
+    DOT = "."
+    ROVER = "rover"
+
+    ORIENTATION = "orientation"
+    X_POS = "x_pos"
+    Y_POS = "y_pos"
+    GOLD = "gold"
+    SILVER = "silver"
+    COPPER = "copper"
+    IRON = "iron"
+    POWER = "power"
+    MAX_MOVE = "max_move"
+    CAN_MOVE = "can_move"
+    NEAREST = "nearest"
+    NEAREST_X = "nearest_x"
+    NEAREST_Y = "nearest_y"
+
+    SCAN = "scan"
+    DRILL = "drill"
+    SHOCKWAVE = "shockwave"
+    BUILD = "build"
+    SONAR = "sonar"
+    PUSH = "push"
+    RECHARGE = "recharge"
+    BACKFLIP = "backflip"
+    PRINT_INVENTORY = "print_inventory"
+    PRINT_MAP = "print_map"
+    PRINT_POS = "print_pos"
+    PRINT_ORIENTATION = "print_orientation"
+    CHANGE_MAP = "change_map"
+    MOVE = "move"
+    TURN = "turn"
+
+    UP = "up"
+    DOWN = "down"
+    LEFT = "left"
+    RIGHT = "right"
+
+
+class NonTerminals(enum.Enum):
+    TERMINAL = 0
+    PROGRAM = 1
+    BLOCK = 2
+    DECLS = 3
+    DECL = 4
+    TYPE = 5
+    TYPECL = 6
+    STMT = 28
+    STMTS = 7
+    LOC = 8
+    LOCCL = 9
+    BOOL = 10
+    BOOLCL = 11
+    JOIN = 12
+    JOINCL = 13
+    EQUALITY = 14
+    EQUALCL = 15
+    REL = 16
+    RELTAIL = 17
+    EXPR = 18
+    EXPRCL = 19
+    TERM = 20
+    TERMCL = 21
+    UNARY = 22
+    FACTOR = 23
+
+    GET = 24
+    ACTION = 25
+    DIRECTION = 26
+    ROTATION = 27
+
+    LOAD = 29
+    CACHED = 30
+    CHAIN = 31
+
+
+class Token:
+    __slots__ = ("value", "ttype", "line", "col")
+
+    def __init__(self, value=0, ttype=Vocab.EOS, line=0, col=0):
+        self.value = value
+        self.ttype = ttype
+        # Position of the token in the source (1 based), 0 when unknown
+        self.line = line
+        self.col = col
+
+    def __eq__(self, other_token):
+        return self.value == other_token.value
+
+    def __hash__(self):
+        return hash(self.value)
+
+
+class Node:
+    __slots__ = ("token", "children")
+
+    def __init__(self, token, children=None):
+        self.token = token
+        self.children = [] if children is None else children
+
+    @classmethod
+    def empty(cls, token):
+        """Returns the node of this class without children, shared by every empty use.
+
+        Empty lists (<decls>, <loccl>, <exprcl>, ...) are very common and all
+        alike, so the parser keeps one instead of a new node for each of them.
+        It must never be changed.
+        """
+        node = _EMPTY_NODES.get(cls)
+        if node is None:
+            node = _EMPTY_NODES[cls] = cls(token, NO_CHILDREN)
+        return node
+
+    @property
+    def is_token(self):
+        return isinstance(self.token, Token)
+
+    @property
+    def is_nonterminal(self):
+        return not self.is_token
+
+    def add_child(self, node):
+        self.children.append(node)
+
+    # Method to print the tree in XML like fashion
+    def print(self, indent=0):
+        symbol = self.print_val()
+        if self.is_nonterminal:
+            print(f"{' ' * indent} < {symbol} >")
+        else:
+            print(f"{' ' * indent} < {symbol} >")
+        for child in self.children:
+            child.print(indent=indent+2)
+        if self.is_nonterminal:
+            print(f"{' ' * indent} </ {symbol} >")
+
+    # Method to print the tree in a tree like fashion
+    def show(self, level_markers=None):
+        if level_markers is None:
+            level_markers = []
+
+        marker_str = '+--  '
+        empty_str = '     '
+        conn_string = '|    '
+
+        current_level = len(level_markers)
+        mapper = lambda draw: conn_string if draw else empty_str
+        # Map the lambda to an array of booleans which tells us which string to print
+        # We print the conn_string if true because this node is not the last child if it is the case
+        markers = "".join(map(mapper, level_markers[:-1]))
+        markers += marker_str if current_level > 0 else ""
+        print(markers, end='')
+        if not self.is_nonterminal:
+            print(self.token.value)
+        else:
+            print(self.print_val())
+
+        # Call show() recursively on each of its children
+        for i, child in enumerate(self.children):
+            is_last = i == len(self.children) - 1
+            child.show([*level_markers, not is_last])
+
+    def print_val(self):
+        if not self.is_nonterminal:
+            return self.token.value
+        return self.print_nonterminal()
+
+    def print_nonterminal(self):
+        if self.token == NonTerminals.PROGRAM:
+            return "program"
+        elif self.token == NonTerminals.BLOCK:
+            return "block"
+        elif self.token == NonTerminals.DECLS:
+            return "decls"
+        elif self.token == NonTerminals.DECL:
+            return "decl"
+        elif self.token == NonTerminals.TYPE:
+            return "type"
+        elif self.token == NonTerminals.TYPECL:
+            return "typecl"
+        elif self.token == NonTerminals.STMTS:
+            return "stmts"
+        elif self.token == NonTerminals.STMT:
+            return "stmt"
+        elif self.token == NonTerminals.LOC:
+            return "loc"
+        elif self.token == NonTerminals.LOCCL:
+            return "loccl"
+        elif self.token == NonTerminals.BOOL:
+            return "bool"
+        elif self.token == NonTerminals.BOOLCL:
+            return "boolcl"
+        elif self.token == NonTerminals.JOIN:
+            return "join"
+        elif self.token == NonTerminals.JOINCL:
+            return "joincl"
+        elif self.token == NonTerminals.EQUALITY:
+            return "equality"
+        elif self.token == NonTerminals.EQUALCL:
+            return "equalitycl"
+        elif self.token == NonTerminals.REL:
+            return "rel"
+        elif self.token == NonTerminals.RELTAIL:
+            return "reltail"
+        elif self.token == NonTerminals.EXPR:
+            return "expr"
+        elif self.token == NonTerminals.EXPRCL:
+            return "exprcl"
+        elif self.token == NonTerminals.TERM:
+            return "term"
+        elif self.token == NonTerminals.TERMCL:
+            return "termcl"
+        elif self.token == NonTerminals.UNARY:
+            return "unary"
+        elif self.token == NonTerminals.FACTOR:
+            return "factor"
+
+        # Rover non-terminals
+        elif self.token == NonTerminals.DIRECTION:
+            return "direction"
+        elif self.token == NonTerminals.ROTATION:
+            return "rotation"
+        elif self.token == NonTerminals.ACTION:
+            return "action"
+        elif self.token == NonTerminals.GET:
+            return "get"
+
+        # Compact AST non-terminals
+        elif self.token == NonTerminals.LOAD:
+            return "load"
+        elif self.token == NonTerminals.CACHED:
+            return "cached"
+        elif self.token == NonTerminals.CHAIN:
+            return "chain"
+        else:
+            return "__UNKNOWN__"
+
+    def check_semantics(self, scopes):
+        for child in self.children:
+            child.check_semantics(scopes)
+
+    # Closure compiler, returns a function f(rover, frames) that does what run(rover, frames) does.
+    # Every decision that doesn't depend on runtime values is made here, once.
+    # By default the children are compiled and run in order.
+    def compile(self):
+        children = [child.compile() for child in self.children]
+
+        def run_children(rover, frames):
+            for child in children:
+                child(rover, frames)
+        return run_children
+
+    # Lowering pass, returns the node to use in the compact AST.
+    # By default a node is kept and its children are lowered in place.
+    def lower(self):
+        if self.children:  # shared empty nodes and leaves are left alone
+            self.children = [child.lower() for child in self.children]
+        return self
+
+
+# Children of terminal nodes and of shared empty nodes, they never get any
+NO_CHILDREN = ()
+_EMPTY_NODES = {}
+
+
+def leaf(token):
+    """Returns the node of a terminal, which doesn't have children."""
+    return Node(token, NO_CHILDREN)
+
+
+'''
+When check_semantics() returns somthing it is a dictionary with the following information:
+{
+    'ttype': t,
+    'is_array': bool,
+    'dim': 0..*,        # if we have an array this is the dimension of the array
+    'value': None
+}
+
+access dict key with:
+    dict['key_name']
+'''
+
+
+class ProgramNode(Node):
+    __slots__ = ()
+
+    def check(self):
+        """Checks the semantics of the whole program, with scopes of its own."""
+        self.check_semantics(Stack())
+
+    def run(self, rover, frames):
+        for child in self.children:
+            child.run(rover, frames)
+
+    def execute(self, rover, run_budget=None):
+        """Runs the whole program on rover, with frames of its own, within run_budget (no limit if None)."""
+        if run_budget is None:
+            run_budget = RunBudget()
+        run_budget.start()
+        self.run(rover, [run_budget])
+
+    def compile(self):
+        children = [child.compile() for child in self.children]
+
+        def run_program(rover, run_budget=None):
+            if run_budget is None:
+                run_budget = RunBudget()
+            run_budget.start()
+            frames = [run_budget]  # every run gets its own frames
+            for child in children:
+                child(rover, frames)
+        return run_program
+
+
+# <block>    ::= { <decls> <stmts> }
+class BlockNode(Node):
+    __slots__ = ("n_slots",)
+
+    def check_semantics(self, scopes):
+        # Add a new scope to the stack since a new block is found
+        scopes.push({})
+
+        for child in self.children:
+            child.check_semantics(scopes)
+
+        # One frame slot per variable declared in the block
+        self.n_slots = len(scopes.top())
+
+        # Pop the stack once we get out of the scope
+        scopes.pop()
+
+    def run(self, rover, frames):
+        frames.append([None] * self.n_slots)  # create a new scope
+
+        # <decls> then <stmts>, or every decl and stmt directly once lowered
+        for child in self.children:
+            child.run(rover, frames)
+
+        frames.pop()  # remove scope when done
+
+    def lower(self):
+        # The compact block holds its decls and stmts directly
+        self.children = [
+            child.lower()
+            for list_node in self.children
+            for child in list_node.children
+        ]
+        return self
+
+    def compile(self):
+        children = [child.compile() for child in self.children]
+        n_slots = self.n_slots
+
+        def run_block(rover, frames):
+            frames.append([None] * n_slots)  # create a new scope
+            for child in children:
+                child(rover, frames)
+            frames.pop()  # remove scope when done
+        return run_block
+
+
+# <decl>     ::= <type> ID ;
+class DeclNode(Node):
+    __slots__ = ("slot",)
+
+    def check_semantics(self, scopes):
+        type_info = self.children[0].check_semantics(scopes)
+        name = self.children[1].token.value  # name of ID
+
+        # If the name already exist in current scope raise error
+        if name in scopes.top():
+            raise RedefinedVariableError(name)
+        # Add variable to symbol table, in the next slot of the block's frame
+        type_info['slot'] = self.slot = len(scopes.top())
+        scopes.top()[name] = type_info
+
+    def run(self, rover, frames):
+        type_obj = self.children[0].run(rover, frames)  # get type info (array information as well)
+        frames[-1][self.slot] = type_obj['value']  # initialize the variable's slot
+
+    def compile(self):
+        make_value = self.children[0].compile()  # None or the empty array
+        slot = self.slot
+
+        def run_decl(rover, frames):
+            frames[-1][slot] = make_value(rover, frames)  # initialize the variable's slot
+        return run_decl
+
+
+# <decls>    ::= e
+#              | <decl> <decls>
+# Every <decl> is a direct child (the parser builds the list with a loop)
+class DeclsNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        for child in self.children:
+            child.check_semantics(scopes)
+
+    def run(self, rover, frames):
+        for child in self.children:
+            child.run(rover, frames)
+
+
+# <type>     ::= BASIC <typecl>
+class TypeNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        ttype = self.children[0].token.value  # variable type
+        type_info = self.children[1].check_semantics(scopes)  # returns info on if it is an array or not
+        type_info['ttype'] = ttype
+
+        return type_info
+
+    def run(self, rover, frames):
+        ttype = self.children[0].token.value  # get the type
+        arr_info = self.children[1].run(rover, frames)  # info about dealing with arrays
+
+        if arr_info is None:  # not dealing with an array
+            return {
+                'ttype': ttype,
+                'value': None
+            }
+
+        return {  # dealing with array
+            'ttype': ttype,
+            # arr_info is an array [i, j, k, ...] where i j k are the length for each subarray respectively
+            # ex: int [ i ] [ j ] [ k ] array ; -> [i, j, k]
+            'value': make_array(ttype, arr_info)  # flat buffer with room for every element
+        }
+
+    def compile(self):
+        # The type and sizes are known now, only the buffer needs to be built at runtime
+        ttype = self.children[0].token.value
+        lengths = self.children[1].run(rover=None, frames=None)
+        if lengths is None:
+            return lambda rover, frames: None
+        return lambda rover, frames: make_array(ttype, lengths)
+
+
+# Arrays are stored in a single flat buffer, element arr[i][j][k] of an
+# int [ I ] [ J ] [ K ] array is at i * J * K + j * K + k. The strides
+# (J * K, K, 1) only depend on the declaration so every <loc> gets them when
+# checking semantics.
+# Buffer typecode for each basic type. Bool arrays use a bytearray, double
+# arrays a list so that an element holds what a double variable would (3 stays
+# 3, not 3.0) and string arrays a list since strings can't be packed. Int
+# elements are 64 bit, storing a larger int raises OverflowError.
+ARRAY_TYPECODES = {'int': 'q'}
+
+# Raise IndexError for an index outside of its dimension. When False the
+# offset isn't checked, an index too large for its dimension reads another
+# element of the array. Read when a program is compiled.
+CHECK_ARRAY_BOUNDS = True
+
+# Compile expressions to closures specialized for the types check_semantics
+# found and for literal operands. When False every operator gets the generic
+# closure, for comparison. Read when a program is compiled.
+SPECIALIZE_BY_TYPE = True
+
+
+# Values of the flags read when a program is optimized or compiled, a program
+# made with other values behaves differently so caches keep them apart. A new
+# flag read at compile time goes here.
+def compile_flags():
+    return (SHORT_CIRCUIT, CHECK_RUN_BUDGET, CHECK_ARRAY_BOUNDS, SPECIALIZE_BY_TYPE)
+
+
+# Builds the flat buffer of an array with the given lengths ([i, j, k] for arr[i][j][k]),
+# elements start at 0, 0.0 or false (None for strings)
+def make_array(ttype, lengths):
+    size = 1
+    for length in lengths:
+        size *= length
+
+    if ttype in ARRAY_TYPECODES:
+        return array.array(ARRAY_TYPECODES[ttype], [0]) * size
+    if ttype == 'bool':
+        return bytearray(size)
+    if ttype == 'double':
+        return [0.0] * size
+    return [None] * size
+
+
+# Strides of an array with the given lengths, (J * K, K, 1) for [I, J, K]
+def array_strides(lengths):
+    strides = []
+    stride = 1
+    for length in reversed(lengths):
+        strides.append(stride)
+        stride *= length
+    return strides[::-1]
+
+
+# Returns the index after checking that it is in the dimension
+def check_index(index, length):
+    if not 0 <= index < length:
+        raise IndexError(f"array index {index} out of range for length {length}")
+    return index
+
+
+# Index known when compiling: an int literal in range (a double one still raises at runtime)
+def is_constant_index(node, length):
+    return isinstance(node, LiteralNode) and node.token.ttype == Vocab.NUM and 0 <= node.value < length
+
+
+# Offset in the flat buffer of the element at the given indices
+def array_offset(indices, lengths, strides):
+    offset = 0
+    if CHECK_ARRAY_BOUNDS:
+        for index, length, stride in zip(indices, lengths, strides):
+            if not 0 <= index < length:
+                check_index(index, length)  # raises the error
+            offset += index * stride
+    else:
+        for index, stride in zip(indices, strides):
+            offset += index * stride
+    return offset
+
+
+# <typecl>   ::= e
+#              | [ NUM ] <typecl>
+# Every NUM is a direct child (the parser builds the list with a loop)
+class TypeclNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        # If there is children then we are dealing with an array, one dimension per child
+        # Check for NUM is done when parsing
+        return {
+            'ttype': None,
+            'is_arr': len(self.children) > 0,
+            'dim': len(self.children),
+            'shape': [int(child.token.value) for child in self.children],  # length of each dimension
+            'val': None
+        }
+
+    def run(self, rover, frames):
+        # If no children then empty
+        if len(self.children) == 0:
+            return None
+
+        return [int(child.token.value) for child in self.children]  # [i, j, k] for arr[i][j][k]
+
+
+# <stmt>     ::= ;
+#              | <loc> = <bool> ;
+#              | ROVER . <action> ;
+#              | PRINT <bool> ;
+#              | IF ( <bool> ) <stmt>
+#              | IF ( <bool> ) <stmt> ELSE <stmt>
+#              | WHILE ( <bool> ) <stmt>
+#              | <block>
+class StmtNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        # If there is a loc node
+        if isinstance(self.children[0], LocNode):
+            symbol = self.children[0].check_semantics(scopes)  # Returns info from symbol table
+            type_info = self.children[2].check_semantics(scopes)  # Info on the assignment type
+            # If types don't match OR the symbol is an array then we cannot assign the value
+            if (
+                    not (
+                            symbol['ttype'] == type_info['ttype']
+                            or (symbol['ttype'] == 'double' and type_info['ttype'] == 'int')
+                    )
+                    or symbol['is_arr']
+            ):
+                raise TypeMismatchError(symbol['ttype'], type_info['ttype'])
+
+        # If we have a block node
+        elif isinstance(self.children[0], BlockNode):
+            self.children[0].check_semantics(scopes)  # Just evaluate the block semantics
+
+        elif self.children[0].token.ttype == Vocab.ROVER:
+            self.children[1].check_semantics(scopes)  # Just evaluate the action semantics
+
+        elif self.children[0].token.ttype == Vocab.PRINT:
+            self.children[1].check_semantics(scopes)  # Just evaluate the bool semantics
+
+        # for an IF or WHILE token:
+        elif self.children[0].token.ttype in [Vocab.IF, Vocab.WHILE]:
+            # Make sure the condition in the statement is of type bool
+            cond_info = self.children[1].check_semantics(scopes)
+            if cond_info['ttype'] != 'bool':
+                raise TypeMismatchError('bool', cond_info['ttype'], "condition must be a boolean.")
+
+            # Evaluate the stmt nodes
+            self.children[2].check_semantics(scopes)
+            if len(self.children) == 5:  # if we have an ELSE stmt
+                self.children[4].check_semantics(scopes)
+
+    def run(self, rover, frames):
+        # If loc node
+        if isinstance(self.children[0], LocNode):
+            container, key = self.children[0].ref(rover, frames)  # frame or array holding the variable
+            bool_obj = self.children[2].run(rover, frames)  # evaluate the bool stmt
+
+            if self.children[0].ttype == 'int':  # cast to int cuz we might get a double from python division
+                bool_obj = int(bool_obj)
+            container[key] = bool_obj  # assign the value to the variable
+
+        # If block node
+        elif isinstance(self.children[0], BlockNode):
+            self.children[0].run(rover, frames)  # Just run the block
+
+        # If rover action
+        elif self.children[0].token.ttype == Vocab.ROVER:
+            self.children[1].run(rover, frames)  # Just run the rover action()
+
+        # If print
+        elif self.children[0].token.ttype == Vocab.PRINT:
+            bool_obj = self.children[1].run(rover, frames)  # eval the bool
+            rover.output.print(bool_obj)  # print the value
+
+        # If stmt
+        elif self.children[0].token.ttype == Vocab.IF:
+            bool_obj = self.children[1].run(rover, frames)  # eval the bool
+            if bool_obj:  # if true then run the first stmt
+                self.children[2].run(rover, frames)
+            elif len(self.children) == 5:  # else if we have an else then run the second stmt
+                self.children[4].run(rover, frames)
+
+        # If while
+        elif self.children[0].token.ttype == Vocab.WHILE:
+            run_budget = frames[0]
+            while self.children[1].run(rover, frames):  # keep going
+                self.children[2].run(rover, frames)  # keep running the stmt
+                if CHECK_RUN_BUDGET:
+                    run_budget.countdown -= 1
+                    if run_budget.countdown < 0:
+                        run_budget.check()  # raises once over budget
+
+    def lower(self):
+        # A block statement is just the block in the compact AST
+        if isinstance(self.children[0], BlockNode):
+            return self.children[0].lower()
+        return Node.lower(self)
+
+    def compile(self):
+        # If loc node
+        if isinstance(self.children[0], LocNode):
+            loc = self.children[0]
+            frame = -1 - loc.address[0]
+            slot = loc.address[1]
+            value_node = self.children[2]
+            # cast to int cuz we might get a double from python division,
+            # not needed when the value's type says it is an int already
+            cast = loc.ttype == 'int'
+            if cast and SPECIALIZE_BY_TYPE and is_int_division(value_node):
+                value = _truncating_div_closure(value_node.children[0].compile(), value_node.children[1].compile())
+                cast = False
+            else:
+                value = value_node.compile()
+                if cast and SPECIALIZE_BY_TYPE and is_exact_int(value_node):
+                    cast = False
+
+            if len(loc.children[1].children) == 0:
+                if not cast:
+                    def run_assign(rover, frames):
+                        new_value = value(rover, frames)
+                        frames[frame][slot] = new_value
+                    return run_assign
+
+                def run_assign_int(rover, frames):
+                    new_value = int(value(rover, frames))
+                    frames[frame][slot] = new_value
+                return run_assign_int
+
+            offset = loc.compile_offset()
+
+            if not cast:
+                def run_assign_index(rover, frames):
+                    buffer = frames[frame][slot]  # the array's flat buffer
+                    i = offset(rover, frames)
+                    buffer[i] = value(rover, frames)
+                return run_assign_index
+
+            def run_assign_index_int(rover, frames):
+                buffer = frames[frame][slot]  # the array's flat buffer
+                i = offset(rover, frames)
+                buffer[i] = int(value(rover, frames))
+            return run_assign_index_int
+
+        # If block node
+        if isinstance(self.children[0], BlockNode):
+            return self.children[0].compile()
+
+        ttype = self.children[0].token.ttype
+
+        # If rover action
+        if ttype == Vocab.ROVER:
+            return self.children[1].compile()
+
+        # If print
+        if ttype == Vocab.PRINT:
+            value = self.children[1].compile()
+
+            def run_print(rover, frames):
+                rover.output.print(value(rover, frames))
+            return run_print
+
+        # If stmt
+        if ttype == Vocab.IF:
+            condition = self.children[1].compile()
+            then_stmt = self.children[2].compile()
+            if len(self.children) == 5:
+                else_stmt = self.children[4].compile()
+
+                def run_if_else(rover, frames):
+                    if condition(rover, frames):
+                        then_stmt(rover, frames)
+                    else:
+                        else_stmt(rover, frames)
+                return run_if_else
+
+            def run_if(rover, frames):
+                if condition(rover, frames):
+                    then_stmt(rover, frames)
+            return run_if
+
+        # If while
+        if ttype == Vocab.WHILE:
+            condition = self.children[1].compile()
+            body = self.children[2].compile()
+
+            if not CHECK_RUN_BUDGET:
+                def run_while(rover, frames):
+                    while condition(rover, frames):
+                        body(rover, frames)
+                return run_while
+
+            def run_while_budgeted(rover, frames):
+                run_budget = frames[0]
+                while condition(rover, frames):
+                    body(rover, frames)
+                    run_budget.countdown -= 1
+                    if run_budget.countdown < 0:
+                        run_budget.check()  # raises once over budget
+            return run_while_budgeted
+
+        # Empty statement
+        return lambda rover, frames: None
+
+
+# <stmts>    ::= e
+#              | <stmt> <stmts>
+# Every <stmt> is a direct child (the parser builds the list with a loop)
+class StmtsNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        for child in self.children:
+            child.check_semantics(scopes)
+
+    def run(self, rover, frames):
+        for child in self.children:
+            child.run(rover, frames)
+
+
+# <loc>      ::= ID <loccl>
+class LocNode(Node):
+    __slots__ = ("address", "ttype", "shape", "strides")
+
+    def check_semantics(self, scopes):
+        name = self.children[0].token.value  # name of variable for assignment
+
+        # Check if the name is found in the open scopes
+        if not scopes.check_open_scopes(name):
+            raise UndefinedVariableError(name)
+
+        # Handle array types
+        # Can only assign to a basic type
+        # So can only assign to the deepest subarray of arrays
+        symbol = scopes.get_name(name)  # Get info from symbol table
+        self.address = scopes.resolve(name)  # (depth, slot) of the variable's frame slot
+        self.ttype = symbol['ttype']  # used for int casting
+        self.shape = symbol['shape']  # used to find the offset of an element in the array's buffer
+        self.strides = array_strides(self.shape)
+        type_info = self.children[1].check_semantics(scopes)  # Check if we ask for an array index
+        type_dim = symbol['dim'] - type_info['dim']  # Gets the dimension of the assignment
+        if type_dim < 0:
+            # If negative then we asked for higher dimension than the array has
+            raise TypeMismatchError('Basic type', 'Array type', extra='Wrong array subscript')
+        is_arr = True if type_dim > 0 else False  # if type_dim is 0 then it is a basic type
+
+        return {
+            'ttype': symbol['ttype'],
+            'is_arr': is_arr,
+            'dim': type_dim,
+            'value': None
+        }
+
+    # Returns (container, key) where container[key] is the variable,
+    # the frame and slot of the variable or the array's buffer and the element's offset
+    def ref(self, rover, frames):
+        depth, slot = self.address
+        container = frames[-1 - depth]
+
+        # arr_info is [i, j, k] where i, j, k are the indices to check when calling arr[i][j][k]
+        arr_info = self.children[1].run(rover, frames)  # check if it is an array
+        if arr_info is None:  # if not an array
+            return container, slot
+
+        # The array's flat buffer and the offset of the element
+        return container[slot], array_offset(arr_info, self.shape, self.strides)
+
+    # Returns the value of the variable
+    def run(self, rover, frames):
+        container, key = self.ref(rover, frames)
+        if self.ttype == 'bool' and len(self.children[1].children) > 0:
+            return bool(container[key])  # bool arrays are bytearrays
+        return container[key]
+
+    # Returns a function f(rover, frames) giving the offset of the element in the array's buffer
+    def compile_offset(self):
+        index_nodes = self.children[1].children
+        # Constant indices are known now (out of range ones still raise at runtime)
+        if all(
+                is_constant_index(child, length)
+                for child, length in zip(index_nodes, self.shape)
+        ):
+            offset = array_offset([child.value for child in index_nodes], self.shape, self.strides)
+            return lambda rover, frames: offset
+
+        indices = [child.compile() for child in index_nodes]
+        dims = list(zip(indices, self.shape, self.strides))
+
+        # One index is the most common case, no loop needed
+        if len(dims) == 1 and CHECK_ARRAY_BOUNDS:
+            index, length, _ = dims[0]
+
+            def checked_index(rover, frames):
+                i = index(rover, frames)
+                if 0 <= i < length:
+                    return i
+                return check_index(i, length)  # raises the error
+            return checked_index
+        if len(dims) == 1:
+            return indices[0]
+
+        if CHECK_ARRAY_BOUNDS:
+            def checked_offset(rover, frames):
+                offset = 0
+                for index, length, stride in dims:
+                    i = index(rover, frames)
+                    if not 0 <= i < length:
+                        check_index(i, length)  # raises the error
+                    offset += i * stride
+                return offset
+            return checked_offset
+
+        def offset(rover, frames):
+            total = 0
+            for index, _, stride in dims:
+                total += index(rover, frames) * stride
+            return total
+        return offset
+
+
+# <loccl>    ::= e
+#              | [ <bool> ] <loccl>
+# Every index <bool> is a direct child (the parser builds the list with a loop)
+class LocclNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        # If there is children we are dealing with an array, one dimension per index
+        for child in self.children:
+            # Make sure the index of the array evaluates to type 'int'
+            index_info = child.check_semantics(scopes)
+            if index_info['ttype'] != 'int':
+                raise TypeMismatchError('int', index_info['ttype'], extra='Array index must by of type int')
+
+        # Type will be determined by upper node
+        return {
+            'ttype': None,
+            'is_arr': len(self.children) > 0,
+            'dim': len(self.children),
+            'value': None
+        }
+
+    def run(self, rover, frames):
+        # If no children then empty
+        if len(self.children) == 0:
+            return None
+
+        return [child.run(rover, frames) for child in self.children]  # [i, j, k] for arr[i][j][k]
+
+
+# Type of `left || right` and `left && right`, right is None when there is no operator
+def _logic_type_info(left_info, right_info):
+    if right_info is None:
+        return left_info  # Only had one operand so return that (could be any type)
+
+    # If we have an operator then both sides must be of type 'bool'
+    if not (left_info['ttype'] == 'bool' and right_info['ttype'] == 'bool'):
+        raise TypeMismatchError('bool', '[int, double, string]')
+    return left_info  # Only ttype will be used by upper nodes
+
+
+# Type of `left == right` and `left != right`, right is None when there is no operator
+def _equality_type_info(left_info, right_info):
+    if right_info is None:
+        return left_info  # Only had one operand so return that (could be any type)
+
+    # Both sides must match types or be 'int' or 'double'
+    if not (
+            left_info['ttype'] == right_info['ttype'] or
+            (left_info['ttype'] in ['int', 'double'] and right_info['ttype'] in ['int', 'double'])
+    ):
+        raise TypeMismatchError(left_info['ttype'], right_info['ttype'])
+
+    left_info['ttype'] = 'bool'  # == returns a boolean
+    return left_info
+
+
+# Type of `left + right`, `left - right`, `left * right` and `left / right`,
+# right is None when there is no operator
+def _arith_type_info(left_info, right_info):
+    if right_info is None:
+        return left_info  # Only had one operand so return that (could be any type)
+
+    left_t = left_info['ttype']  # get type
+    right_t = right_info['ttype']  # get type
+    # Cannot do arithmetic on 'bool' or 'string'
+    if left_t == 'bool' or right_t == 'bool':
+        raise TypeMismatchError('[int, double]', 'bool')
+    if left_t == 'string' or right_t == 'string':
+        raise TypeMismatchError('[int, double]', 'string')
+
+    if left_t == right_t:  # If types match just return type (int or double)
+        return left_info
+
+    # If don't match but have double or int return double (super typing)
+    left_info['ttype'] = 'double'
+    return left_info
+
+
+# Type of `left < right`, `left <= right`, `left > right` and `left >= right`,
+# right is None when there is no operator
+def _rel_type_info(left_info, right_info):
+    if right_info is None:
+        return left_info  # Only had one operand so return that (could be any type)
+
+    # Operands of any type are accepted, like the original checks did (they
+    # compared the whole info to 'bool' and 'string'), so `true < false` and
+    # `"a" < "b"` run. Comparing a number with a string fails when it runs.
+    left_info['ttype'] = 'bool'  # A relation returns a boolean
+    return left_info
+
+
+# Type of an operator chain node (*cl nodes) with children [op, operand, op, operand, ...].
+# Operands are checked in order, then their types are combined from the right
+# since that is how the grammar nests them.
+def _chain_type_info(node, combine, scopes):
+    if len(node.children) == 0:
+        return None  # If no children then the node is empty
+
+    operand_infos = [child.check_semantics(scopes) for child in node.children[1::2]]
+    info = None
+    for operand_info in reversed(operand_infos):
+        info = combine(operand_info, info)
+    return info
+
+
+# Lowers `operand <chain>` where chain is a *cl node with children
+# [op, operand, op, operand, ...] to left associative BinOpNodes,
+# which is the order run() evaluates them in. Chains of more than
+# max_binary operators become one ChainNode instead.
+def _lower_chain(operand, chain, max_binary=None):
+    operands = [operand.lower()] + [child.lower() for child in chain.children[1::2]]
+    ops = [child.token for child in chain.children[0::2]]
+    if len(ops) > (MAX_BINARY_CHAIN if max_binary is None else max_binary):
+        return ChainNode(operands, ops)
+    left = operands[0]
+    for op, right in zip(ops, operands[1:]):
+        left = BinOpNode(op, left, right)
+    return left
+
+
+# <bool>     ::= <join> <boolcl>
+class BoolNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        join_info = self.children[0].check_semantics(scopes)
+        boolcl_info = self.children[1].check_semantics(scopes)
+        return _logic_type_info(join_info, boolcl_info)
+
+    def run(self, rover, frames):
+        join_obj = self.children[0].run(rover, frames)
+        bool_obj = self.children[1].run(rover, frames, join_obj)  # send join down to calculate the right order
+        return bool_obj
+
+    def lower(self):
+        return _lower_chain(self.children[0], self.children[1])
+
+
+# <boolcl>   ::= e
+#              | || <join> <boolcl>
+# Children are [||, join, ||, join, ...] (the parser builds the list with a loop)
+class BoolclNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        return _chain_type_info(self, _logic_type_info, scopes)
+
+    def run(self, rover, frames, boolcl):
+        # Evaluate from left to right, boolcl is the result so far
+        for join in self.children[1::2]:
+            if boolcl and SHORT_CIRCUIT:
+                return boolcl  # true no matter what comes next
+            join_obj = join.run(rover, frames)
+            boolcl = boolcl or join_obj  # calculate this bool
+        return boolcl
+
+
+# <join>     ::= <equality> <joincl>
+class JoinNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        equality_info = self.children[0].check_semantics(scopes)
+        joincl_info = self.children[1].check_semantics(scopes)
+        return _logic_type_info(equality_info, joincl_info)
+
+    def run(self, rover, frames):
+        eq_obj = self.children[0].run(rover, frames)
+        join_obj = self.children[1].run(rover, frames, eq_obj)  # send eq down to calculate the right order
+        return join_obj
+
+    def lower(self):
+        return _lower_chain(self.children[0], self.children[1])
+
+
+# <joincl>   ::= e
+#              | && <equality> <joincl>
+# Children are [&&, equality, &&, equality, ...] (the parser builds the list with a loop)
+class JoinclNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        return _chain_type_info(self, _logic_type_info, scopes)
+
+    def run(self, rover, frames, join):
+        # Evaluate from left to right, join is the result so far
+        for equality in self.children[1::2]:
+            if not join and SHORT_CIRCUIT:
+                return join  # false no matter what comes next
+            eq_obj = equality.run(rover, frames)
+            join = join and eq_obj  # calculate current join
+        return join
+
+
+# <equality> ::= <rel> <equalcl>
+class EqualityNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        rel_info = self.children[0].check_semantics(scopes)
+        equalcl_info = self.children[1].check_semantics(scopes)
+        return _equality_type_info(rel_info, equalcl_info)
+
+    def run(self, rover, frames):
+        rel_obj = self.children[0].run(rover, frames)
+        equalcl_obj = self.children[1].run(rover, frames, rel_obj)  # send rel down to calculate right order
+        return equalcl_obj
+
+    def lower(self):
+        # Types of an equality chain are combined from the right (see
+        # ChainNode), nested BinOpNodes would combine them from the left
+        return _lower_chain(self.children[0], self.children[1], max_binary=1)
+
+
+# <equalcl>  ::= e
+#              | == <rel> <equalcl>
+#              | != <rel> <equalcl>
+# Children are [op, rel, op, rel, ...] (the parser builds the list with a loop)
+class EqualityclNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        return _chain_type_info(self, _equality_type_info, scopes)
+
+    def run(self, rover, frames, rel):
+        # Evaluate from left to right, rel is the result so far
+        for i in range(0, len(self.children), 2):
+            op = self.children[i].token.value  # get operator
+            rel_obj = self.children[i + 1].run(rover, frames)
+
+            # Check and for equality depending on the operator
+            if op == '==':
+                rel = rel == rel_obj
+            else:
+                rel = rel != rel_obj
+        return rel
+
+
+# <rel>      ::= <expr> <reltail>
+class RelNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        expr_info = self.children[0].check_semantics(scopes)
+        reltail_info = self.children[1].check_semantics(scopes)
+
+        return _rel_type_info(expr_info, reltail_info)
+
+    def run(self, rover, frames):
+        expr_obj = self.children[0].run(rover, frames)
+        reltail_obj = self.children[1].run(rover, frames, expr_obj)  # send expr down to calculate right order
+        return reltail_obj
+
+    def lower(self):
+        return _lower_chain(self.children[0], self.children[1])
+
+
+# <reltail>  ::= e
+#              | <= <expr>
+#              | >= <expr>
+#              | > <expr>
+#              | < <expr>
+class ReltailNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        # If no children then node is empty
+        if len(self.children) == 0:
+            return None
+
+        # Just need to evaluate the expression
+        expr_info = self.children[1].check_semantics(scopes)
+        return expr_info
+
+    def run(self, rover, frames, expr):
+        # If no child then send most recent result
+        if len(self.children) == 0:
+            return expr
+
+        # Get operator and evaluate expr and return evaluation
+        op = self.children[0].token.value
+        expr_obj = self.children[1].run(rover, frames)
+        if op == '<=':
+            return expr <= expr_obj
+        elif op == '>=':
+            return expr >= expr_obj
+        elif op == '>':
+            return expr > expr_obj
+        else:
+            return expr < expr_obj
+
+
+# <expr>     ::= <term> <exprcl>
+class ExprNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        term_info = self.children[0].check_semantics(scopes)
+        exprcl_info = self.children[1].check_semantics(scopes)
+        return _arith_type_info(term_info, exprcl_info)
+
+    def run(self, rover, frames):
+        term_obj = self.children[0].run(rover, frames)
+        exprcl_obj = self.children[1].run(rover, frames, term_obj)  # Send term so we can calculate in right order
+
+        return exprcl_obj
+
+    def lower(self):
+        return _lower_chain(self.children[0], self.children[1])
+
+
+# <exprcl>   ::= e
+#              | + <term> <exprcl>
+#              | - <term> <exprcl>
+# Children are [op, term, op, term, ...] (the parser builds the list with a loop)
+class ExprclNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        return _chain_type_info(self, _arith_type_info, scopes)
+
+    def run(self, rover, frames, expr):
+        # Evaluate from left to right, expr is the result so far
+        for i in range(0, len(self.children), 2):
+            op = self.children[i].token.value
+            term_obj = self.children[i + 1].run(rover, frames)
+
+            # Calculate the term with the result so far
+            if op == '+':
+                expr = expr + term_obj
+            else:
+                expr = expr - term_obj
+        return expr
+
+
+# <term>     ::= <unary> <termcl>
+class TermNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        unary_info = self.children[0].check_semantics(scopes)
+        termcl_info = self.children[1].check_semantics(scopes)
+        return _arith_type_info(unary_info, termcl_info)
+
+    def run(self, rover, frames):
+        unary_obj = self.children[0].run(rover, frames)
+        termcl_obj = self.children[1].run(rover, frames, unary_obj)  # Send unary so we can calculate in right order
+        return termcl_obj
+
+    def lower(self):
+        return _lower_chain(self.children[0], self.children[1])
+
+
+# <termcl>   ::= e
+#              | * <unary> <termcl>
+#              | / <unary> <termcl>
+# Children are [op, unary, op, unary, ...] (the parser builds the list with a loop)
+class TermclNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        return _chain_type_info(self, _arith_type_info, scopes)
+
+    def run(self, rover, frames, term):
+        # Evaluate from left to right, term is the result so far
+        for i in range(0, len(self.children), 2):
+            op = self.children[i].token.value
+            unary_val = self.children[i + 1].run(rover, frames)
+
+            # Calculate unary with the result so far
+            if op == '*':
+                term = term * unary_val
+            else:
+                if unary_val == 0:
+                    raise ZeroDivisionError
+                term = term / unary_val
+        return term
+
+
+# <unary>    ::= ! <unary>
+#              | - <unary>
+#              | <factor>
+class UnaryNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        # If only 1 child we have factor node so just check its semantics
+        if len(self.children) == 1:
+            return self.children[0].check_semantics(scopes)
+
+        unary_info = self.children[1].check_semantics(scopes)  # info about the unary node
+        op = self.children[0].token.value  # operator ('!' or '-')
+        unary_t = unary_info['ttype']  # Type of the unary node
+
+        if op == '!' and unary_t == 'bool':  # not op must operate on 'bool'
+            return unary_info
+        if op == '-' and unary_t in ['int', 'double']:  # negate op must operate on numerals
+            return unary_info
+
+        # Else we got a string
+        raise TypeMismatchError('bool, int, double', 'string')
+
+    def run(self, rover, frames):
+        # If only one child we only have a factor node so evaluate that
+        if len(self.children) == 1:
+            return self.children[0].run(rover, frames)
+
+        unary_obj = self.children[1].run(rover, frames)
+        op = self.children[0].token.value
+
+        # Calculate the unary depending on operator and return
+        if op == '!':
+            return not unary_obj
+        else:
+            return - unary_obj
+
+    def lower(self):
+        # If only one child we only have a factor node so it is the lowered node
+        if len(self.children) == 1:
+            return self.children[0].lower()
+        return UnaryOpNode(self.children[0].token, self.children[1].lower())
+
+
+# <factor>   ::= ( <bool> )
+#              | <loc>
+#              | ROVER . <get>
+#              | NUM
+#              | REAL
+#              | TRUE
+#              | FALSE
+class FactorNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        # If we have ( <bool> ) just check semantics for <bool>
+        if isinstance(self.children[0], BoolNode):
+            return self.children[0].check_semantics(scopes)
+
+        # If we have Loc node return the type of variable to assign
+        if isinstance(self.children[0], LocNode):
+            type_info = self.children[0].check_semantics(scopes)
+            # If type is arr error because factor cannot have an array (cannot mul, div, add, sub, compare arrays)
+            if type_info['is_arr']:
+                print("Factor must be basic type")
+                raise TypeMismatchError('basic type', 'array', extra='Factor must be basic type')
+            return type_info
+
+        # ===== BASIC types (base cases and rover attr.) ===== #
+        if self.children[0].token.ttype == Vocab.ROVER:
+            info = self.children[1].check_semantics(scopes)
+            return info
+
+        # If int return the int base type in dictionary
+        if self.children[0].token.ttype == Vocab.NUM:
+            return {
+                'ttype': 'int',
+                'is_arr': False,
+                'dim': 0,
+                'value': None
+            }
+
+        # If double return base type in dictionary
+        if self.children[0].token.ttype == Vocab.REAL:
+            return {
+                'ttype': 'double',
+                'is_arr': False,
+                'dim': 0,
+                'value': None
+            }
+
+        # If bool return base type in dictionary
+        if self.children[0].token.ttype in [Vocab.TRUE, Vocab.FALSE]:
+            return {
+                'ttype': 'bool',
+                'is_arr': False,
+                'dim': 0,
+                'value': None
+            }
+
+        if self.children[0].token.ttype == Vocab.STRING:
+            return {
+                'ttype': 'string',
+                'is_arr': False,
+                'dim': 0,
+                'value': None
+            }
+
+    def run(self, rover, frames):
+        # If bool node
+        if isinstance(self.children[0], BoolNode):
+            return self.children[0].run(rover, frames)
+
+        # If loc node
+        if isinstance(self.children[0], LocNode):
+            return self.children[0].run(rover, frames)  # value of the variable (or of the array index)
+
+        # If rover get
+        if self.children[0].token.ttype == Vocab.ROVER:
+            return self.children[1].run(rover, frames)  # return the get() command
+
+        # If int
+        if self.children[0].token.ttype == Vocab.NUM:
+            return int(self.children[0].token.value)  # cast string value to int
+
+        # If double
+        if self.children[0].token.ttype == Vocab.REAL:
+            return float(self.children[0].token.value)  # cast string value to float
+
+        # If true
+        if self.children[0].token.ttype == Vocab.TRUE:  # return boolean True
+            return True
+
+        # if false
+        if self.children[0].token.ttype == Vocab.FALSE:  # return boolean False
+            return False
+
+        # if string
+        if self.children[0].token.ttype == Vocab.STRING:  # return the string
+            return self.children[0].token.value[1:-1]  # remove quotes
+
+    def lower(self):
+        # ( <bool> ) is just the bool
+        if isinstance(self.children[0], BoolNode):
+            return self.children[0].lower()
+
+        # Reading a variable
+        if isinstance(self.children[0], LocNode):
+            return LoadNode(self.children[0].lower())
+
+        # ROVER . <get> is just the get
+        if self.children[0].token.ttype == Vocab.ROVER:
+            return self.children[1].lower()
+
+        return LiteralNode(self.children[0].token)
+
+
+# ROVER NODES
+class DirectionNode(Node):
+    __slots__ = ()
+
+    def run(self, rover, frames):
+        if self.children[0].token.ttype == Vocab.UP:
+            return 0
+        if self.children[0].token.ttype == Vocab.RIGHT:
+            return 1
+        if self.children[0].token.ttype == Vocab.DOWN:
+            return 2
+        if self.children[0].token.ttype == Vocab.LEFT:
+            return 3
+
+    def compile(self):
+        direction = self.run(rover=None, frames=None)  # Doesn't depend on the rover
+        return lambda rover, frames: direction
+
+
+class RotationNode(Node):
+    __slots__ = ()
+
+    def run(self, rover, frames):
+        if self.children[0].token.ttype == Vocab.RIGHT:
+            return 0
+        if self.children[0].token.ttype == Vocab.LEFT:
+            return 1
+
+    def compile(self):
+        rotation = self.run(rover=None, frames=None)  # Doesn't depend on the rover
+        return lambda rover, frames: rotation
+
+
+# Rover attribute read by each simple getter
+_GET_ATTRIBUTES = {
+    Vocab.ORIENTATION: 'orientation',
+    Vocab.X_POS: 'x_pos',
+    Vocab.Y_POS: 'y_pos',
+    Vocab.GOLD: 'gold',
+    Vocab.SILVER: 'silver',
+    Vocab.COPPER: 'copper',
+    Vocab.IRON: 'iron',
+    Vocab.POWER: 'power',
+}
+
+# Rover method called by each action without arguments
+_ACTION_METHODS = {
+    Vocab.SCAN: 'scan',
+    Vocab.DRILL: 'drill',
+    Vocab.SHOCKWAVE: 'shockwave',
+    Vocab.BUILD: 'build',
+    Vocab.SONAR: 'sonar',
+    Vocab.PUSH: 'push',
+    Vocab.RECHARGE: 'recharge',
+    Vocab.BACKFLIP: 'backflip',
+    Vocab.PRINT_INVENTORY: 'print_inventory',
+    Vocab.PRINT_MAP: 'print_map',
+    Vocab.PRINT_POS: 'print_pos',
+    Vocab.PRINT_ORIENTATION: 'print_orientation',
+}
+
+
+# <get>     ::= ORIENTATION
+#             | X_POS
+#             | Y_POS
+#             | GOLD
+#             | SILVER
+#             | COPPER
+#             | IRON
+#             | POWER
+#             | SONAR
+#             | MAX_MOVE <direction>
+#             | CAN_MOVE <direction>
+#             | NEAREST STRING
+#             | NEAREST_X STRING
+#             | NEAREST_Y STRING
+class GetNode(Node):
+    __slots__ = ("ttype",)
+
+    def check_semantics(self, scopes):
+        if self.children[0].token.ttype in (Vocab.NEAREST, Vocab.NEAREST_X, Vocab.NEAREST_Y) and len(self.tile()) != 1:
+            raise TypeMismatchError('tile', self.children[1].token.value, "a tile is a string of one character.")
+        if self.children[0].token.ttype == Vocab.CAN_MOVE:  # can_move returns a bool
+            self.ttype = 'bool'
+        else:  # the rest all return ints
+            self.ttype = 'int'
+        return {
+            'ttype': self.ttype,
+            'is_arr': False,
+            'dim': 0,
+            'value': None
+        }
+
+    def run(self, rover, frames):
+        # Get the correct rover attribute depending on the token we got
+        if self.children[0].token.ttype == Vocab.ORIENTATION:
+            return rover.orientation
+        if self.children[0].token.ttype == Vocab.X_POS:
+            return rover.x_pos
+        if self.children[0].token.ttype == Vocab.Y_POS:
+            return rover.y_pos
+        if self.children[0].token.ttype == Vocab.GOLD:
+            return rover.gold
+        if self.children[0].token.ttype == Vocab.SILVER:
+            return rover.silver
+        if self.children[0].token.ttype == Vocab.COPPER:
+            return rover.copper
+        if self.children[0].token.ttype == Vocab.IRON:
+            return rover.iron
+        if self.children[0].token.ttype == Vocab.POWER:
+            return rover.power
+        if self.children[0].token.ttype == Vocab.SONAR:
+            return rover.sonar()
+        if self.children[0].token.ttype == Vocab.CAN_MOVE:
+            return rover.can_move(self.children[1].run(rover, frames))
+        if self.children[0].token.ttype == Vocab.MAX_MOVE:
+            return rover.max_move(self.children[1].run(rover, frames))
+        if self.children[0].token.ttype == Vocab.NEAREST:
+            return rover.nearest(self.tile())
+        if self.children[0].token.ttype == Vocab.NEAREST_X:
+            return rover.nearest_x(self.tile())
+        if self.children[0].token.ttype == Vocab.NEAREST_Y:
+            return rover.nearest_y(self.tile())
+
+    def tile(self):
+        # Tile type the nearest getters look for
+        return self.children[1].token.value[1:-1]  # remove quotes from string
+
+    def compile(self):
+        ttype = self.children[0].token.ttype
+        if ttype in (Vocab.NEAREST, Vocab.NEAREST_X, Vocab.NEAREST_Y):
+            nearest = operator.methodcaller(self.children[0].token.value, self.tile())
+            return lambda rover, frames: nearest(rover)
+        if ttype == Vocab.CAN_MOVE:
+            direction = self.children[1].run(rover=None, frames=None)
+            return lambda rover, frames: rover.can_move(direction)
+        if ttype == Vocab.MAX_MOVE:
+            direction = self.children[1].run(rover=None, frames=None)
+            return lambda rover, frames: rover.max_move(direction)
+        if ttype == Vocab.SONAR:
+            return lambda rover, frames: rover.sonar()
+        get = operator.attrgetter(_GET_ATTRIBUTES[ttype])
+        return lambda rover, frames: get(rover)
+
+
+# <action>  ::= SCAN
+#             | DRILL
+#             | SHOCKWAVE
+#             | BUILD
+#             | SONAR
+#             | PUSH
+#             | RECHARGE
+#             | BACKFLIP
+#             | PRINT_INVENTORY
+#             | PRINT_MAP
+#             | PRINT_POS
+#             | PRINT_ORIENTATION
+#             | CHANGE_MAP STRING
+#             | MOVE <direction> <bool>
+#             | TURN <rotation
+class ActionNode(Node):
+    __slots__ = ()
+
+    def check_semantics(self, scopes):
+        # If move we need to evaluate the bool expr and make sure it is an int
+        if self.children[0].token.ttype == Vocab.MOVE:
+            bool_info = self.children[2].check_semantics(scopes)
+            if bool_info['ttype'] != 'int':
+                raise TypeMismatchError('int', bool_info['ttype'])
+
+        # STRING check for change_map is done while parsing
+
+    def run(self, rover, frames):
+        # Do the correct rover action depending on the token we got
+        if self.children[0].token.ttype == Vocab.SCAN:
+            rover.scan()
+        elif self.children[0].token.ttype == Vocab.DRILL:
+            rover.drill()
+        elif self.children[0].token.ttype == Vocab.SHOCKWAVE:
+            rover.shockwave()
+        elif self.children[0].token.ttype == Vocab.BUILD:
+            rover.build()
+        elif self.children[0].token.ttype == Vocab.SONAR:
+            rover.sonar()
+        elif self.children[0].token.ttype == Vocab.PUSH:
+            rover.push()
+        elif self.children[0].token.ttype == Vocab.RECHARGE:
+            rover.recharge()
+        elif self.children[0].token.ttype == Vocab.BACKFLIP:
+            rover.backflip()
+        elif self.children[0].token.ttype == Vocab.PRINT_INVENTORY:
+            rover.print_inventory()
+        elif self.children[0].token.ttype == Vocab.PRINT_MAP:
+            rover.print_map()
+        elif self.children[0].token.ttype == Vocab.PRINT_POS:
+            rover.print_pos()
+        elif self.children[0].token.ttype == Vocab.PRINT_ORIENTATION:
+            rover.print_orientation()
+        elif self.children[0].token.ttype == Vocab.CHANGE_MAP:
+            rover.change_map(self.children[1].token.value[1:-1])  # remove quotes from string
+        elif self.children[0].token.ttype == Vocab.MOVE:
+            rover.move(self.children[1].run(rover, frames), self.children[2].run(rover, frames))
+        elif self.children[0].token.ttype == Vocab.TURN:
+            rover.turn(self.children[1].run(rover, frames))
+
+    def compile(self):
+        ttype = self.children[0].token.ttype
+        if ttype == Vocab.CHANGE_MAP:
+            path = self.children[1].token.value[1:-1]  # remove quotes from string
+            return lambda rover, frames: rover.change_map(path)
+        if ttype == Vocab.MOVE:
+            direction = self.children[1].run(rover=None, frames=None)
+            steps = self.children[2].compile()
+            return lambda rover, frames: rover.move(direction, steps(rover, frames))
+        if ttype == Vocab.TURN:
+            rotation = self.children[1].run(rover=None, frames=None)
+            return lambda rover, frames: rover.turn(rotation)
+        action = operator.methodcaller(_ACTION_METHODS[ttype])
+        return lambda rover, frames: action(rover)
+
+
+# COMPACT AST NODES
+# The lowering pass (Node.lower()) replaces the <bool> ... <factor> chains by
+# these, one node per real operation.
+
+# Type checking rule for each binary operator
+_BINARY_TYPE_INFO = {
+    Vocab.OR: _logic_type_info,
+    Vocab.AND: _logic_type_info,
+    Vocab.EQ: _equality_type_info,
+    Vocab.NEQ: _equality_type_info,
+    Vocab.LTEQ: _rel_type_info,
+    Vocab.GTEQ: _rel_type_info,
+    Vocab.LT: _rel_type_info,
+    Vocab.GT: _rel_type_info,
+    Vocab.PLUS: _arith_type_info,
+    Vocab.MINUS: _arith_type_info,
+    Vocab.MUL: _arith_type_info,
+    Vocab.DIV: _arith_type_info,
+}
+
+
+def _div(left, right):
+    if right == 0:
+        raise ZeroDivisionError
+    return left / right
+
+
+def _or(left, right):
+    return left or right
+
+
+def _and(left, right):
+    return left and right
+
+
+# Python implementation of each binary operator, from the values of both operands
+_BINARY_OPS = {
+    Vocab.OR: _or,
+    Vocab.AND: _and,
+    Vocab.EQ: operator.eq,
+    Vocab.NEQ: operator.ne,
+    Vocab.LTEQ: operator.le,
+    Vocab.GTEQ: operator.ge,
+    Vocab.LT: operator.lt,
+    Vocab.GT: operator.gt,
+    Vocab.PLUS: operator.add,
+    Vocab.MINUS: operator.sub,
+    Vocab.MUL: operator.mul,
+    Vocab.DIV: _div,
+}
+
+
+# Value of the left operand of && and || that makes them skip the right one
+_SHORT_CIRCUIT_ON = {
+    Vocab.OR: True,
+    Vocab.AND: False,
+}
+
+
+def _or_closure(left, right):
+    if SHORT_CIRCUIT:
+        return lambda rover, frames: left(rover, frames) or right(rover, frames)
+
+    def run_or(rover, frames):
+        left_val = left(rover, frames)
+        right_val = right(rover, frames)  # both operands are always evaluated
+        return left_val or right_val
+    return run_or
+
+
+def _and_closure(left, right):
+    if SHORT_CIRCUIT:
+        return lambda rover, frames: left(rover, frames) and right(rover, frames)
+
+    def run_and(rover, frames):
+        left_val = left(rover, frames)
+        right_val = right(rover, frames)  # both operands are always evaluated
+        return left_val and right_val
+    return run_and
+
+
+def _div_closure(left, right):
+    def run_div(rover, frames):
+        left_val = left(rover, frames)
+        right_val = right(rover, frames)
+        if right_val == 0:
+            raise ZeroDivisionError
+        return left_val / right_val
+    return run_div
+
+
+# Builds the compiled function of each binary operator from its compiled operands
+_BINARY_CLOSURES = {
+    Vocab.OR: _or_closure,
+    Vocab.AND: _and_closure,
+    Vocab.EQ: lambda left, right: lambda rover, frames: left(rover, frames) == right(rover, frames),
+    Vocab.NEQ: lambda left, right: lambda rover, frames: left(rover, frames) != right(rover, frames),
+    Vocab.LTEQ: lambda left, right: lambda rover, frames: left(rover, frames) <= right(rover, frames),
+    Vocab.GTEQ: lambda left, right: lambda rover, frames: left(rover, frames) >= right(rover, frames),
+    Vocab.LT: lambda left, right: lambda rover, frames: left(rover, frames) < right(rover, frames),
+    Vocab.GT: lambda left, right: lambda rover, frames: left(rover, frames) > right(rover, frames),
+    Vocab.PLUS: lambda left, right: lambda rover, frames: left(rover, frames) + right(rover, frames),
+    Vocab.MINUS: lambda left, right: lambda rover, frames: left(rover, frames) - right(rover, frames),
+    Vocab.MUL: lambda left, right: lambda rover, frames: left(rover, frames) * right(rover, frames),
+    Vocab.DIV: _div_closure,
+}
+
+# Same, for operators whose right operand is a literal: the value is kept
+# instead of calling the literal's closure
+_CONSTANT_CLOSURES = {
+    Vocab.EQ: lambda left, value: lambda rover, frames: left(rover, frames) == value,
+    Vocab.NEQ: lambda left, value: lambda rover, frames: left(rover, frames) != value,
+    Vocab.LTEQ: lambda left, value: lambda rover, frames: left(rover, frames) <= value,
+    Vocab.GTEQ: lambda left, value: lambda rover, frames: left(rover, frames) >= value,
+    Vocab.LT: lambda left, value: lambda rover, frames: left(rover, frames) < value,
+    Vocab.GT: lambda left, value: lambda rover, frames: left(rover, frames) > value,
+    Vocab.PLUS: lambda left, value: lambda rover, frames: left(rover, frames) + value,
+    Vocab.MINUS: lambda left, value: lambda rover, frames: left(rover, frames) - value,
+    Vocab.MUL: lambda left, value: lambda rover, frames: left(rover, frames) * value,
+}
+
+# Ints up to this size are exact as doubles, int(left / right) of them is left // right
+_EXACT_DOUBLE_INT = 2 ** 53
+
+
+# int / int assigned to an int variable: the truncated quotient, without
+# making a double and converting it back when the operands allow it
+def _truncating_div_closure(left, right):
+    def run_truncating_div(rover, frames):
+        left_val = left(rover, frames)
+        right_val = right(rover, frames)
+        if right_val is not None and right_val > 0 and left_val is not None and 0 <= left_val < _EXACT_DOUBLE_INT:
+            return left_val // right_val
+        if right_val == 0:
+            raise ZeroDivisionError
+        return int(left_val / right_val)  # negative or huge operands, or None which raises
+    return run_truncating_div
+
+
+# <left> op <right>, the token is the operator
+class BinOpNode(Node):
+    __slots__ = ("op", "short_circuit_on", "ttype")
+
+    def __init__(self, token, left, right):
+        super().__init__(token)
+        self.op = _BINARY_OPS[token.ttype]
+        self.short_circuit_on = _SHORT_CIRCUIT_ON.get(token.ttype)  # None if not && or ||
+        self.add_child(left)
+        self.add_child(right)
+
+    def check_semantics(self, scopes):
+        left_info = self.children[0].check_semantics(scopes)
+        right_info = self.children[1].check_semantics(scopes)
+        type_info = _BINARY_TYPE_INFO[self.token.ttype](left_info, right_info)
+        self.ttype = type_info['ttype']  # the compiler specializes on it
+        return type_info
+
+    def run(self, rover, frames):
+        left = self.children[0].run(rover, frames)
+        if self.short_circuit_on is not None and SHORT_CIRCUIT and bool(left) == self.short_circuit_on:
+            return left  # the right operand can't change the result
+        return self.op(left, self.children[1].run(rover, frames))
+
+    def compile(self):
+        left, right = self.children
+        ttype = self.token.ttype
+        if SPECIALIZE_BY_TYPE and isinstance(right, LiteralNode) and ttype in _CONSTANT_CLOSURES:
+            return _CONSTANT_CLOSURES[ttype](left.compile(), right.value)
+        return _BINARY_CLOSURES[ttype](left.compile(), right.compile())
+
+
+# Operators of the same level in a row lowered to nested BinOpNodes, a longer
+# chain becomes one ChainNode so checking, compiling and running it doesn't
+# recurse once per operator (`1 + 1 + ...` with thousands of terms)
+MAX_BINARY_CHAIN = 16
+
+
+# <operand> op <operand> op ... <operand>, a long chain of left associative
+# operators of the same level, or an equality chain with more than one
+# operator. The children are the operands, ops the operator tokens between
+# them.
+class ChainNode(Node):
+    __slots__ = ("ops", "funcs", "ttype")
+
+    def __init__(self, operands, ops):
+        super().__init__(NonTerminals.CHAIN, operands)
+        self.ops = ops
+        self.funcs = [_BINARY_OPS[op.ttype] for op in ops]
+
+    def check_semantics(self, scopes):
+        # Operands are checked in order, then their types are combined like
+        # the parse tree does (_chain_type_info): from the right for == and
+        # !=, so `true == 1 == 1` is accepted and `1 == 1 == true` isn't.
+        # Other chains accept the same operands from either side.
+        infos = [operand.check_semantics(scopes) for operand in self.children]
+        type_info = infos[-1]
+        for op, operand_info in zip(reversed(self.ops), reversed(infos[:-1])):
+            type_info = _BINARY_TYPE_INFO[op.ttype](operand_info, type_info)
+        self.ttype = type_info['ttype']
+        return type_info
+
+    def run(self, rover, frames):
+        value = self.children[0].run(rover, frames)
+        for op, func, operand in zip(self.ops, self.funcs, self.children[1:]):
+            short_circuit_on = _SHORT_CIRCUIT_ON.get(op.ttype)
+            if short_circuit_on is not None and SHORT_CIRCUIT and bool(value) == short_circuit_on:
+                continue  # the operand can't change the result
+            value = func(value, operand.run(rover, frames))
+        return value
+
+    def compile(self):
+        first = self.children[0].compile()
+        steps = [
+            (func, _SHORT_CIRCUIT_ON.get(op.ttype) if SHORT_CIRCUIT else None, operand.compile())
+            for op, func, operand in zip(self.ops, self.funcs, self.children[1:])
+        ]
+
+        def run_chain(rover, frames):
+            value = first(rover, frames)
+            for op, short_circuit_on, operand in steps:
+                if short_circuit_on is not None and bool(value) == short_circuit_on:
+                    continue  # the operand can't change the result
+                value = op(value, operand(rover, frames))
+            return value
+        return run_chain
+
+
+# op <operand>, the token is the operator ('!' or '-')
+class UnaryOpNode(Node):
+    __slots__ = ("ttype",)
+
+    def __init__(self, token, operand):
+        super().__init__(token)
+        self.add_child(operand)
+
+    def check_semantics(self, scopes):
+        unary_info = self.children[0].check_semantics(scopes)
+        op = self.token.value
+        unary_t = unary_info['ttype']
+
+        if not ((op == '!' and unary_t == 'bool') or (op == '-' and unary_t in ['int', 'double'])):
+            # not op must operate on 'bool', negate op must operate on numerals
+            raise TypeMismatchError('bool, int, double', unary_t)
+        self.ttype = unary_t
+        return unary_info
+
+    def run(self, rover, frames):
+        if self.token.ttype == Vocab.NOT:
+            return not self.children[0].run(rover, frames)
+        return - self.children[0].run(rover, frames)
+
+    def compile(self):
+        operand = self.children[0].compile()
+        if self.token.ttype == Vocab.NOT:
+            return lambda rover, frames: not operand(rover, frames)
+        return lambda rover, frames: - operand(rover, frames)
+
+
+# NUM, REAL, TRUE, FALSE or STRING, the value is converted once when lowering
+class LiteralNode(Node):
+    __slots__ = ("value", "ttype")
+
+    # Language type of each literal token
+    types = {
+        Vocab.NUM: 'int',
+        Vocab.REAL: 'double',
+        Vocab.TRUE: 'bool',
+        Vocab.FALSE: 'bool',
+        Vocab.STRING: 'string',
+    }
+
+    def __init__(self, token):
+        super().__init__(token, NO_CHILDREN)
+        if token.ttype == Vocab.NUM:
+            self.value = int(token.value)
+        elif token.ttype == Vocab.REAL:
+            self.value = float(token.value)
+        elif token.ttype == Vocab.STRING:
+            self.value = token.value[1:-1]  # remove quotes
+        else:
+            self.value = token.ttype == Vocab.TRUE
+        self.ttype = self.types[token.ttype]
+
+    def check_semantics(self, scopes):
+        return {
+            'ttype': self.ttype,
+            'is_arr': False,
+            'dim': 0,
+            'value': None
+        }
+
+    def run(self, rover, frames):
+        return self.value
+
+    def compile(self):
+        value = self.value
+        return lambda rover, frames: value
+
+
+# Reads the value of a variable (or an array element), the only child is the <loc>
+class LoadNode(Node):
+    __slots__ = ("ttype",)
+
+    def __init__(self, loc):
+        super().__init__(NonTerminals.LOAD)
+        self.add_child(loc)
+
+    def check_semantics(self, scopes):
+        type_info = self.children[0].check_semantics(scopes)
+        # Cannot mul, div, add, sub or compare arrays
+        if type_info['is_arr']:
+            raise TypeMismatchError('basic type', 'array', extra='Factor must be basic type')
+        self.ttype = type_info['ttype']
+        return type_info
+
+    def run(self, rover, frames):
+        return self.children[0].run(rover, frames)
+
+    def compile(self):
+        loc = self.children[0]
+        frame = -1 - loc.address[0]
+        slot = loc.address[1]
+        if len(loc.children[1].children) == 0:
+            return lambda rover, frames: frames[frame][slot]
+
+        offset = loc.compile_offset()
+        if loc.ttype == 'bool':
+            return lambda rover, frames: bool(frames[frame][slot][offset(rover, frames)])  # bool arrays are bytearrays
+        return lambda rover, frames: frames[frame][slot][offset(rover, frames)]
+
+
+# Block added by the optimizer around a statement, its frame holds the values
+# of the CachedNodes in the statement instead of variables. The frame is made
+# again every time the statement runs, which empties the caches.
+class CacheBlockNode(BlockNode):
+    __slots__ = ()
+
+    def __init__(self, stmt, n_slots):
+        super().__init__(NonTerminals.BLOCK, [stmt])
+        self.n_slots = n_slots  # one slot per cached expression
+
+    def check_semantics(self, scopes):
+        # Keeps the slots, the cached expressions don't declare anything
+        scopes.push({})
+        for child in self.children:
+            child.check_semantics(scopes)
+        scopes.pop()
+
+
+# Expression evaluated once per run of the statement of its CacheBlockNode:
+# the first time it runs its value is stored in the block's frame, at
+# address (depth, slot), and read from there afterwards. None is an empty
+# cache, a value that really is None (`b || c` of unset bools) is just
+# evaluated again.
+class CachedNode(Node):
+    __slots__ = ("address", "ttype")
+
+    def __init__(self, expr, address):
+        super().__init__(NonTerminals.CACHED)
+        self.add_child(expr)
+        self.address = address
+        self.ttype = expr.ttype
+
+    def check_semantics(self, scopes):
+        return self.children[0].check_semantics(scopes)
+
+    def run(self, rover, frames):
+        depth, slot = self.address
+        frame = frames[-1 - depth]
+        value = frame[slot]
+        if value is None:
+            value = frame[slot] = self.children[0].run(rover, frames)
+        return value
+
+    def compile(self):
+        expr = self.children[0].compile()
+        frame_index = -1 - self.address[0]
+        slot = self.address[1]
+
+        def run_cached(rover, frames):
+            frame = frames[frame_index]
+            value = frame[slot]
+            if value is None:
+                value = frame[slot] = expr(rover, frames)
+            return value
+        return run_cached
+
+
+# Expressions of a checked compact AST that are ints at runtime (or raise), so
+# compilers can skip the int() cast when assigning them to an int variable.
+# Not true for plain loads since a variable can still be None, int array
+# elements always are.
+# The int / int division is typed int but gives a double until it is assigned.
+def is_exact_int(node):
+    if node.ttype != 'int':
+        return False
+    if isinstance(node, CachedNode):
+        return is_exact_int(node.children[0])
+    if isinstance(node, LoadNode):
+        return len(node.children[0].children[1].children) > 0
+    if isinstance(node, UnaryOpNode):
+        return _is_int_operand(node.children[0])
+    if isinstance(node, BinOpNode):
+        return (
+            node.token.ttype != Vocab.DIV
+            and _is_int_operand(node.children[0])
+            and _is_int_operand(node.children[1])
+        )
+    if isinstance(node, ChainNode):
+        return all(op.ttype != Vocab.DIV for op in node.ops) and all(map(_is_int_operand, node.children))
+    return isinstance(node, (LiteralNode, GetNode))
+
+
+# Operands that are ints or None (which makes arithmetic raise)
+def _is_int_operand(node):
+    if isinstance(node, LoadNode):
+        return node.ttype == 'int'
+    return is_exact_int(node)
+
+
+# `int / int`, a double truncated when it is assigned to an int variable.
+# Not `int / int / int`, the inner quotient is a double already.
+def is_int_division(node):
+    return (
+        isinstance(node, BinOpNode)
+        and node.token.ttype == Vocab.DIV
+        and _is_int_operand(node.children[0])
+        and _is_int_operand(node.children[1])
+    )
+
+
+# Key telling literal values apart when they are pooled or compared: 1, 1.0
+# and true are different, and so are 0.0 and -0.0 although they are equal.
+def constant_key(value):
+    if isinstance(value, float):
+        return (float, math.copysign(1.0, value), value)
+    return (type(value), value)
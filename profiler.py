@@ -0,0 +1,243 @@
+"""
+Profiler of rover programs: how many times each statement ran and how long it
+took, mapped back to its line in the source, and the same for the methods of
+the rover the program calls.
+
+A profiled run uses an instrumented copy of the checked tree, where every
+statement is wrapped in a ProfiledNode timing it, and the rover's methods are
+replaced by timed ones for the length of the run. Programs that aren't
+profiled run from the tree as it is, so they pay nothing for it.
+
+Times are inclusive (total) and exclusive of the statements and methods run
+inside (self), the cost of timing those counts in the self time of the one
+running them. The collapsed stacks (collapsed_stacks(), write_collapsed())
+give the self time of every nesting of statements in microseconds, one
+"outer;inner;Rover.method 1234" line per nesting, the format flamegraph.pl and
+speedscope read.
+
+Run ```python profiler.py [file_to_parse]``` to profile a program on a rover of
+this process.
+"""
+
+import collections
+import contextlib
+import copy
+import pathlib
+import sys
+import time
+
+from parser_components import BlockNode, LocNode, Node, StmtNode, Vocab
+
+# Backends that can run an instrumented tree
+PROFILED_BACKENDS = ["tree", "closure"]
+
+# Rows of the report printed by main()
+REPORT_ROWS = 40
+
+# Methods of the rover timed during a profiled run, every one a program can call
+ROVER_METHODS = [
+    "scan",
+    "drill",
+    "shockwave",
+    "build",
+    "sonar",
+    "push",
+    "recharge",
+    "backflip",
+    "print_inventory",
+    "print_map",
+    "print_pos",
+    "print_orientation",
+    "change_map",
+    "move",
+    "turn",
+    "can_move",
+    "max_move",
+    "nearest",
+    "nearest_x",
+    "nearest_y",
+]
+
+
+def statement_label(stmt):
+    """Returns (label, line) of a statement, the label says what it is and where it starts."""
+    first = stmt.children[0]
+    if isinstance(first, LocNode):
+        token = first.children[0].token
+        kind = f"{token.value} ="
+    else:
+        token = first.token
+        kind = token.value
+        if token.ttype == Vocab.ROVER:
+            kind = f"rover . {stmt.children[1].children[0].token.value}"
+    return f"{kind} @{token.line}:{token.col}", token.line
+
+
+# Statement timed by its profiler, in place of the statement in the tree
+class ProfiledNode(Node):
+    __slots__ = ("label", "profiler", "run_timed")
+
+    def __init__(self, node, label, profiler):
+        super().__init__(node.token, [node])
+        self.label = label
+        self.profiler = profiler
+        self.run_timed = profiler.timed(label, node.run)
+
+    def run(self, rover, frames):
+        return self.run_timed(rover, frames)
+
+    def compile(self):
+        return self.profiler.timed(self.label, self.children[0].compile())
+
+
+class Profiler:
+    """Hit counts and times of the statements and rover methods of the runs of one program."""
+
+    def __init__(self):
+        self.stats = {}  # label: [hits, total seconds, self seconds]
+        self.lines = {}  # label of a statement: its line in the source
+        self.source_lines = []
+        self.stack_times = collections.defaultdict(float)  # labels from the outermost: self seconds
+        self._stack = [[(), 0.0]]  # [labels, seconds spent in the ones run inside] of what runs now
+
+    def timed(self, label, func):
+        """Returns func counting its calls and time under label."""
+        stat = self.stats.setdefault(label, [0, 0.0, 0.0])
+        stack = self._stack
+        stack_times = self.stack_times
+        clock = time.perf_counter
+
+        def run_timed(*args):
+            parent = stack[-1]
+            entry = [parent[0] + (label,), 0.0]
+            stack.append(entry)
+            start = clock()
+            try:
+                return func(*args)
+            finally:
+                elapsed = clock() - start
+                stack.pop()
+                parent[1] += elapsed
+                self_time = elapsed - entry[1]
+                stat[0] += 1
+                stat[1] += elapsed
+                stat[2] += self_time
+                stack_times[entry[0]] += self_time
+        return run_timed
+
+    def instrument(self, parse_tree, source=""):
+        """Returns a copy of the checked parse_tree of source with every statement timed.
+
+        Only statements and blocks are copied, expressions are shared with
+        parse_tree, which isn't changed.
+        """
+        self.source_lines = source.splitlines()
+        program = copy.copy(parse_tree)
+        program.children = [
+            ProfiledNode(self._instrument(child), "program", self)
+            for child in parse_tree.children
+        ]
+        return program
+
+    def _instrument(self, node):
+        if isinstance(node, StmtNode):
+            stmt = copy.copy(node)
+            stmt.children = list(node.children)
+            ttype = getattr(stmt.children[0].token, "ttype", None)
+            if ttype in (Vocab.IF, Vocab.WHILE):
+                for i in range(2, len(stmt.children), 2):  # the statements, not ELSE
+                    stmt.children[i] = self._instrument(stmt.children[i])
+            label, line = statement_label(stmt)
+            self.lines[label] = line
+            return ProfiledNode(stmt, label, self)
+        if isinstance(node, BlockNode):
+            block = copy.copy(node)
+            block.children = [self._instrument(child) for child in node.children]
+            return block
+        return node  # declarations
+
+    @contextlib.contextmanager
+    def profiling(self, rover):
+        """Times the methods of rover the program calls while the with block runs."""
+        for name in ROVER_METHODS:
+            setattr(rover, name, self.timed(f"Rover.{name}", getattr(rover, name)))
+        try:
+            yield self
+        finally:
+            for name in ROVER_METHODS:
+                delattr(rover, name)  # back to the methods of the class
+
+    def total_time(self):
+        stat = self.stats.get("program")
+        return stat[1] if stat else 0.0
+
+    def report(self, limit=None):
+        """Returns a table of the statements and rover methods, the ones with the most self time first."""
+        total = self.total_time() or 1.0
+        rows = sorted(
+            ((label, stat) for label, stat in self.stats.items() if stat[0] and label != "program"),
+            key=lambda row: row[1][2],
+            reverse=True,
+        )
+        if limit is not None:
+            rows = rows[:limit]
+
+        lines = [
+            f"total {self.total_time():.6f} s",
+            f"{'statement or method':28} {'hits':>10} {'total s':>10} {'self s':>10} {'self %':>7}  source",
+        ]
+        for label, (hits, total_time, self_time) in rows:
+            source = ""
+            line = self.lines.get(label)
+            if line is not None and 0 < line <= len(self.source_lines):
+                source = self.source_lines[line - 1].strip()
+            lines.append(
+                f"{label:28} {hits:>10} {total_time:>10.6f} {self_time:>10.6f} "
+                f"{self_time / total * 100:>6.1f}%  {source}"
+            )
+        return "\n".join(lines)
+
+    def collapsed_stacks(self):
+        """Returns the self time of every nesting, one "outer;inner microseconds" line each."""
+        return "".join(
+            f"{';'.join(labels)} {round(seconds * 1e6)}\n"
+            for labels, seconds in sorted(self.stack_times.items())
+            if round(seconds * 1e6) > 0
+        )
+
+    def write_collapsed(self, path):
+        pathlib.Path(path).write_text(self.collapsed_stacks(), encoding="utf-8")
+
+
+def main():
+    # Profile the program in the file given on a rover of this process
+    # With --backend=NAME, run it with that backend (tree or closure)
+    # With --collapsed=PATH, also write the collapsed stacks to PATH
+    import rover  # rover imports this module
+
+    args = []
+    backend = rover.DEFAULT_BACKEND
+    collapsed_path = None
+    for arg in sys.argv[1:]:
+        option, _, value = arg.partition("=")
+        if option == "--backend":
+            backend = value
+        elif option == "--collapsed":
+            collapsed_path = value
+        elif arg.startswith("--"):
+            raise Exception(f"Unknown option given: {arg}")
+        else:
+            args.append(arg)
+    if len(args) != 1:
+        raise Exception(f"Expected 1 file path to profile but found {len(args)}")
+
+    source = pathlib.Path(args[0]).read_text()
+    profiler = Profiler()
+    rover.Rover(rover.ROVER_1).parse_and_execute_cmd(source, backend=backend, profiler=profiler)
+    print(profiler.report(REPORT_ROWS))
+    if collapsed_path is not None:
+        profiler.write_collapsed(collapsed_path)
+
+
+if __name__ == "__main__":
+    main()
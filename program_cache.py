@@ -0,0 +1,169 @@
+"""
+Cache of checked programs, so a command sent again doesn't need to be lexed,
+parsed and checked again.
+
+Programs are found by a hash of their text, of the parser version (a hash
+of parser.py, parser_components.py and optimizer.py) and of
+parser_components.compile_flags(), the flags the trees are optimized and
+compiled for, so changing one at runtime doesn't reuse programs made with the
+old value. The last programs used are kept in memory, along with what each
+backend compiled them to with each value of the flags, until their total size
+goes over max_bytes. Checked parse trees are also pickled to a directory, so
+other rover processes and later runs find them too. The directory has a sub
+directory per parser version, the ones of other versions are removed when the
+cache is created since their trees don't match the parser anymore.
+
+Only trees written by the rovers are loaded from the directory, don't point it
+to a directory others can write to.
+"""
+
+import collections
+import hashlib
+import os
+import pathlib
+import pickle
+import shutil
+import tempfile
+
+import optimizer
+import parser
+import parser_components
+
+# Files the parse trees depend on, a change to one of them invalidates the cache
+PARSER_FILES = [
+    pathlib.Path(parser.__file__),
+    pathlib.Path(parser_components.__file__),
+    pathlib.Path(optimizer.__file__),
+]
+
+# Default limit of the size of the programs kept in memory
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+
+def parser_version():
+    """Returns a hash of the source of the parser, which changes when it changes."""
+    digest = hashlib.sha256()
+    for path in PARSER_FILES:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class CachedProgram:
+    """A checked parse tree, and the programs backends compiled it to."""
+
+    def __init__(self, parse_tree, size):
+        self.parse_tree = parse_tree
+        self.size = size  # bytes of the pickled tree
+        self.programs = {}
+
+    def program(self, backend, compile_program):
+        """Returns the tree compiled by the backend, compiling it the first time with the current flags."""
+        key = (backend, parser_components.compile_flags())
+        if key not in self.programs:
+            self.programs[key] = compile_program(self.parse_tree)
+        return self.programs[key]
+
+
+class ProgramCache:
+    """Checked programs by source, in memory (LRU) and on disk when directory is given."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES, version=None):
+        self.version = version or parser_version()
+        self.max_bytes = max_bytes
+        self.entries = collections.OrderedDict()  # least recently used first
+        self.size = 0
+
+        self.hits = 0  # found in memory
+        self.disk_hits = 0  # found on disk
+        self.misses = 0  # parsed and checked
+        self.evictions = 0
+
+        self.directory = None
+        if directory is not None:
+            directory = pathlib.Path(directory)
+            self.directory = directory / self.version
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for path in directory.iterdir():
+                if path.is_dir() and path.name != self.version:
+                    shutil.rmtree(path, ignore_errors=True)  # written by an older parser
+
+    def key(self, source):
+        flags = parser_components.compile_flags()  # read when optimizing and compiling
+        return hashlib.sha256(f"{self.version}\0{flags}\0{source}".encode("utf-8")).hexdigest()
+
+    def get(self, source, build):
+        """Returns the CachedProgram of source, calling build(source) for its checked tree on a miss.
+
+        Errors raised by build are not cached, the next get builds again.
+        """
+        key = self.key(source)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+
+        entry = self._load(key)
+        if entry is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            entry = self._store(key, build(source))
+        self._add(key, entry)
+        return entry
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.entries),
+            "bytes": self.size,
+        }
+
+    def clear(self):
+        """Forgets the programs in memory, the ones on disk are kept."""
+        self.entries.clear()
+        self.size = 0
+
+    def _add(self, key, entry):
+        self.entries[key] = entry
+        self.size += entry.size
+        # Keep the last one even if it's bigger than max_bytes on its own
+        while self.size > self.max_bytes and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+            self.evictions += 1
+
+    def _path(self, key):
+        return self.directory / f"{key}.pickle"
+
+    def _load(self, key):
+        if self.directory is None:
+            return None
+        try:
+            data = self._path(key).read_bytes()
+            return CachedProgram(pickle.loads(data), len(data))
+        except FileNotFoundError:
+            return None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, RecursionError):
+            return None  # unreadable or truncated, check the program again
+
+    def _store(self, key, parse_tree):
+        try:
+            data = pickle.dumps(parse_tree, protocol=pickle.HIGHEST_PROTOCOL)
+        except RecursionError:
+            # Too deep to pickle, keep it in memory only
+            return CachedProgram(parse_tree, 0)
+
+        if self.directory is not None:
+            # Write to a temporary file first so other rovers never read half a tree
+            try:
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                pass  # not cached on disk, it still works from memory
+        return CachedProgram(parse_tree, len(data))
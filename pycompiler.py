@@ -0,0 +1,459 @@
+"""
+Compiles a checked rover program to Python bytecode.
+
+The lowered parse tree is translated to a Python ast.Module holding one
+function, `rover_program(rover)`, which is then built with compile() and
+exec(). Variables become Python locals (renamed so inner scopes can shadow
+outer ones) and rover getters and actions become direct attribute reads and
+method calls on the Rover instance.
+
+The generated code does exactly what StmtNode.run does: values assigned to
+int variables are truncated with int() like the tree walker does, int and
+double operands are promoted by Python like in the tree walker, and && and
+|| become Python's `and` and `or` (or calls evaluating both operands when
+SHORT_CIRCUIT is turned off). Loops count their iterations against the
+RunBudget given to the function, `rover_program(rover, run_budget)`.
+
+Python can't compile more than MAX_NESTED_LOOPS loops nested in a function,
+a program nesting more while loops is compiled to closures instead.
+"""
+
+import ast
+import pathlib
+import sys
+
+import parser
+import parser_components
+from parser_components import (
+    Vocab,
+
+    StmtNode,
+    DeclNode,
+    BlockNode,
+    CacheBlockNode,
+    LocNode,
+    GetNode,
+    ActionNode,
+    BinOpNode,
+    ChainNode,
+    UnaryOpNode,
+    LiteralNode,
+    LoadNode,
+    CachedNode,
+
+    RunBudget,
+
+    make_array,
+    check_index,
+    is_exact_int,
+    is_constant_index,
+)
+
+FUNCTION_NAME = "rover_program"
+
+# Loops nested in one function python can compile (CO_MAXBLOCKS), a deeper
+# program gets a SyntaxError from compile()
+MAX_NESTED_LOOPS = 20
+
+# Operators of a ChainNode in one python expression, python's compiler
+# recurses once per operator so longer chains are cut in parts
+CHAIN_PART = 16
+
+# Python operator for each operator of the language (&& and || are handled apart)
+_BINARY_OPS = {
+    Vocab.PLUS: ast.Add,
+    Vocab.MINUS: ast.Sub,
+    Vocab.MUL: ast.Mult,
+    Vocab.DIV: ast.Div,
+}
+_COMPARE_OPS = {
+    Vocab.EQ: ast.Eq,
+    Vocab.NEQ: ast.NotEq,
+    Vocab.LTEQ: ast.LtE,
+    Vocab.GTEQ: ast.GtE,
+    Vocab.LT: ast.Lt,
+    Vocab.GT: ast.Gt,
+}
+
+# Rover attribute read by each simple getter
+_GET_ATTRIBUTES = {
+    Vocab.ORIENTATION: "orientation",
+    Vocab.X_POS: "x_pos",
+    Vocab.Y_POS: "y_pos",
+    Vocab.GOLD: "gold",
+    Vocab.SILVER: "silver",
+    Vocab.COPPER: "copper",
+    Vocab.IRON: "iron",
+    Vocab.POWER: "power",
+}
+
+
+# && and || when SHORT_CIRCUIT is turned off, python's `or` and `and` skip
+# the right operand but the arguments of a call are always both evaluated.
+def _or(left, right):
+    return left or right
+
+
+def _and(left, right):
+    return left and right
+
+
+# Globals of the generated code
+_RUNTIME = {
+    "_or": _or,
+    "_and": _and,
+    "make_array": make_array,
+    "check_index": check_index,
+}
+
+
+def _name(name):
+    return ast.Name(id=name, ctx=ast.Load())
+
+
+def _call(func, *args):
+    return ast.Call(func=func, args=list(args), keywords=[])
+
+
+def _rover_call(method, *args):
+    return _call(ast.Attribute(value=_name("rover"), attr=method, ctx=ast.Load()), *args)
+
+
+class PythonCompiler:
+    """Translates a lowered and checked parse tree to a Python ast.Module."""
+
+    def __init__(self):
+        # One dict per open block: language name -> (python name, type)
+        self.scopes = []
+        self.n_names = 0
+        self.n_temps = 0
+        self.loop_depth = 0  # while loops around the statement being translated
+        self.max_loop_depth = 0
+
+    def module(self, parse_tree):
+        body = []
+        for child in parse_tree.children:
+            body.extend(self.stmt(child))
+
+        function = ast.FunctionDef(
+            name=FUNCTION_NAME,
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg="rover"), ast.arg(arg="run_budget")],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            body=body or [ast.Pass()],
+            decorator_list=[],
+            returns=None,
+        )
+        return ast.fix_missing_locations(ast.Module(body=[function], type_ignores=[]))
+
+    # Python name and type of a variable in the open scopes, innermost first
+    def lookup(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        raise KeyError(name)  # check_semantics makes sure this can't happen
+
+    def new_name(self, name):
+        # Every declaration gets its own local so shadowing works
+        self.n_names += 1
+        return f"{name}_{self.n_names}"
+
+    # STATEMENTS, they all return a list of python statements
+
+    def stmt(self, node):
+        if isinstance(node, BlockNode):
+            return self.block(node)
+        if isinstance(node, DeclNode):
+            return self.decl(node)
+        if isinstance(node, StmtNode):
+            return self.stmt_node(node)
+        # Un-lowered list nodes (<decls>, <stmts>) just hold statements
+        return [py_stmt for child in node.children for py_stmt in self.stmt(child)]
+
+    def block(self, node):
+        self.scopes.append({})
+        body = []
+        if isinstance(node, CacheBlockNode):
+            # Caches are found by slot instead of name, emptied every time the statement runs
+            for slot in range(node.n_slots):
+                self.n_temps += 1
+                name = self.scopes[-1][slot] = f"_cache{self.n_temps}"  # can't clash with a renamed variable (name_N)
+                body.append(ast.Assign(targets=[ast.Name(name, ast.Store())], value=ast.Constant(None)))
+        for child in node.children:
+            body.extend(self.stmt(child))
+        self.scopes.pop()
+        return body
+
+    def decl(self, node):
+        type_node = node.children[0]
+        ttype = type_node.children[0].token.value
+        name = node.children[1].token.value
+        py_name = self.new_name(name)
+        self.scopes[-1][name] = (py_name, ttype)
+
+        lengths = [int(child.token.value) for child in type_node.children[1].children]
+        value = ast.Constant(None)
+        if lengths:
+            value = _call(
+                _name("make_array"),
+                ast.Constant(ttype),
+                ast.List([ast.Constant(n) for n in lengths], ast.Load()),
+            )
+        return [ast.Assign(targets=[ast.Name(py_name, ast.Store())], value=value)]
+
+    def body(self, node):
+        return self.stmt(node) or [ast.Pass()]
+
+    def stmt_node(self, node):
+        first = node.children[0]
+        if isinstance(first, LocNode):
+            return self.assign(first, node.children[2])
+        if isinstance(first, BlockNode):
+            return self.block(first)
+
+        ttype = first.token.ttype
+        if ttype == Vocab.ROVER:
+            return [ast.Expr(self.action(node.children[1]))]
+        if ttype == Vocab.PRINT:
+            # rover.output.print(value)
+            output = ast.Attribute(value=_name("rover"), attr="output", ctx=ast.Load())
+            print_ = ast.Attribute(value=output, attr="print", ctx=ast.Load())
+            return [ast.Expr(_call(print_, self.expr(node.children[1])))]
+        if ttype == Vocab.IF:
+            orelse = self.body(node.children[4]) if len(node.children) == 5 else []
+            return [ast.If(test=self.expr(node.children[1]), body=self.body(node.children[2]), orelse=orelse)]
+        if ttype == Vocab.WHILE:
+            self.loop_depth += 1
+            self.max_loop_depth = max(self.max_loop_depth, self.loop_depth)
+            body = self.body(node.children[2])
+            self.loop_depth -= 1
+            if parser_components.CHECK_RUN_BUDGET:
+                body = body + self.count_iteration()
+            return [ast.While(test=self.expr(node.children[1]), body=body, orelse=[])]
+        return []  # Empty statement
+
+    # run_budget.countdown -= 1
+    # if run_budget.countdown < 0:
+    #     run_budget.check()
+    def count_iteration(self):
+        countdown = ast.Attribute(value=_name("run_budget"), attr="countdown", ctx=ast.Load())
+        return [
+            ast.AugAssign(
+                target=ast.Attribute(value=_name("run_budget"), attr="countdown", ctx=ast.Store()),
+                op=ast.Sub(),
+                value=ast.Constant(1),
+            ),
+            ast.If(
+                test=ast.Compare(left=countdown, ops=[ast.Lt()], comparators=[ast.Constant(0)]),
+                body=[ast.Expr(_call(ast.Attribute(value=_name("run_budget"), attr="check", ctx=ast.Load())))],
+                orelse=[],
+            ),
+        ]
+
+    def assign(self, loc, value_node):
+        py_name, ttype = self.lookup(loc.children[0].token.value)
+        value = self.expr(value_node)
+        if ttype == "int" and not is_exact_int(value_node):
+            value = _call(_name("int"), value)  # cast to int cuz we might get a double from python division
+
+        index_nodes = loc.children[1].children
+        if not index_nodes:
+            return [ast.Assign(targets=[ast.Name(py_name, ast.Store())], value=value)]
+
+        # The tree walker evaluates the indices before the value, python does the
+        # opposite. Use a temporary when the order could be seen.
+        stmts = []
+        offset = self.offset(loc)
+        if not all(self.is_simple(index) for index in index_nodes):
+            stmts.append(ast.Assign(targets=[ast.Name("_offset", ast.Store())], value=offset))
+            offset = _name("_offset")  # can't clash with a renamed variable (name_N)
+
+        stmts.append(ast.Assign(
+            targets=[ast.Subscript(value=_name(py_name), slice=offset, ctx=ast.Store())],
+            value=value,
+        ))
+        return stmts
+
+    def action(self, node):
+        ttype = node.children[0].token.ttype
+        method = node.children[0].token.value
+        if ttype == Vocab.CHANGE_MAP:
+            return _rover_call(method, ast.Constant(node.children[1].token.value[1:-1]))  # remove quotes
+        if ttype == Vocab.MOVE:
+            return _rover_call(method, ast.Constant(node.children[1].run(rover=None, frames=None)), self.expr(node.children[2]))
+        if ttype == Vocab.TURN:
+            return _rover_call(method, ast.Constant(node.children[1].run(rover=None, frames=None)))
+        return _rover_call(method)
+
+    # EXPRESSIONS
+
+    def expr(self, node):
+        if isinstance(node, LiteralNode):
+            return ast.Constant(node.value)
+        if isinstance(node, LoadNode):
+            return self.load(node.children[0])
+        if isinstance(node, GetNode):
+            return self.get(node)
+        if isinstance(node, UnaryOpNode):
+            op = ast.Not() if node.token.ttype == Vocab.NOT else ast.USub()
+            return ast.UnaryOp(op=op, operand=self.expr(node.children[0]))
+        if isinstance(node, BinOpNode):
+            return self.binary(node.token.ttype, self.expr(node.children[0]), self.expr(node.children[1]))
+        if isinstance(node, ChainNode):
+            return self.chain(node)
+        if isinstance(node, CachedNode):
+            return self.cached(node)
+        raise TypeError(f"Cannot compile {type(node).__name__}, lower the parse tree first")
+
+    def binary(self, ttype, left, right):
+        if ttype in (Vocab.OR, Vocab.AND) and parser_components.SHORT_CIRCUIT:
+            op = ast.Or() if ttype == Vocab.OR else ast.And()
+            return ast.BoolOp(op=op, values=[left, right])
+        if ttype == Vocab.OR:
+            return _call(_name("_or"), left, right)
+        if ttype == Vocab.AND:
+            return _call(_name("_and"), left, right)
+        if ttype in _COMPARE_OPS:
+            return ast.Compare(left=left, ops=[_COMPARE_OPS[ttype]()], comparators=[right])
+        return ast.BinOp(left=left, op=_BINARY_OPS[ttype](), right=right)
+
+    # `(_chainN := a + b + ..., _chainN := _chainN + c + ..., ...)[-1]`, each
+    # part goes on from the value of the one before, CHAIN_PART operators at a time
+    def chain(self, node):
+        self.n_temps += 1
+        name = f"_chain{self.n_temps}"  # can't clash with a renamed variable (name_N)
+        parts = []
+        value = self.expr(node.children[0])
+        for i, (op, operand) in enumerate(zip(node.ops, node.children[1:])):
+            if i and i % CHAIN_PART == 0:
+                parts.append(ast.NamedExpr(target=ast.Name(name, ast.Store()), value=value))
+                value = _name(name)
+            value = self.binary(op.ttype, value, self.expr(operand))
+        parts.append(value)
+        return ast.Subscript(value=ast.Tuple(parts, ast.Load()), slice=ast.Constant(-1), ctx=ast.Load())
+
+    # `cache if cache is not None else (cache := expr)`
+    def cached(self, node):
+        depth, slot = node.address
+        name = self.scopes[-1 - depth][slot]
+        return ast.IfExp(
+            test=ast.Compare(left=_name(name), ops=[ast.IsNot()], comparators=[ast.Constant(None)]),
+            body=_name(name),
+            orelse=ast.NamedExpr(target=ast.Name(name, ast.Store()), value=self.expr(node.children[0])),
+        )
+
+    def load(self, loc):
+        py_name, ttype = self.lookup(loc.children[0].token.value)
+        if len(loc.children[1].children) == 0:
+            return _name(py_name)
+
+        value = ast.Subscript(value=_name(py_name), slice=self.offset(loc), ctx=ast.Load())
+        if ttype == "bool":
+            value = _call(_name("bool"), value)  # bool arrays are bytearrays
+        return value
+
+    # Offset of an element in the array's flat buffer, i * J + j for arr[i][j]
+    def offset(self, loc):
+        offset = None
+        for index_node, length, stride in zip(loc.children[1].children, loc.shape, loc.strides):
+            index = self.expr(index_node)
+            if parser_components.CHECK_ARRAY_BOUNDS:
+                index = self.check_index(index_node, index, length)
+            if stride != 1:
+                index = ast.BinOp(left=index, op=ast.Mult(), right=ast.Constant(stride))
+            offset = index if offset is None else ast.BinOp(left=offset, op=ast.Add(), right=index)
+        return offset
+
+    def get(self, node):
+        ttype = node.children[0].token.ttype
+        if ttype in (Vocab.CAN_MOVE, Vocab.MAX_MOVE):
+            return _rover_call(node.children[0].token.value, ast.Constant(node.children[1].run(rover=None, frames=None)))
+        if ttype in (Vocab.NEAREST, Vocab.NEAREST_X, Vocab.NEAREST_Y):
+            return _rover_call(node.children[0].token.value, ast.Constant(node.tile()))
+        if ttype == Vocab.SONAR:
+            return _rover_call("sonar")
+        return ast.Attribute(value=_name("rover"), attr=_GET_ATTRIBUTES[ttype], ctx=ast.Load())
+
+    # `index if 0 <= index < length else check_index(index, length)`, the
+    # index is only evaluated once
+    def check_index(self, index_node, index, length):
+        if is_constant_index(index_node, length):
+            return index  # checked now
+        if isinstance(index_node, LoadNode) and self.is_simple(index_node):
+            value = index  # a name, reading it twice is fine
+        else:
+            self.n_temps += 1
+            value = _name(f"_index{self.n_temps}")  # can't clash with a renamed variable (name_N)
+            index = ast.NamedExpr(target=ast.Name(value.id, ast.Store()), value=index)
+        return ast.IfExp(
+            test=ast.Compare(
+                left=ast.Constant(0),
+                ops=[ast.LtE(), ast.Lt()],
+                comparators=[index, ast.Constant(length)],
+            ),
+            body=value,
+            orelse=_call(_name("check_index"), value, ast.Constant(length)),
+        )
+
+    # Expressions without side effects whose evaluation order doesn't matter
+    def is_simple(self, node):
+        if isinstance(node, LoadNode):
+            return len(node.children[0].children[1].children) == 0
+        return isinstance(node, LiteralNode)
+
+
+def generate_source(parse_tree):
+    """Returns the Python source generated for a lowered and checked parse tree."""
+    return ast.unparse(PythonCompiler().module(parse_tree))
+
+
+def compile_program(parse_tree, dump_source=False):
+    """Compiles a lowered and checked parse tree to a Python function.
+
+    The returned function takes the rover to run the program on, and the
+    RunBudget of the run (no limit if None). When dump_source is True the
+    generated Python source is printed. A program nesting more than
+    MAX_NESTED_LOOPS while loops is compiled to closures (Node.compile).
+    """
+    compiler = PythonCompiler()
+    module = compiler.module(parse_tree)
+    if compiler.max_loop_depth > MAX_NESTED_LOOPS:
+        return parse_tree.compile()  # python can't compile it
+    if dump_source:
+        print(ast.unparse(module))
+
+    namespace = dict(_RUNTIME)
+    exec(compile(module, "<rover program>", "exec"), namespace)
+    function = namespace[FUNCTION_NAME]
+
+    def run_program(rover, run_budget=None):
+        if run_budget is None:
+            run_budget = RunBudget()
+        run_budget.start()
+        try:
+            function(rover, run_budget)
+        except ZeroDivisionError:
+            # Same error as the other backends, without python's message
+            raise ZeroDivisionError from None
+    return run_program
+
+
+if __name__ == "__main__":
+    # Print the python source generated for a program
+    if len(sys.argv) < 2:
+        raise Exception("Missing file path to compile.")
+    elif len(sys.argv) > 2:
+        raise Exception("Only 1 argument is needed, but more were given.")
+
+    fcontent = None
+    filepath = pathlib.Path(sys.argv[1])
+    with filepath.open() as f:
+        fcontent = f.read()
+
+    program = parser.get_parse_tree(fcontent).lower()
+    program.check()
+    print(generate_source(program))
@@ -1,499 +1,619 @@
-import multiprocessing
-import pathlib
-import time
-import traceback
-import parser
-import random
-import copy
-import operator
-
-
-class RunTimeError(Exception):
-    def __init__(self, msg):
-        self.msg = msg
-
-    def __str__(self):
-        return f'[RUNTIME ERROR]: {self.msg}'
-
-
-# The maximum amount of time that the rover can run in seconds
-MAX_RUNTIME = 36000
-
-# Rovers that exist
-ROVER_1 = "Rover1"
-ROVER_2 = "Rover2"
-ROVERS = [
-    ROVER_1,
-    ROVER_2,
-]
-
-# Command file is stored within the rover directory. Here we're building one file
-# for each of the rovers defined above
-ROVER_COMMAND_FILES = {
-    rover_name: pathlib.Path(pathlib.Path(
-        __file__).parent.resolve(), f"{rover_name}.txt")
-    for rover_name in ROVERS
-}
-for _, file in ROVER_COMMAND_FILES.items():
-    with file.open("w") as f:
-        pass
-
-# Constant used to store the rover command for parsing
-ROVER_COMMAND = {
-    rover_name: None
-    for rover_name in ROVERS
-}
-
-
-def get_command(rover_name):
-    """Checks, and gets a command from a rovers command file.
-
-    It returns True when something was found, and False
-    when nothing was found. It also truncates the contents
-    of the file if it found something so that it doesn't
-    run the same command again (unless it was re-run from
-    the controller/main program).
-    """
-    fcontent = None
-    with ROVER_COMMAND_FILES[rover_name].open() as f:
-        fcontent = f.read()
-    if fcontent is not None and fcontent:
-        ROVER_COMMAND[rover_name] = fcontent
-        with ROVER_COMMAND_FILES[rover_name].open("w+") as f:
-            pass
-        return True
-    return False
-
-
-class Rover:
-    ores_type = ["G", "S", "C", "I"]
-    # 0 = North, 1 = East, 2 = South, 3 = West
-    tiles_around = [(0, -1), (1, 0), (0, 1), (-1, 0)]
-
-    def __init__(self, name):
-        self.name = name
-        self.map = list()
-
-        self.x_pos = None
-        self.y_pos = None
-        self.orientation = None  # 0 to 3
-        self.gold = 1
-        self.silver = 1
-        self.copper = 1
-        self.iron = 1
-        self.power = 100
-
-        # Initialize
-        self.map_init()
-        self.set_coord()
-
-    def map_init(self, path='map1.txt.txt'):
-        # Assume map1.txt.txt is in same directory
-        with open(path, "r", encoding="utf-8") as file:
-            row = list()
-            while True:
-                char = file.read(1)
-                if not char:
-                    # if no \n at end of last line but end of file
-                    if row:
-                        self.map.append(row[:])  # append a copy of row
-                    break
-                elif char == "\n":
-                    self.map.append(row[:])  # append a copy of row
-                    del row[:]  # reset row
-                else:
-                    row.append(char)
-
-    def set_coord(self):
-        # will be use whenever new map is initialized
-        pos = random.choice([(r, c)  # create an array of all empty positions and choose a random one
-                             for r, line in enumerate(self.map)
-                             for c, tile in enumerate(line) if tile == " "])
-        self.y_pos = pos[0]
-        self.x_pos = pos[1]
-
-        # 0 = North, 1 = East, 2 = South, 3 = West
-        self.orientation = random.choice(range(0, 4))
-
-    def print(self, msg):
-        print(f"{self.name}: {msg}")
-
-    def parse_and_execute_cmd(self, command):
-        self.print(f"Running command: {command}")
-        parse_tree = parser.get_parse_tree(command)  # Parse the command
-        # parse_tree.show()  # Print parse tree
-        # Check semantics
-        for child in parse_tree.children:
-            child.check_semantics()
-
-        # Run the program
-        print("Output:")
-        for child in parse_tree.children:
-            try:
-                child.run(self)
-            except TypeError as e:
-                raise RunTimeError(e.args)
-        print()  # print new line just for formatting
-
-    def wait_for_command(self):
-        start = time.time()
-        while (time.time() - start) < MAX_RUNTIME:
-            # Sleep 1 second before trying to check for
-            # content again
-            self.print("Waiting for command...")
-            time.sleep(1)
-            if get_command(self.name):
-                self.print("Found a command...")
-                try:
-                    self.parse_and_execute_cmd(ROVER_COMMAND[self.name])
-                except Exception as e:
-                    self.print(
-                        f"Failed to run command: {ROVER_COMMAND[self.name]}")
-                    self.print(traceback.format_exc())
-                finally:
-                    self.print("Finished running command.\n\n")
-
-    # ROVER COMMANDS:
-
-    # getters
-    def get_orientation(self):
-        return self.orientation
-
-    def get_x_pos(self):
-        return self.x_pos
-
-    def get_y_pos(self):
-        return self.y_pos
-
-    def get_gold(self):
-        return self.gold
-
-    def get_silver(self):
-        return self.silver
-
-    def get_copper(self):
-        return self.copper
-
-    def get_iron(self):
-        return self.iron
-
-    def get_power(self):
-        return self.power
-
-    # Get a specific tile value
-    def get_tile(self, x=None, y=None) -> str:
-        if x is None:
-            x = self.x_pos
-        if y is None:
-            y = self.y_pos
-        return self.map[y][x]
-
-    # Set a specific tile
-    def set_tile(self, tile_type, x=None, y=None):
-        if x is None:
-            x = self.x_pos
-        if y is None:
-            y = self.y_pos
-        self.map[y][x] = tile_type
-
-    # Set a specific tile to ' '
-    def remove_tile(self, x=None, y=None):
-        if x is None:
-            x = self.x_pos
-        if y is None:
-            y = self.y_pos
-        self.set_tile(" ", x, y)
-
-    # Returns the maximum tiles the rover can advance in the given direction
-    # Should always return an integer
-    def max_move(self, direction) -> int:
-        facing = self.tiles_around[direction]  # get correct direction
-        steps = 0
-        # Check how far we can move without getting an 'X' tile
-        while self.get_tile(self.x_pos + facing[0] * (steps + 1), self.y_pos + facing[1] * (steps + 1)) not in ['X', 'R']:
-            steps += 1
-        return steps
-
-    # Returns True if the rover can move in the given direction
-    # Should always return True or False
-    def can_move(self, direction) -> bool:
-        # Check if we can move in given direction for at least one tile
-        if self.max_move(direction) == 0:
-            return False
-        return True
-
-    # Change the position to move a given amount of tiles in
-    # a given direction. If we cannot because of an x tile then
-    # move as far as possible
-    def move(self, direction, steps):
-        self.orientation = direction
-        facing = self.tiles_around[direction]
-        max_move = self.max_move(direction)
-
-        # If max_move < steps then just stop at max_move
-        if max_move < steps:
-            self.x_pos = self.x_pos + facing[0] * max_move
-            self.y_pos = self.y_pos + facing[1] * max_move
-        else:
-            self.x_pos = self.x_pos + facing[0] * steps
-            self.y_pos = self.y_pos + facing[1] * steps
-
-    # If on a d tile, switch d tile to g, s, c or i randomly
-    def scan(self):
-        if self.get_tile() != "D":
-            print(f"{self.name} must be on a D tile")
-            return
-        self.set_tile(random.choice(self.ores_type))
-        print(f"{self.name} found {self.get_tile()}! ")
-
-    # When on a g, s, c, or i tile, change tile to ' ' and give some
-    # amount of the respective material to the rover
-    def drill(self):
-        if self.power < 10:  # check if the rover has enough power
-            print(f"{self.name} need more power to drill")
-            return
-        elif self.get_tile() not in self.ores_type:
-            print(f"{self.name} must be on a ore tile")
-            return
-
-        if self.get_tile() == "G":  # gold tile
-            self.gold += 1
-        elif self.get_tile() == "S":  # silver tile
-            self.silver += 1
-        elif self.get_tile() == "C":  # copper tile
-            self.copper += 1
-        else:  # else we have an iron tile
-            self.iron += 1
-        self.remove_tile()  # set tile to ' '
-        self.power -= 10  # drilling costs 10 power
-
-    # Destroy all x tiles in a radius, give a chance to transform
-    # to a d tile
-    def shockwave(self):
-        if self.power < 10:
-            print(f"{self.name} need more power to shockwave")
-            return
-        for tile_coord in self.tiles_around:
-            x_coord = self.x_pos + tile_coord[0]
-            y_coord = self.y_pos + tile_coord[1]
-            if not (x_coord >= len(self.map[0]) or x_coord < 1 or y_coord >= len(self.map) or y_coord < 1):
-                print(f"tile_coord: {tile_coord[0]},{tile_coord[1]}")
-                print(x_coord, y_coord)
-                if random.uniform(0, 1) < 0.5:
-                    self.set_tile("D", x_coord, y_coord)
-                else:
-                    self.remove_tile(
-                        x_coord, y_coord)
-
-    # Transform a ' ' tile to a b tile, use materials from inventory
-    def build(self):
-        if self.power < 10:
-            print(f"{self.name} need more power to build")
-            return
-        elif self.get_copper() < 1 or self.get_gold() < 1 or self.get_iron() < 1 or self.get_silver() < 1:
-            print(f"{self.name} need more ores to build")
-            return
-        elif self.get_tile() != " ":
-            print(f"{self.name} must be on an empty tile")
-            return
-        # use resources from inventory and 10 power
-        self.set_tile("B")
-        self.copper -= 1
-        self.silver -= 1
-        self.gold -= 1
-        self.iron -= 1
-        self.power -= 10
-
-    # Count and print and return the number of d tiles in the map
-    # This can be used as a getter as well as an action in the grammar
-    # Should always return an int
-    def sonar(self) -> int:
-        d_tiles = 0
-        # Count d tiles in the map
-        for y, row in enumerate(self.map):
-            for x, col in enumerate(row):
-                if self.get_tile(x, y) == "D":
-                    d_tiles += 1
-        print(f"{self.name} found {d_tiles} scannable tiles")
-        return d_tiles  # Return value as it can be used as a getter by the rover
-
-    # When in front of an r tile, push it one tile up front if not an x
-    # Chance to uncover d tile
-    def push(self):
-        # Get tile facing the rover
-        front_tile = tuple(
-            map(operator.add, (self.x_pos, self.y_pos), self.tiles_around[self.orientation]))
-        if self.get_tile(front_tile[0], front_tile[1]) != "R":
-            print(f"{self.name} must face a R tile to push")
-            return
-        # Get the tile facing the rock from the rover
-        next_tile = tuple(map(operator.add, front_tile,
-                              self.tiles_around[self.orientation]))
-        if self.get_tile(next_tile[0], next_tile[1]) == "X":
-            print(f"{self.name} unable to push R on an X tile")
-            return
-        self.set_tile("R", next_tile[0], next_tile[1])
-        # Random chance to find d tile under the rock
-        self.set_tile(random.choice(['D', ' ']), front_tile[0], front_tile[1])
-
-    # When on a digit tile, at that digit * 10 to the rovers power
-    def recharge(self):
-        if self.get_tile().isdigit():
-            self.power += int(self.get_tile()) * 10  # restore some power
-            self.remove_tile()
-        else:
-            print(f"{self.name} must be on a digit tile")
-
-    # This is stupid but it's funny
-    def backflip(self):
-        self.orientation = (self.orientation + 2) % 4  # Flip orientation
-
-    # Print what is in our inventory
-    def print_inventory(self):
-        print("INVENTORY:")
-        print(f'    Gold: {self.gold}')
-        print(f'    Silver: {self.silver}')
-        print(f'    Copper: {self.copper}')
-        print(f'    Iron: {self.iron}')
-        print()
-
-    # Print the map with the rover in the correct position
-    # use ^, >, v, < depending on the orientation
-    def print_map(self):
-        # get a copy so we don't actually modify the rover's map
-        output_map = copy.deepcopy(self.map)
-        x = ""
-        # Set the rover tile depending on orientation
-        if self.orientation == 0:
-            x = "^"
-        elif self.orientation == 1:
-            x = ">"
-        elif self.orientation == 2:
-            x = "v"
-        else:
-            x = "<"
-
-        output_map[self.y_pos][self.x_pos] = x  # place the rover in the map
-        print('\n'.join([''.join(['{:2}'.format(item) for item in row])
-                         for row in output_map]))
-
-    # Print the current position
-    def print_pos(self):
-        print(f'{self.name} located at: ({self.x_pos}, {self.y_pos})')
-
-    # Print current orientation
-    def print_orientation(self):
-        if self.orientation == 0:
-            print(f'{self.name} facing North.')
-        elif self.orientation == 1:
-            print(f'{self.name} facing East.')
-        elif self.orientation == 2:
-            print(f'{self.name} facing South.')
-        elif self.orientation == 3:
-            print(f'{self.name} facing West.')
-
-    # Change the map given by a path to a file and initialize
-    # the rover in a random position
-    def change_map(self, path: str):
-        self.map.clear()
-        self.map_init(path)
-        self.set_coord()
-
-    # Change the current orientation based on the given direction
-    def turn(self, direction):
-        if direction == 0:
-            self.orientation -= 1
-        elif direction == 1:
-            self.orientation += 1
-        if self.orientation in [-1, 4]:
-            self.orientation = 3
-
-
-def main():
-    # Initialize the rovers
-    rover1 = Rover(ROVER_1)
-    my_rovers = [rover1]
-    procs = []
-    for rover in my_rovers:
-        p = multiprocessing.Process(target=rover.wait_for_command, args=())
-        p.start()
-        procs.append(p)
-
-    # Wait for the rovers to stop running (after MAX_RUNTIME)
-    for p in procs:
-        p.join()
-
-
-def _main():  # temporary main for testing
-    rover = Rover(ROVER_1)
-
-    # changing current tile
-    rover.get_tile()
-    assert rover.get_tile() == " "
-    rover.set_tile("X")
-    assert rover.get_tile() == "X"
-    rover.remove_tile()
-    assert rover.get_tile() == " "
-
-    # try to drill on a tile that is not an ore , will not work
-    rover.set_tile("D", rover.get_x_pos(), rover.get_y_pos())
-    assert rover.get_tile() == "D"
-    rover.drill()
-    assert rover.get_tile() == "D"
-    rover.remove_tile()
-    assert rover.get_tile() == " "
-
-    # scan and drill on a D tile
-    rover.set_tile("D", rover.get_x_pos(), rover.get_y_pos())
-    assert rover.get_tile() == "D"
-    rover.scan()
-    assert rover.get_tile() in rover.ores_type
-    rover.drill()
-    assert rover.get_tile() == " "
-    assert (rover.get_copper() or rover.get_gold()
-            or rover.get_iron() or rover.get_silver()) != 0
-    rover.print_inventory()
-
-    # test shockwave
-    for tile in rover.tiles_around:
-        rover.set_tile("X", rover.get_x_pos() +
-                       tile[0], rover.get_y_pos() + tile[1])
-        assert rover.get_tile(rover.get_x_pos() +
-                              tile[0], rover.get_y_pos() + tile[1]) == "X"
-    rover.shockwave()
-    for tile in rover.tiles_around:
-        assert rover.get_tile(
-            rover.get_x_pos() + tile[0], rover.get_y_pos() + tile[1]) in ["D", " "]
-
-    # test change map
-    rover_map = Rover("test_map")
-    rover.change_map("map2.txt.txt")
-    assert rover.map != rover_map.map
-    rover.change_map("map1.txt.txt")
-    assert rover.map == rover_map.map
-
-    # test recharge
-    current_power = rover.get_power()
-    rover.set_tile("1")
-    rover.recharge()
-    assert rover.get_power() == current_power + 10
-    rover.build()
-
-    # test push
-    front = tuple(map(operator.add, (rover.x_pos, rover.y_pos),
-                      rover.tiles_around[rover.orientation]))
-    rover.set_tile("R", front[0], front[1])
-    front_n = tuple(map(operator.add, front,
-                        rover.tiles_around[rover.orientation]))
-    rover.remove_tile(front_n[0], front_n[1])
-    rover.push()
-    assert rover.get_tile(front[0], front[1]) in ["D", " "]
-    assert rover.get_tile(front_n[0], front_n[1]) == "R"
-
-    # test sonar
-    assert rover.sonar() == ''.join([''.join([item for item in row])
-                                     for row in rover.map]).count('D')
-
-
-if __name__ == "__main__":
-    main()
+import multiprocessing
+import pathlib
+import time
+import traceback
+import command_channel
+import grid
+import map_view
+import optimizer
+import output_sink
+import parser
+from profiler import PROFILED_BACKENDS
+import program_cache
+import pycompiler
+import vm
+import random
+import operator
+import parser_components
+from parser_components import RunTimeError, RunBudget
+
+
+# The maximum amount of time that the rover can run in seconds
+MAX_RUNTIME = 36000
+
+# Limits of one command, so a loop that never ends doesn't keep the rover
+# from running the next ones. A command can ask for others (main.py
+# --max-steps and --max-seconds). Steps are loop iterations.
+MAX_COMMAND_STEPS = 100_000_000
+MAX_COMMAND_SECONDS = 600
+
+# Rovers that exist
+ROVER_1 = "Rover1"
+ROVER_2 = "Rover2"
+ROVERS = [
+    ROVER_1,
+    ROVER_2,
+]
+
+# Command file is stored within the rover directory. Here we're building one file
+# for each of the rovers defined above
+ROVER_COMMAND_FILES = {
+    rover_name: pathlib.Path(pathlib.Path(
+        __file__).parent.resolve(), f"{rover_name}.txt")
+    for rover_name in ROVERS
+}
+for _, file in ROVER_COMMAND_FILES.items():
+    with file.open("w") as f:
+        pass
+
+# Ways to execute a program. Each one takes the lowered and checked
+# parse tree and returns a function f(rover, run_budget=None) that runs the
+# program on a rover.
+BACKENDS = {
+    # Walk the tree with run(), kept for comparison
+    "tree": lambda parse_tree: parse_tree.execute,
+    # Compile the tree once to nested closures
+    "closure": lambda parse_tree: parse_tree.compile(),
+    # Translate the tree to a python function and compile it to bytecode
+    "pyast": lambda parse_tree: pycompiler.compile_program(parse_tree),
+    # Compile the tree to instructions for the stack based virtual machine
+    "vm": lambda parse_tree: vm.compile_program(parse_tree),
+}
+DEFAULT_BACKEND = "closure"
+
+# Checked programs are kept here, so a command sent again goes straight to
+# running it. Set PROGRAM_CACHE_DIR to None to only cache in memory.
+PROGRAM_CACHE_DIR = pathlib.Path(pathlib.Path(__file__).parent.resolve(), ".program_cache")
+PROGRAM_CACHE_MAX_BYTES = 16 * 1024 * 1024
+PROGRAM_CACHE = program_cache.ProgramCache(PROGRAM_CACHE_DIR, PROGRAM_CACHE_MAX_BYTES)
+
+
+def check_program(command, optimize=True):
+    """Returns the lowered parse tree of command, after checking its semantics and optimizing it."""
+    parse_tree = parser.get_parse_tree(command)  # Parse the command
+    parse_tree = parse_tree.lower()  # Use the compact AST
+    # parse_tree.show()  # Print parse tree
+    parse_tree.check()  # Check semantics
+    if optimize:
+        optimizer.optimize(parse_tree)  # Fold constants, remove dead code
+    return parse_tree
+
+# Constant used to store the rover command for parsing
+ROVER_COMMAND = {
+    rover_name: None
+    for rover_name in ROVERS
+}
+
+
+def get_command(rover_name):
+    """Checks, and gets a command from a rovers command file.
+
+    It returns True when something was found, and False
+    when nothing was found. It also truncates the contents
+    of the file if it found something so that it doesn't
+    run the same command again (unless it was re-run from
+    the controller/main program).
+    """
+    fcontent = command_channel.read_command_file(ROVER_COMMAND_FILES[rover_name])
+    if fcontent:
+        ROVER_COMMAND[rover_name] = fcontent
+        return True
+    return False
+
+
+class Rover:
+    ores_type = ["G", "S", "C", "I"]
+    # 0 = North, 1 = East, 2 = South, 3 = West
+    tiles_around = [(0, -1), (1, 0), (0, 1), (-1, 0)]
+
+    def __init__(self, name, output=None):
+        self.name = name
+        self.map = None  # grid.Grid of the tiles
+        self.map_view = map_view.MapView()  # renders the map for print_map()
+        # Where the rover and its programs print, see output_sink.py
+        self.output = output_sink.StdoutSink() if output is None else output
+
+        self.x_pos = None
+        self.y_pos = None
+        self.orientation = None  # 0 to 3
+        self.gold = 1
+        self.silver = 1
+        self.copper = 1
+        self.iron = 1
+        self.power = 100
+
+        # Initialize
+        self.map_init()
+        self.set_coord()
+
+    def map_init(self, path='map1.txt.txt', use_mmap=False):
+        # Assume map1.txt.txt is in same directory
+        # With use_mmap, the file is mapped in memory instead of read, see grid.py
+        self.map = grid.Grid.load(path, use_mmap)
+
+    def set_coord(self):
+        # will be use whenever new map is initialized
+        # choose one of the empty positions at random, sample() draws the same
+        # number as random.choice() of the list of them without making the list
+        self.x_pos, self.y_pos = self.map.sample(" ")
+
+        # 0 = North, 1 = East, 2 = South, 3 = West
+        self.orientation = random.choice(range(0, 4))
+
+    def print(self, msg):
+        self.output.write(f"{self.name}: {msg}\n")
+
+    def parse_and_execute_cmd(self, command, backend=DEFAULT_BACKEND, dump_source=False, use_cache=True,
+                              run_budget=None, profiler=None, capture=False):
+        # With a profiler.Profiler, the run is profiled into it (tree and closure backends only)
+        # With capture, the output of the command is returned instead of written to the rover's output
+        output = self.output
+        if capture:
+            self.output = output_sink.CaptureSink()
+        try:
+            self._execute_cmd(command, backend, dump_source, use_cache, run_budget, profiler)
+        finally:
+            captured, self.output = self.output, output
+            self.output.flush()
+        if capture:
+            return captured.getvalue()
+        return None
+
+    def _execute_cmd(self, command, backend, dump_source, use_cache, run_budget, profiler):
+        if backend not in BACKENDS:
+            raise Exception(f"Unknown backend given: {backend}")
+        if profiler is not None and backend not in PROFILED_BACKENDS:
+            raise Exception(f"Can't profile with the {backend} backend")
+        if run_budget is None:
+            run_budget = RunBudget(MAX_COMMAND_STEPS, MAX_COMMAND_SECONDS)
+
+        self.print(f"Running command: {command}")
+        if use_cache:
+            cached = PROGRAM_CACHE.get(command, check_program)
+            parse_tree = cached.parse_tree
+            program = cached.program(backend, BACKENDS[backend])
+        else:
+            parse_tree = check_program(command)
+            program = BACKENDS[backend](parse_tree)
+        if profiler is not None:  # the instrumented copy, never cached
+            program = BACKENDS[backend](profiler.instrument(parse_tree, command))
+        if dump_source:  # Show what the pyast backend generates, for debugging
+            self.print(f"Generated python source:\n{pycompiler.generate_source(parse_tree)}")
+
+        # Run the program
+        self.output.print("Output:")
+        try:
+            if profiler is None:
+                program(self, run_budget)
+            else:
+                with profiler.profiling(self):
+                    program(self, run_budget)
+        except (TypeError, OverflowError) as e:  # OverflowError: an int too large for an int array
+            raise RunTimeError(e.args)
+        self.output.print()  # print new line just for formatting
+
+    def wait_for_command(self):
+        # Wakes up as soon as main.py sends a command to the rover's socket,
+        # and checks the command file every second in case it was written there
+        channel = command_channel.CommandChannel(ROVER_COMMAND_FILES[self.name])
+        start = time.time()
+        try:
+            while (time.time() - start) < MAX_RUNTIME:
+                self.print("Waiting for command...")
+                self.output.flush()  # everything is out before waiting
+                command = channel.wait()
+                if command:
+                    ROVER_COMMAND[self.name] = command
+                    self.print("Found a command...")
+                    try:
+                        command, limits = command_channel.split_budget(command)
+                        run_budget = RunBudget(
+                            limits.get("max_steps", MAX_COMMAND_STEPS),
+                            limits.get("max_seconds", MAX_COMMAND_SECONDS),
+                        )
+                        self.parse_and_execute_cmd(command, run_budget=run_budget)
+                    except Exception as e:
+                        self.print(
+                            f"Failed to run command: {ROVER_COMMAND[self.name]}")
+                        self.print(traceback.format_exc())
+                    finally:
+                        self.print("Finished running command.\n\n")
+        finally:
+            self.output.flush()
+            channel.close()
+
+    # ROVER COMMANDS:
+
+    # getters
+    def get_orientation(self):
+        return self.orientation
+
+    def get_x_pos(self):
+        return self.x_pos
+
+    def get_y_pos(self):
+        return self.y_pos
+
+    def get_gold(self):
+        return self.gold
+
+    def get_silver(self):
+        return self.silver
+
+    def get_copper(self):
+        return self.copper
+
+    def get_iron(self):
+        return self.iron
+
+    def get_power(self):
+        return self.power
+
+    # Get a specific tile value
+    def get_tile(self, x=None, y=None) -> str:
+        if x is None:
+            x = self.x_pos
+        if y is None:
+            y = self.y_pos
+        return self.map.get_tile(x, y)
+
+    # Number of tiles of a type in the map, counted once and kept up to date by set_tile
+    def count_tiles(self, tile_type) -> int:
+        return self.map.count(tile_type)
+
+    # Manhattan distance to the nearest tile of a type, -1 if the map has none
+    def nearest(self, tile_type) -> int:
+        found = self.map.nearest(tile_type, self.x_pos, self.y_pos)
+        if found is None:
+            return -1
+        return abs(found[0] - self.x_pos) + abs(found[1] - self.y_pos)
+
+    # Column of the nearest tile of a type, -1 if the map has none
+    def nearest_x(self, tile_type) -> int:
+        found = self.map.nearest(tile_type, self.x_pos, self.y_pos)
+        return -1 if found is None else found[0]
+
+    # Row of the nearest tile of a type, -1 if the map has none
+    def nearest_y(self, tile_type) -> int:
+        found = self.map.nearest(tile_type, self.x_pos, self.y_pos)
+        return -1 if found is None else found[1]
+
+    # Set a specific tile
+    def set_tile(self, tile_type, x=None, y=None):
+        if x is None:
+            x = self.x_pos
+        if y is None:
+            y = self.y_pos
+        self.map.set_tile(x, y, tile_type)
+
+    # Set a specific tile to ' '
+    def remove_tile(self, x=None, y=None):
+        if x is None:
+            x = self.x_pos
+        if y is None:
+            y = self.y_pos
+        self.set_tile(" ", x, y)
+
+    # Returns the maximum tiles the rover can advance in the given direction
+    # Should always return an integer
+    def max_move(self, direction) -> int:
+        # Tiles before an 'X' or 'R' tile (or the edge of the map), kept by the map
+        return self.map.free_tiles(self.x_pos, self.y_pos, direction)
+
+    # Returns True if the rover can move in the given direction
+    # Should always return True or False
+    def can_move(self, direction) -> bool:
+        # Check if we can move in given direction for at least one tile
+        if self.max_move(direction) == 0:
+            return False
+        return True
+
+    # Change the position to move a given amount of tiles in
+    # a given direction. If we cannot because of an x tile then
+    # move as far as possible
+    def move(self, direction, steps):
+        self.orientation = direction
+        facing = self.tiles_around[direction]
+        max_move = self.max_move(direction)
+
+        # If max_move < steps then just stop at max_move
+        if max_move < steps:
+            self.x_pos = self.x_pos + facing[0] * max_move
+            self.y_pos = self.y_pos + facing[1] * max_move
+        else:
+            self.x_pos = self.x_pos + facing[0] * steps
+            self.y_pos = self.y_pos + facing[1] * steps
+
+    # If on a d tile, switch d tile to g, s, c or i randomly
+    def scan(self):
+        if self.get_tile() != "D":
+            self.output.print(f"{self.name} must be on a D tile")
+            return
+        self.set_tile(random.choice(self.ores_type))
+        self.output.print(f"{self.name} found {self.get_tile()}! ")
+
+    # When on a g, s, c, or i tile, change tile to ' ' and give some
+    # amount of the respective material to the rover
+    def drill(self):
+        if self.power < 10:  # check if the rover has enough power
+            self.output.print(f"{self.name} need more power to drill")
+            return
+        elif self.get_tile() not in self.ores_type:
+            self.output.print(f"{self.name} must be on a ore tile")
+            return
+
+        if self.get_tile() == "G":  # gold tile
+            self.gold += 1
+        elif self.get_tile() == "S":  # silver tile
+            self.silver += 1
+        elif self.get_tile() == "C":  # copper tile
+            self.copper += 1
+        else:  # else we have an iron tile
+            self.iron += 1
+        self.remove_tile()  # set tile to ' '
+        self.power -= 10  # drilling costs 10 power
+
+    # Destroy all x tiles in a radius, give a chance to transform
+    # to a d tile
+    def shockwave(self):
+        if self.power < 10:
+            self.output.print(f"{self.name} need more power to shockwave")
+            return
+        for tile_coord in self.tiles_around:
+            x_coord = self.x_pos + tile_coord[0]
+            y_coord = self.y_pos + tile_coord[1]
+            if not (x_coord >= self.map.width or x_coord < 1 or y_coord >= self.map.height or y_coord < 1):
+                self.output.print(f"tile_coord: {tile_coord[0]},{tile_coord[1]}")
+                self.output.print(x_coord, y_coord)
+                if random.uniform(0, 1) < 0.5:
+                    self.set_tile("D", x_coord, y_coord)
+                else:
+                    self.remove_tile(
+                        x_coord, y_coord)
+
+    # Transform a ' ' tile to a b tile, use materials from inventory
+    def build(self):
+        if self.power < 10:
+            self.output.print(f"{self.name} need more power to build")
+            return
+        elif self.get_copper() < 1 or self.get_gold() < 1 or self.get_iron() < 1 or self.get_silver() < 1:
+            self.output.print(f"{self.name} need more ores to build")
+            return
+        elif self.get_tile() != " ":
+            self.output.print(f"{self.name} must be on an empty tile")
+            return
+        # use resources from inventory and 10 power
+        self.set_tile("B")
+        self.copper -= 1
+        self.silver -= 1
+        self.gold -= 1
+        self.iron -= 1
+        self.power -= 10
+
+    # Count and print and return the number of d tiles in the map
+    # This can be used as a getter as well as an action in the grammar
+    # Should always return an int
+    def sonar(self) -> int:
+        d_tiles = self.count_tiles("D")  # Count d tiles in the map
+        self.output.print(f"{self.name} found {d_tiles} scannable tiles")
+        return d_tiles  # Return value as it can be used as a getter by the rover
+
+    # When in front of an r tile, push it one tile up front if not an x
+    # Chance to uncover d tile
+    def push(self):
+        # Get tile facing the rover
+        front_tile = tuple(
+            map(operator.add, (self.x_pos, self.y_pos), self.tiles_around[self.orientation]))
+        if self.get_tile(front_tile[0], front_tile[1]) != "R":
+            self.output.print(f"{self.name} must face a R tile to push")
+            return
+        # Get the tile facing the rock from the rover
+        next_tile = tuple(map(operator.add, front_tile,
+                              self.tiles_around[self.orientation]))
+        if self.get_tile(next_tile[0], next_tile[1]) == "X":
+            self.output.print(f"{self.name} unable to push R on an X tile")
+            return
+        self.set_tile("R", next_tile[0], next_tile[1])
+        # Random chance to find d tile under the rock
+        self.set_tile(random.choice(['D', ' ']), front_tile[0], front_tile[1])
+
+    # When on a digit tile, at that digit * 10 to the rovers power
+    def recharge(self):
+        if self.get_tile().isdigit():
+            self.power += int(self.get_tile()) * 10  # restore some power
+            self.remove_tile()
+        else:
+            self.output.print(f"{self.name} must be on a digit tile")
+
+    # This is stupid but it's funny
+    def backflip(self):
+        self.orientation = (self.orientation + 2) % 4  # Flip orientation
+
+    # Print what is in our inventory
+    def print_inventory(self):
+        self.output.print("INVENTORY:")
+        self.output.print(f'    Gold: {self.gold}')
+        self.output.print(f'    Silver: {self.silver}')
+        self.output.print(f'    Copper: {self.copper}')
+        self.output.print(f'    Iron: {self.iron}')
+        self.output.print()
+
+    # Print the map with the rover in the correct position
+    # use ^, >, v, < depending on the orientation
+    # With a radius, only the tiles at most radius tiles away from the rover
+    # With diff, only the rows that changed since the last print, after their number
+    def print_map(self, radius=None, diff=False):
+        self.output.write(self.map_view.render(self.map, self.x_pos, self.y_pos, self.orientation, radius, diff))
+
+    # Print the current position
+    def print_pos(self):
+        self.output.print(f'{self.name} located at: ({self.x_pos}, {self.y_pos})')
+
+    # Print current orientation
+    def print_orientation(self):
+        if self.orientation == 0:
+            self.output.print(f'{self.name} facing North.')
+        elif self.orientation == 1:
+            self.output.print(f'{self.name} facing East.')
+        elif self.orientation == 2:
+            self.output.print(f'{self.name} facing South.')
+        elif self.orientation == 3:
+            self.output.print(f'{self.name} facing West.')
+
+    # Change the map given by a path to a file and initialize
+    # the rover in a random position
+    def change_map(self, path: str):
+        self.map_init(path)
+        self.set_coord()
+
+    # Change the current orientation based on the given direction
+    def turn(self, direction):
+        if direction == 0:
+            self.orientation -= 1
+        elif direction == 1:
+            self.orientation += 1
+        if self.orientation in [-1, 4]:
+            self.orientation = 3
+
+
+def main():
+    # Initialize the rovers
+    rover1 = Rover(ROVER_1, output=output_sink.BufferedSink())
+    my_rovers = [rover1]
+    procs = []
+    for rover in my_rovers:
+        p = multiprocessing.Process(target=rover.wait_for_command, args=())
+        p.start()
+        procs.append(p)
+
+    # Wait for the rovers to stop running (after MAX_RUNTIME)
+    for p in procs:
+        p.join()
+
+
+def _main():  # temporary main for testing
+    rover = Rover(ROVER_1)
+
+    # changing current tile
+    rover.get_tile()
+    assert rover.get_tile() == " "
+    rover.set_tile("X")
+    assert rover.get_tile() == "X"
+    rover.remove_tile()
+    assert rover.get_tile() == " "
+
+    # try to drill on a tile that is not an ore , will not work
+    rover.set_tile("D", rover.get_x_pos(), rover.get_y_pos())
+    assert rover.get_tile() == "D"
+    rover.drill()
+    assert rover.get_tile() == "D"
+    rover.remove_tile()
+    assert rover.get_tile() == " "
+
+    # scan and drill on a D tile
+    rover.set_tile("D", rover.get_x_pos(), rover.get_y_pos())
+    assert rover.get_tile() == "D"
+    rover.scan()
+    assert rover.get_tile() in rover.ores_type
+    rover.drill()
+    assert rover.get_tile() == " "
+    assert (rover.get_copper() or rover.get_gold()
+            or rover.get_iron() or rover.get_silver()) != 0
+    rover.print_inventory()
+
+    # test shockwave
+    for tile in rover.tiles_around:
+        rover.set_tile("X", rover.get_x_pos() +
+                       tile[0], rover.get_y_pos() + tile[1])
+        assert rover.get_tile(rover.get_x_pos() +
+                              tile[0], rover.get_y_pos() + tile[1]) == "X"
+    rover.shockwave()
+    for tile in rover.tiles_around:
+        assert rover.get_tile(
+            rover.get_x_pos() + tile[0], rover.get_y_pos() + tile[1]) in ["D", " "]
+
+    # test change map
+    rover_map = Rover("test_map")
+    rover.change_map("map2.txt.txt")
+    assert rover.map != rover_map.map
+    rover.change_map("map1.txt.txt")
+    assert rover.map == rover_map.map
+
+    # test recharge
+    current_power = rover.get_power()
+    rover.set_tile("1")
+    rover.recharge()
+    assert rover.get_power() == current_power + 10
+    rover.build()
+
+    # test push
+    front = tuple(map(operator.add, (rover.x_pos, rover.y_pos),
+                      rover.tiles_around[rover.orientation]))
+    rover.set_tile("R", front[0], front[1])
+    front_n = tuple(map(operator.add, front,
+                        rover.tiles_around[rover.orientation]))
+    rover.remove_tile(front_n[0], front_n[1])
+    rover.push()
+    assert rover.get_tile(front[0], front[1]) in ["D", " "]
+    assert rover.get_tile(front_n[0], front_n[1]) == "R"
+
+    # test sonar
+    assert rover.sonar() == ''.join([rover.map.row(y)
+                                     for y in range(rover.map.height)]).count('D')
+
+    # test the tile counts after the map changes
+    for tile in "DX R1GSCIB":
+        rover.count_tiles(tile)  # counted from now on
+    for _ in range(200):
+        x = random.randrange(1, rover.map.width - 1)
+        y = random.randrange(1, rover.map.height - 1)
+        rover.set_tile(random.choice("DX R1G"), x, y)
+    rows = ''.join([rover.map.row(y) for y in range(rover.map.height)])
+    for tile in "DX R1GSCIB":
+        assert rover.count_tiles(tile) == rows.count(tile)
+
+    # test the nearest tiles against every tile of the map
+    for tile in "D1GS":
+        rover.nearest(tile)  # indexed from now on
+    for _ in range(200):
+        rover.set_tile(random.choice("D1G "), random.randrange(1, rover.map.width - 1),
+                       random.randrange(1, rover.map.height - 1))
+        rover.x_pos, rover.y_pos = rover.map.sample(" ")
+        for tile in "D1GS":
+            distances = [abs(x - rover.x_pos) + abs(y - rover.y_pos) for x, y in rover.map.positions(tile)]
+            assert rover.nearest(tile) == min(distances, default=-1)
+
+    # test the distances to the blocking tiles against walking to them
+    for _ in range(200):
+        rover.set_tile(random.choice("XR D"), random.randrange(1, rover.map.width - 1),
+                       random.randrange(1, rover.map.height - 1))
+        rover.x_pos, rover.y_pos = rover.map.sample(" ")
+        for direction, facing in enumerate(rover.tiles_around):
+            steps = 0
+            while rover.get_tile(rover.x_pos + facing[0] * (steps + 1),
+                                 rover.y_pos + facing[1] * (steps + 1)) not in ["X", "R"]:
+                steps += 1
+            assert rover.max_move(direction) == steps
+            assert rover.can_move(direction) == (steps > 0)
+
+    # test that cached programs follow the compile flags: the same source
+    # run again after a flag changed must not reuse the program compiled before
+    checks = [
+        ("CHECK_RUN_BUDGET", "{ int i; i = 0; while ( i < 50 ) { i = i + 1; } print i; }"),
+        ("CHECK_ARRAY_BOUNDS", "{ int [ 2 ] [ 2 ] a; a [ 1 ] [ 0 ] = 7; print a [ 0 ] [ 2 ]; }"),
+    ]
+    for flag, source in checks:
+        for backend in BACKENDS:
+            outputs = []
+            for value in (False, True):
+                setattr(parser_components, flag, value)
+                try:
+                    outputs.append(rover.parse_and_execute_cmd(source, backend=backend, capture=True,
+                                                               run_budget=RunBudget(10)))
+                except (RunTimeError, IndexError):
+                    outputs.append(None)
+            assert outputs[0] is not None and outputs[1] is None, (flag, backend)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,912 @@
+"""
+Compiles a checked rover program to a linear instruction set and runs it
+on a small stack based virtual machine.
+
+A program compiles to a CodeObject: an array of (opcode, arg) pairs, a
+constant pool and the number of variable slots. Every variable of the
+program gets its own slot, the (depth, slot) addresses resolved by
+check_semantics are mapped to flat slots when compiling, so running a block
+is just running its instructions. Jumps replace the recursion of the tree
+walker, which lets a VirtualMachine stop after an instruction budget and
+resume later.
+
+The instructions do exactly what StmtNode.run does: values stored to int
+variables go through TO_INT, division by zero raises ZeroDivisionError, and
+&& and || only skip their right operand when SHORT_CIRCUIT is on. The jump
+back to the condition of a loop (LOOP) counts an iteration against the
+RunBudget of the run.
+"""
+
+import array
+import operator
+import pathlib
+import sys
+
+import parser
+import parser_components
+from parser_components import (
+    Vocab,
+
+    StmtNode,
+    DeclNode,
+    BlockNode,
+    CacheBlockNode,
+    LocNode,
+    GetNode,
+    BinOpNode,
+    ChainNode,
+    UnaryOpNode,
+    LiteralNode,
+    LoadNode,
+    CachedNode,
+
+    RunBudget,
+
+    make_array,
+    check_index,
+    is_exact_int,
+    is_constant_index,
+    constant_key,
+)
+
+# OPCODES, what each instruction does with its arg is described next to it.
+# "slot, x" args hold two numbers, see pack().
+LOAD_CONST = 0  # push constants[arg]
+LOAD_SLOT = 1  # push slots[arg]
+STORE_SLOT = 2  # slots[arg] = pop()
+LOAD_INDEX = 3  # slot, length: push slots[slot], raise IndexError unless 0 <= it < length
+CHECK_INDEX = 4  # raise IndexError unless 0 <= top < arg
+LOAD_ELEMENT = 5  # offset = pop(), push slots[arg][offset]
+LOAD_ELEMENT_CONST = 6  # slot, offset: push slots[slot][offset]
+# array slot, index slot, length, stride, offset = constants[arg], checks
+# 0 <= index < length then pushes slots[array slot][index * stride + offset]
+LOAD_ELEMENT_VAR = 44
+STORE_ELEMENT = 7  # value = pop(), offset = pop(), slots[arg][offset] = value
+STORE_ELEMENT_CONST = 8  # slot, offset: slots[slot][offset] = pop()
+NEW_ARRAY = 9  # push make_array(*constants[arg])
+TO_INT = 10  # top = int(top)
+TO_BOOL = 11  # top = bool(top), bool arrays are bytearrays
+ADD = 12  # right = pop(), top = top + right
+SUB = 13
+MUL = 14
+DIV = 15  # raises ZeroDivisionError when right is 0
+ADD_CONST = 16  # top = top + constants[arg]
+SUB_CONST = 17
+MUL_CONST = 18
+NEG = 19  # top = -top
+NOT = 20  # top = not top
+EQ = 21  # right = pop(), top = top == right
+NE = 22
+LT = 23
+LE = 24
+GT = 25
+GE = 26
+OR = 27  # right = pop(), top = top or right (both operands evaluated)
+AND = 28  # right = pop(), top = top and right (both operands evaluated)
+JUMP = 29  # continue at instruction arg
+JUMP_IF_FALSE = 30  # continue at arg if not pop()
+JUMP_IF_TRUE = 31  # continue at arg if pop()
+JUMP_IF_TRUE_OR_POP = 32  # continue at arg if top, keeping it, pop otherwise
+JUMP_IF_FALSE_OR_POP = 33  # continue at arg if not top, keeping it, pop otherwise
+JUMP_IF_NOT_EQ = 34  # right = pop(), left = pop(), continue at arg if not left == right
+JUMP_IF_NOT_NE = 35
+JUMP_IF_NOT_LT = 36
+JUMP_IF_NOT_LE = 37
+JUMP_IF_NOT_GT = 38
+JUMP_IF_NOT_GE = 39
+ROVER_GET = 40  # push constants[arg](rover)
+ROVER_ACTION = 41  # constants[arg](rover)
+ROVER_MOVE = 42  # rover.move(constants[arg], pop())
+PRINT = 43  # rover.output.print(pop())
+LOAD_CACHED = 45  # slot, target: unless slots[slot] is None, push it and continue at target
+STORE_CACHED = 46  # slots[arg] = top, keeping it
+LOOP = 47  # count a loop iteration in the run budget, continue at instruction arg
+
+OPNAMES = [
+    "LOAD_CONST", "LOAD_SLOT", "STORE_SLOT", "LOAD_INDEX", "CHECK_INDEX", "LOAD_ELEMENT",
+    "LOAD_ELEMENT_CONST", "STORE_ELEMENT", "STORE_ELEMENT_CONST", "NEW_ARRAY", "TO_INT",
+    "TO_BOOL", "ADD", "SUB", "MUL", "DIV", "ADD_CONST", "SUB_CONST", "MUL_CONST", "NEG",
+    "NOT", "EQ", "NE", "LT", "LE", "GT", "GE", "OR", "AND", "JUMP", "JUMP_IF_FALSE",
+    "JUMP_IF_TRUE", "JUMP_IF_TRUE_OR_POP", "JUMP_IF_FALSE_OR_POP", "JUMP_IF_NOT_EQ",
+    "JUMP_IF_NOT_NE", "JUMP_IF_NOT_LT", "JUMP_IF_NOT_LE", "JUMP_IF_NOT_GT",
+    "JUMP_IF_NOT_GE", "ROVER_GET", "ROVER_ACTION", "ROVER_MOVE", "PRINT", "LOAD_ELEMENT_VAR",
+    "LOAD_CACHED", "STORE_CACHED", "LOOP",
+]
+
+_SLOT_OPS = {LOAD_SLOT, STORE_SLOT, LOAD_ELEMENT, STORE_ELEMENT, STORE_CACHED}
+_PACKED_OPS = {LOAD_INDEX, LOAD_ELEMENT_CONST, STORE_ELEMENT_CONST, LOAD_CACHED}
+_CONST_OPS = {
+    LOAD_CONST, NEW_ARRAY, ADD_CONST, SUB_CONST, MUL_CONST, ROVER_GET, ROVER_ACTION, ROVER_MOVE, LOAD_ELEMENT_VAR,
+}
+_JUMP_OPS = {
+    JUMP, LOOP, JUMP_IF_FALSE, JUMP_IF_TRUE, JUMP_IF_TRUE_OR_POP, JUMP_IF_FALSE_OR_POP,
+    JUMP_IF_NOT_EQ, JUMP_IF_NOT_NE, JUMP_IF_NOT_LT, JUMP_IF_NOT_LE, JUMP_IF_NOT_GT, JUMP_IF_NOT_GE,
+}
+
+# Opcode of each operator of the language
+_BINARY_OPCODES = {
+    Vocab.PLUS: ADD,
+    Vocab.MINUS: SUB,
+    Vocab.MUL: MUL,
+    Vocab.DIV: DIV,
+    Vocab.EQ: EQ,
+    Vocab.NEQ: NE,
+    Vocab.LT: LT,
+    Vocab.LTEQ: LE,
+    Vocab.GT: GT,
+    Vocab.GTEQ: GE,
+    Vocab.OR: OR,
+    Vocab.AND: AND,
+}
+# Version of + - * taking the right operand from the constant pool
+_CONST_OPCODES = {
+    Vocab.PLUS: ADD_CONST,
+    Vocab.MINUS: SUB_CONST,
+    Vocab.MUL: MUL_CONST,
+}
+# Jump taken when a comparison is false, for conditions
+_JUMP_IF_NOT_OPCODES = {
+    Vocab.EQ: JUMP_IF_NOT_EQ,
+    Vocab.NEQ: JUMP_IF_NOT_NE,
+    Vocab.LT: JUMP_IF_NOT_LT,
+    Vocab.LTEQ: JUMP_IF_NOT_LE,
+    Vocab.GT: JUMP_IF_NOT_GT,
+    Vocab.GTEQ: JUMP_IF_NOT_GE,
+}
+
+_PACK_SHIFT = 32
+_PACK_MASK = (1 << _PACK_SHIFT) - 1
+
+
+def pack(slot, value):
+    """Arg holding a slot and a number (a length or an offset)."""
+    return slot << _PACK_SHIFT | value
+
+
+def unpack(arg):
+    return arg >> _PACK_SHIFT, arg & _PACK_MASK
+
+
+# Rover attribute read by each simple getter
+_GET_ATTRIBUTES = {
+    Vocab.ORIENTATION: "orientation",
+    Vocab.X_POS: "x_pos",
+    Vocab.Y_POS: "y_pos",
+    Vocab.GOLD: "gold",
+    Vocab.SILVER: "silver",
+    Vocab.COPPER: "copper",
+    Vocab.IRON: "iron",
+    Vocab.POWER: "power",
+}
+
+
+class CodeObject:
+    """A compiled program: (opcode, arg) pairs, constant pool and variable slots."""
+
+    def __init__(self):
+        self.code = array.array("q")  # opcode, arg, opcode, arg, ...
+        self.constants = []
+        self.n_slots = 0
+        self.slot_names = []  # name of the variable in each slot, for the disassembler
+        self._constant_index = {}
+
+    def __len__(self):
+        return len(self.code) // 2  # number of instructions
+
+    def emit(self, opcode, arg=0):
+        """Adds an instruction, returns its index."""
+        self.code.append(opcode)
+        self.code.append(arg)
+        return len(self) - 1
+
+    def patch(self, index, arg):
+        """Changes the arg of an instruction (jump targets)."""
+        self.code[2 * index + 1] = arg
+
+    def patch_to_here(self, indices):
+        """Makes the given jumps continue at the next instruction emitted."""
+        for index in indices:
+            self.patch(index, len(self))
+
+    def add_constant(self, value):
+        """Returns the index of value in the constant pool, adding it if needed."""
+        key = constant_key(value)
+        if key not in self._constant_index:
+            self._constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return self._constant_index[key]
+
+    def add_slot(self, name):
+        self.slot_names.append(name)
+        self.n_slots += 1
+        return self.n_slots - 1
+
+
+class Compiler:
+    """Translates a lowered and checked parse tree to a CodeObject."""
+
+    def __init__(self):
+        self.code = CodeObject()
+        # One list per open block: slot of the block's frame -> flat slot
+        self.frames = []
+
+    def program(self, parse_tree):
+        for child in parse_tree.children:
+            self.stmt(child)
+        return self.code
+
+    def slot(self, loc):
+        depth, slot = loc.address
+        return self.frames[-1 - depth][slot]
+
+    def emit_const(self, opcode, value):
+        self.code.emit(opcode, self.code.add_constant(value))
+
+    # STATEMENTS
+
+    def stmt(self, node):
+        if isinstance(node, BlockNode):
+            self.block(node)
+        elif isinstance(node, DeclNode):
+            self.decl(node)
+        elif isinstance(node, StmtNode):
+            self.stmt_node(node)
+        else:
+            raise TypeError(f"Cannot compile {type(node).__name__}, lower the parse tree first")
+
+    def block(self, node):
+        self.frames.append([])
+        if isinstance(node, CacheBlockNode):
+            # Empty the caches every time the statement runs
+            for _ in range(node.n_slots):
+                slot = self.code.add_slot("<cache>")
+                self.frames[-1].append(slot)
+                self.emit_const(LOAD_CONST, None)
+                self.code.emit(STORE_SLOT, slot)
+        for child in node.children:
+            self.stmt(child)
+        self.frames.pop()
+
+    def decl(self, node):
+        type_node = node.children[0]
+        ttype = type_node.children[0].token.value
+        slot = self.code.add_slot(node.children[1].token.value)
+        self.frames[-1].append(slot)  # declarations come in slot order
+
+        lengths = type_node.children[1].run(rover=None, frames=None)
+        if lengths is None:
+            self.emit_const(LOAD_CONST, None)
+        else:
+            self.emit_const(NEW_ARRAY, (ttype, tuple(lengths)))
+        self.code.emit(STORE_SLOT, slot)
+
+    def stmt_node(self, node):
+        first = node.children[0]
+        if isinstance(first, LocNode):
+            self.assign(first, node.children[2])
+            return
+        if isinstance(first, BlockNode):
+            self.block(first)
+            return
+
+        ttype = first.token.ttype
+        if ttype == Vocab.ROVER:
+            self.action(node.children[1])
+        elif ttype == Vocab.PRINT:
+            self.expr(node.children[1])
+            self.code.emit(PRINT)
+        elif ttype == Vocab.IF:
+            to_else = self.jump_if_false(node.children[1])
+            self.stmt(node.children[2])
+            if len(node.children) == 5:
+                to_end = self.code.emit(JUMP)
+                self.code.patch_to_here(to_else)
+                self.stmt(node.children[4])
+                self.code.patch_to_here([to_end])
+            else:
+                self.code.patch_to_here(to_else)
+        elif ttype == Vocab.WHILE:
+            start = len(self.code)
+            to_end = self.jump_if_false(node.children[1])
+            self.stmt(node.children[2])
+            self.code.emit(LOOP if parser_components.CHECK_RUN_BUDGET else JUMP, start)
+            self.code.patch_to_here(to_end)
+        # Empty statement, nothing to do
+
+    def assign(self, loc, value_node):
+        slot = self.slot(loc)
+        index_nodes = loc.children[1].children
+        offset = self.constant_offset(loc)
+        if index_nodes and offset is None:
+            self.offset(loc)  # the tree walker evaluates the indices first
+        self.expr(value_node)
+        if loc.ttype == "int" and not is_exact_int(value_node):
+            self.code.emit(TO_INT)  # cast to int cuz we might get a double from python division
+
+        if not index_nodes:
+            self.code.emit(STORE_SLOT, slot)
+        elif offset is not None:
+            self.code.emit(STORE_ELEMENT_CONST, pack(slot, offset))
+        else:
+            self.code.emit(STORE_ELEMENT, slot)
+
+    def action(self, node):
+        ttype = node.children[0].token.ttype
+        method = node.children[0].token.value
+        if ttype == Vocab.CHANGE_MAP:
+            call = operator.methodcaller(method, node.children[1].token.value[1:-1])  # remove quotes
+        elif ttype == Vocab.MOVE:
+            self.expr(node.children[2])  # number of steps
+            self.emit_const(ROVER_MOVE, node.children[1].run(rover=None, frames=None))
+            return
+        elif ttype == Vocab.TURN:
+            call = operator.methodcaller(method, node.children[1].run(rover=None, frames=None))
+        else:
+            call = operator.methodcaller(method)
+        self.emit_const(ROVER_ACTION, call)
+
+    # CONDITIONS, they return the jumps to patch with the target
+
+    # Jumps when the condition is false, goes on to the next instruction when it is true
+    def jump_if_false(self, node):
+        short_circuit = parser_components.SHORT_CIRCUIT
+        if isinstance(node, BinOpNode) and short_circuit and node.token.ttype == Vocab.AND:
+            return self.jump_if_false(node.children[0]) + self.jump_if_false(node.children[1])
+        if isinstance(node, BinOpNode) and short_circuit and node.token.ttype == Vocab.OR:
+            to_true = self.jump_if_true(node.children[0])
+            to_false = self.jump_if_false(node.children[1])
+            self.code.patch_to_here(to_true)
+            return to_false
+        if isinstance(node, UnaryOpNode) and node.token.ttype == Vocab.NOT:
+            return self.jump_if_true(node.children[0])
+        if isinstance(node, BinOpNode) and node.token.ttype in _JUMP_IF_NOT_OPCODES:
+            self.expr(node.children[0])
+            self.expr(node.children[1])
+            return [self.code.emit(_JUMP_IF_NOT_OPCODES[node.token.ttype])]
+        self.expr(node)
+        return [self.code.emit(JUMP_IF_FALSE)]
+
+    # Jumps when the condition is true, goes on to the next instruction when it is false
+    def jump_if_true(self, node):
+        short_circuit = parser_components.SHORT_CIRCUIT
+        if isinstance(node, BinOpNode) and short_circuit and node.token.ttype == Vocab.OR:
+            return self.jump_if_true(node.children[0]) + self.jump_if_true(node.children[1])
+        if isinstance(node, BinOpNode) and short_circuit and node.token.ttype == Vocab.AND:
+            to_false = self.jump_if_false(node.children[0])
+            to_true = self.jump_if_true(node.children[1])
+            self.code.patch_to_here(to_false)
+            return to_true
+        if isinstance(node, UnaryOpNode) and node.token.ttype == Vocab.NOT:
+            return self.jump_if_false(node.children[0])
+        self.expr(node)
+        return [self.code.emit(JUMP_IF_TRUE)]
+
+    # EXPRESSIONS, they leave their value on the stack
+
+    def expr(self, node):
+        if isinstance(node, LiteralNode):
+            self.emit_const(LOAD_CONST, node.value)
+        elif isinstance(node, LoadNode):
+            self.load(node.children[0])
+        elif isinstance(node, GetNode):
+            self.get(node)
+        elif isinstance(node, UnaryOpNode):
+            self.expr(node.children[0])
+            self.code.emit(NOT if node.token.ttype == Vocab.NOT else NEG)
+        elif isinstance(node, BinOpNode):
+            self.expr(node.children[0])
+            self.operator(node.token.ttype, node.children[1])
+        elif isinstance(node, ChainNode):
+            self.expr(node.children[0])
+            for op, operand in zip(node.ops, node.children[1:]):
+                self.operator(op.ttype, operand)
+        elif isinstance(node, CachedNode):
+            self.cached(node)
+        else:
+            raise TypeError(f"Cannot compile {type(node).__name__}, lower the parse tree first")
+
+    # Skips the expression when its value is already in the cache slot
+    def cached(self, node):
+        depth, slot = node.address
+        slot = self.frames[-1 - depth][slot]
+        jump = self.code.emit(LOAD_CACHED)
+        self.expr(node.children[0])
+        self.code.emit(STORE_CACHED, slot)
+        self.code.patch(jump, pack(slot, len(self.code)))
+
+    # Applies the operator to the value on the stack and the right operand
+    def operator(self, ttype, right):
+        if ttype in (Vocab.OR, Vocab.AND) and parser_components.SHORT_CIRCUIT:
+            jump = self.code.emit(JUMP_IF_TRUE_OR_POP if ttype == Vocab.OR else JUMP_IF_FALSE_OR_POP)
+            self.expr(right)
+            self.code.patch_to_here([jump])
+        elif ttype in _CONST_OPCODES and isinstance(right, LiteralNode):
+            self.emit_const(_CONST_OPCODES[ttype], right.value)
+        else:
+            self.expr(right)
+            self.code.emit(_BINARY_OPCODES[ttype])
+
+    def load(self, loc):
+        slot = self.slot(loc)
+        if len(loc.children[1].children) == 0:
+            self.code.emit(LOAD_SLOT, slot)
+            return
+
+        offset = self.constant_offset(loc)
+        variable_index = self.variable_index(loc)
+        if offset is not None:
+            self.code.emit(LOAD_ELEMENT_CONST, pack(slot, offset))
+        elif variable_index is not None:
+            self.emit_const(LOAD_ELEMENT_VAR, (slot,) + variable_index)
+        else:
+            self.offset(loc)
+            self.code.emit(LOAD_ELEMENT, slot)
+        if loc.ttype == "bool":
+            self.code.emit(TO_BOOL)  # bool arrays are bytearrays
+
+    # Offset of an element in the array's flat buffer when all its indices are
+    # constants in range, None otherwise
+    def constant_offset(self, loc):
+        offset = 0
+        for index_node, length, stride in zip(loc.children[1].children, loc.shape, loc.strides):
+            if not is_constant_index(index_node, length):
+                return None
+            offset += index_node.value * stride
+        return offset
+
+    # (index slot, length, stride, offset) when one index of the element is a
+    # variable and the others constants in range, like arr[i][1], None otherwise
+    def variable_index(self, loc):
+        if not parser_components.CHECK_ARRAY_BOUNDS:
+            return None
+        found = None
+        offset = 0
+        for index_node, length, stride in zip(loc.children[1].children, loc.shape, loc.strides):
+            if is_constant_index(index_node, length):
+                offset += index_node.value * stride
+            elif found is None and isinstance(index_node, LoadNode) and not index_node.children[0].children[1].children:
+                found = (self.slot(index_node.children[0]), length, stride)
+            else:
+                return None
+        if found is None:
+            return None
+        return found + (offset,)
+
+    # Pushes the offset of an element in the array's flat buffer, i * J + j for arr[i][j]
+    def offset(self, loc):
+        constant = 0  # constant indices are added up now
+        pushed = False
+        for index_node, length, stride in zip(loc.children[1].children, loc.shape, loc.strides):
+            if is_constant_index(index_node, length):
+                constant += index_node.value * stride
+                continue
+
+            checked = parser_components.CHECK_ARRAY_BOUNDS
+            if isinstance(index_node, LoadNode) and len(index_node.children[0].children[1].children) == 0 and checked:
+                self.code.emit(LOAD_INDEX, pack(self.slot(index_node.children[0]), length))
+            else:
+                self.expr(index_node)
+                if checked:
+                    self.code.emit(CHECK_INDEX, length)
+            if stride != 1:
+                self.emit_const(MUL_CONST, stride)
+            if pushed:
+                self.code.emit(ADD)
+            pushed = True
+
+        if not pushed:
+            self.emit_const(LOAD_CONST, constant)  # an out of range constant index
+        elif constant:
+            self.emit_const(ADD_CONST, constant)
+
+    def get(self, node):
+        ttype = node.children[0].token.ttype
+        if ttype in (Vocab.CAN_MOVE, Vocab.MAX_MOVE):
+            getter = operator.methodcaller(node.children[0].token.value, node.children[1].run(rover=None, frames=None))
+        elif ttype in (Vocab.NEAREST, Vocab.NEAREST_X, Vocab.NEAREST_Y):
+            getter = operator.methodcaller(node.children[0].token.value, node.tile())
+        elif ttype == Vocab.SONAR:
+            getter = operator.methodcaller("sonar")
+        else:
+            getter = operator.attrgetter(_GET_ATTRIBUTES[ttype])
+        self.emit_const(ROVER_GET, getter)
+
+
+def compile_code(parse_tree):
+    """Compiles a lowered and checked parse tree to a CodeObject."""
+    return Compiler().program(parse_tree)
+
+
+# Python operator of each instruction doing `top = top <op> right`
+_BINARY_FUNCTIONS = {
+    ADD: operator.add,
+    SUB: operator.sub,
+    MUL: operator.mul,
+    EQ: operator.eq,
+    NE: operator.ne,
+    LT: operator.lt,
+    LE: operator.le,
+    GT: operator.gt,
+    GE: operator.ge,
+}
+# Python operator of each instruction doing `top = top <op> constants[arg]`
+_CONST_FUNCTIONS = {
+    ADD_CONST: operator.add,
+    SUB_CONST: operator.sub,
+    MUL_CONST: operator.mul,
+}
+# Comparison made by each JUMP_IF_NOT_<comparison> instruction
+_JUMP_IF_NOT_FUNCTIONS = {
+    JUMP_IF_NOT_EQ: operator.eq,
+    JUMP_IF_NOT_NE: operator.ne,
+    JUMP_IF_NOT_LT: operator.lt,
+    JUMP_IF_NOT_LE: operator.le,
+    JUMP_IF_NOT_GT: operator.gt,
+    JUMP_IF_NOT_GE: operator.ge,
+}
+
+
+class VirtualMachine:
+    """Runs a CodeObject on a rover, can stop after a number of instructions and resume.
+
+    The instructions are decoded once to handlers (threaded code): one
+    function per instruction with its arg already looked up, which does what
+    the instruction does and returns the index of the next instruction.
+
+    run_budget limits the whole program and raises RunTimeError when it is
+    used up, the budget given to run() only pauses the machine.
+    """
+
+    def __init__(self, code, rover, run_budget=None):
+        self.code = code
+        self.rover = rover
+        self.run_budget = RunBudget() if run_budget is None else run_budget
+        self.pc = 0
+        self.stack = []
+        self.slots = [None] * code.n_slots
+        self.n_executed = 0  # instructions run with a budget
+        self.handlers = [
+            self.decode(pc, op, arg)
+            for pc, (op, arg) in enumerate(zip(code.code[::2], code.code[1::2]))
+        ]
+
+    @property
+    def finished(self):
+        return self.pc >= len(self.handlers)
+
+    def run(self, budget=None):
+        """Runs until the end of the program, or until budget instructions ran.
+
+        Returns True when the program finished, False when it stopped because
+        of the budget. Calling run again resumes where it stopped.
+        """
+        handlers = self.handlers
+        end = len(handlers)
+        pc = self.pc
+        try:
+            if budget is None:
+                while pc < end:
+                    pc = handlers[pc]()
+                return True
+
+            steps = 0
+            while pc < end:
+                if steps == budget:
+                    return False
+                pc = handlers[pc]()
+                steps += 1
+            return True
+        finally:
+            if budget is not None:
+                self.n_executed += steps
+            self.pc = pc  # where to resume, or the instruction that raised
+
+    # Returns the handler of an instruction. The nested functions are what
+    # every instruction does at runtime.
+    def decode(self, pc, op, arg):
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        slots = self.slots
+        constants = self.code.constants
+        rover = self.rover
+        next_pc = pc + 1
+
+        if op == LOAD_CONST:
+            value = constants[arg]
+
+            def load_const():
+                push(value)
+                return next_pc
+            return load_const
+
+        if op == LOAD_SLOT:
+            def load_slot():
+                push(slots[arg])
+                return next_pc
+            return load_slot
+
+        if op == STORE_SLOT:
+            def store_slot():
+                slots[arg] = pop()
+                return next_pc
+            return store_slot
+
+        if op == LOAD_INDEX:
+            slot, length = unpack(arg)
+
+            def load_index():
+                index = slots[slot]
+                if not 0 <= index < length:
+                    check_index(index, length)  # raises the error
+                push(index)
+                return next_pc
+            return load_index
+
+        if op == CHECK_INDEX:
+            def checked_index():
+                index = stack[-1]
+                if not 0 <= index < arg:
+                    check_index(index, arg)  # raises the error
+                return next_pc
+            return checked_index
+
+        if op == LOAD_ELEMENT:
+            def load_element():
+                stack[-1] = slots[arg][stack[-1]]
+                return next_pc
+            return load_element
+
+        if op == LOAD_ELEMENT_CONST:
+            slot, offset = unpack(arg)
+
+            def load_element_const():
+                push(slots[slot][offset])
+                return next_pc
+            return load_element_const
+
+        if op == LOAD_ELEMENT_VAR:
+            array_slot, index_slot, length, stride, offset = constants[arg]
+
+            def load_element_var():
+                index = slots[index_slot]
+                if not 0 <= index < length:
+                    check_index(index, length)  # raises the error
+                push(slots[array_slot][index * stride + offset])
+                return next_pc
+            return load_element_var
+
+        if op == STORE_ELEMENT:
+            def store_element():
+                value = pop()
+                slots[arg][pop()] = value
+                return next_pc
+            return store_element
+
+        if op == STORE_ELEMENT_CONST:
+            slot, offset = unpack(arg)
+
+            def store_element_const():
+                slots[slot][offset] = pop()
+                return next_pc
+            return store_element_const
+
+        if op == NEW_ARRAY:
+            ttype, lengths = constants[arg]
+
+            def new_array():
+                push(make_array(ttype, lengths))
+                return next_pc
+            return new_array
+
+        if op == TO_INT:
+            def to_int():
+                stack[-1] = int(stack[-1])
+                return next_pc
+            return to_int
+
+        if op == TO_BOOL:
+            def to_bool():
+                stack[-1] = bool(stack[-1])
+                return next_pc
+            return to_bool
+
+        if op in _BINARY_FUNCTIONS:
+            function = _BINARY_FUNCTIONS[op]
+
+            def binary():
+                right = pop()
+                stack[-1] = function(stack[-1], right)
+                return next_pc
+            return binary
+
+        if op == DIV:
+            def div():
+                right = pop()
+                if right == 0:
+                    raise ZeroDivisionError
+                stack[-1] = stack[-1] / right
+                return next_pc
+            return div
+
+        if op in _CONST_FUNCTIONS:
+            function = _CONST_FUNCTIONS[op]
+            right = constants[arg]
+
+            def binary_const():
+                stack[-1] = function(stack[-1], right)
+                return next_pc
+            return binary_const
+
+        if op == NEG:
+            def neg():
+                stack[-1] = -stack[-1]
+                return next_pc
+            return neg
+
+        if op == NOT:
+            def not_():
+                stack[-1] = not stack[-1]
+                return next_pc
+            return not_
+
+        if op == OR:
+            def or_():
+                right = pop()
+                stack[-1] = stack[-1] or right
+                return next_pc
+            return or_
+
+        if op == AND:
+            def and_():
+                right = pop()
+                stack[-1] = stack[-1] and right
+                return next_pc
+            return and_
+
+        if op == JUMP:
+            return lambda: arg
+
+        if op == LOOP:
+            run_budget = self.run_budget
+
+            def loop():
+                run_budget.countdown -= 1
+                if run_budget.countdown < 0:
+                    run_budget.check()  # raises once over budget
+                return arg
+            return loop
+
+        if op == JUMP_IF_FALSE:
+            def jump_if_false():
+                return next_pc if pop() else arg
+            return jump_if_false
+
+        if op == JUMP_IF_TRUE:
+            def jump_if_true():
+                return arg if pop() else next_pc
+            return jump_if_true
+
+        if op == JUMP_IF_TRUE_OR_POP:
+            def jump_if_true_or_pop():
+                if stack[-1]:
+                    return arg
+                pop()
+                return next_pc
+            return jump_if_true_or_pop
+
+        if op == JUMP_IF_FALSE_OR_POP:
+            def jump_if_false_or_pop():
+                if stack[-1]:
+                    pop()
+                    return next_pc
+                return arg
+            return jump_if_false_or_pop
+
+        if op in _JUMP_IF_NOT_FUNCTIONS:
+            function = _JUMP_IF_NOT_FUNCTIONS[op]
+
+            def jump_if_not():
+                right = pop()
+                return next_pc if function(pop(), right) else arg
+            return jump_if_not
+
+        if op == ROVER_GET:
+            getter = constants[arg]
+
+            def rover_get():
+                push(getter(rover))
+                return next_pc
+            return rover_get
+
+        if op == ROVER_ACTION:
+            action = constants[arg]
+
+            def rover_action():
+                action(rover)
+                return next_pc
+            return rover_action
+
+        if op == ROVER_MOVE:
+            direction = constants[arg]
+
+            def rover_move():
+                rover.move(direction, pop())
+                return next_pc
+            return rover_move
+
+        if op == LOAD_CACHED:
+            slot, target = unpack(arg)
+
+            def load_cached():
+                value = slots[slot]
+                if value is None:
+                    return next_pc  # evaluate the expression
+                push(value)
+                return target
+            return load_cached
+
+        if op == STORE_CACHED:
+            def store_cached():
+                slots[arg] = stack[-1]
+                return next_pc
+            return store_cached
+
+        if op == PRINT:
+            def print_():
+                rover.output.print(pop())
+                return next_pc
+            return print_
+
+        raise ValueError(f"Unknown opcode {op} at {pc}")
+
+
+def compile_program(parse_tree):
+    """Compiles a lowered and checked parse tree to a function running it on the VM."""
+    code = compile_code(parse_tree)
+
+    def run_program(rover, run_budget=None):
+        machine = VirtualMachine(code, rover, run_budget)
+        machine.run_budget.start()
+        machine.run()
+    return run_program
+
+
+def disassemble(code):
+    """Returns the instructions of a CodeObject as text, one per line."""
+    instructions = list(zip(code.code[::2], code.code[1::2]))
+    targets = {arg for op, arg in instructions if op in _JUMP_OPS}
+    targets.update(unpack(arg)[1] for op, arg in instructions if op == LOAD_CACHED)
+    lines = [f"{code.n_slots} slots, {len(code.constants)} constants, {len(code)} instructions"]
+    for i, (op, arg) in enumerate(instructions):
+        detail = ""
+        if op in _SLOT_OPS:
+            detail = f"({code.slot_names[arg]})"
+        elif op in _PACKED_OPS:
+            slot, value = unpack(arg)
+            detail = f"({code.slot_names[slot]}, {value})"
+        elif op in _CONST_OPS:
+            detail = f"({code.constants[arg]!r})"
+        elif op in _JUMP_OPS:
+            detail = f"(to {arg})"
+
+        marker = ">>" if i in targets else "  "
+        lines.append(f"{marker} {i:>5} {OPNAMES[op]:22} {arg:>5} {detail}".rstrip())
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Print the instructions compiled for a program
+    if len(sys.argv) < 2:
+        raise Exception("Missing file path to compile.")
+    elif len(sys.argv) > 2:
+        raise Exception("Only 1 argument is needed, but more were given.")
+
+    fcontent = None
+    filepath = pathlib.Path(sys.argv[1])
+    with filepath.open() as f:
+        fcontent = f.read()
+
+    program = parser.get_parse_tree(fcontent).lower()
+    program.check()
+    print(disassemble(compile_code(program)))